@@ -0,0 +1,91 @@
+"""Command line interface of the benchmark harness.
+
+Run the benchmarks at the checked-out commit and store the results in `benchmarks/results/`::
+
+    python -m benchmarks run
+    python -m benchmarks run --bench 'Update|Startup' --quick
+
+Run the same benchmarks against the package at another commit (in a temporary git worktree)::
+
+    python -m benchmarks run --commit HEAD~1
+
+Compare two commits (or results files); exits with status 1 if any benchmark regressed::
+
+    python -m benchmarks compare HEAD~1 HEAD --threshold 1.1
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+from benchmarks.harness import (
+    DEFAULT_THRESHOLD,
+    compare_results,
+    machine_differences,
+    read_results,
+    run_at_commit,
+    run_benchmarks,
+    write_results,
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Run the benchmarks and write the results as JSON.')
+    run.add_argument('-b', '--bench', help='Only run benchmarks with a name matching this regular expression.')
+    run.add_argument('-o', '--output', help='Results file. Defaults to benchmarks/results/<commit>.json.')
+    run.add_argument('--repeat', type=int, help='Number of samples per benchmark.')
+    run.add_argument('--quick', action='store_true', help='Take a single sample per benchmark.')
+    run.add_argument('--commit', help='Run against the package at this commit rather than the working tree.')
+    run.add_argument('--commit-label', help=argparse.SUPPRESS)
+
+    compare = commands.add_parser('compare', help='Compare the results of two commits or results files.')
+    compare.add_argument('before', help='Baseline commit or results file.')
+    compare.add_argument('after', help='Commit or results file to compare.')
+    compare.add_argument(
+        '-t', '--threshold',
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f'Ratio of medians beyond which a change is flagged (default {DEFAULT_THRESHOLD}).',
+    )
+    compare.add_argument('--only-changed', action='store_true', help='Only list flagged benchmarks.')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        if args.commit:
+            arguments = []
+            if args.bench:
+                arguments += ['--bench', args.bench]
+            if args.repeat:
+                arguments += ['--repeat', str(args.repeat)]
+            if args.quick:
+                arguments += ['--quick']
+            print(f'Results written to {run_at_commit(args.commit, arguments, output=args.output)}')
+            return 0
+        results = run_benchmarks(
+            pattern=args.bench,
+            repeat=1 if args.quick else args.repeat,
+            commit=args.commit_label,
+        )
+        print(f'Results written to {write_results(results, args.output)}')
+        return 0
+
+    before = read_results(args.before)
+    after = read_results(args.after)
+    for key in machine_differences(before, after):
+        print(f"Warning: results were measured on different machines ({key}: "
+              f"{before['machine'].get(key)} vs {after['machine'].get(key)}).")
+    comparison = compare_results(before, after, threshold=args.threshold)
+    if args.only_changed:
+        comparison = comparison[comparison['change'] != '']
+    with pd.option_context('display.max_rows', None, 'display.width', 200, 'display.max_colwidth', 60):
+        print(comparison.to_string(index=False, float_format='{:.4g}'.format))
+    regressions = int((comparison['change'] == 'regression').sum())
+    print(f'{regressions} regression(s) beyond a ratio of {args.threshold}.')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
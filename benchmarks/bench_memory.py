@@ -0,0 +1,31 @@
+"""Memory benchmarks: estimated and measured memory of model setup and runs."""
+import warnings
+
+import clearwater_riverine as cwr
+
+from benchmarks import cases
+
+
+class ModelMemory:
+    """Memory of a model with 2 constituents over a number of timesteps."""
+    params = [cases.CASES, [100, 1000]]
+    param_names = ['case', 'n_timesteps']
+    timeout = 300
+
+    def setup(self, case, n_timesteps):
+        warnings.filterwarnings('ignore')
+        self.inputs = cases.model_inputs(case, 2)
+        self.datetime_range = cases.datetime_range(case, n_timesteps)
+
+    def peakmem_setup(self, case, n_timesteps):
+        cwr.ClearwaterRiverine(**self.inputs, datetime_range=self.datetime_range)
+
+    def track_estimated_peak(self, case, n_timesteps):
+        estimate = cwr.estimate_memory(
+            self.inputs['flow_field_file_path'],
+            datetime_range=self.datetime_range,
+            n_constituents=2,
+        )
+        return int(estimate['peak'].max())
+
+    track_estimated_peak.unit = 'bytes'
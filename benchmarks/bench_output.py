@@ -0,0 +1,39 @@
+"""Output benchmarks: writing results and checkpoints after a run."""
+from pathlib import Path
+import shutil
+import tempfile
+import warnings
+
+import clearwater_riverine as cwr
+
+from benchmarks import cases
+
+# timesteps solved before writing
+N_STEPS = 20
+
+
+class OutputWrite:
+    """Writing a model with 2 constituents after `N_STEPS` timesteps."""
+    params = cases.CASES
+    param_names = ['case']
+    number = 1
+    repeat = 3
+    timeout = 300
+
+    def setup(self, case):
+        warnings.filterwarnings('ignore')
+        self.directory = Path(tempfile.mkdtemp(prefix='clearwater_riverine_output_'))
+        self.model = cwr.ClearwaterRiverine(
+            **cases.model_inputs(case, 2),
+            datetime_range=cases.datetime_range(case, N_STEPS),
+        )
+        self.model.run(N_STEPS)
+
+    def teardown(self, case):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def time_write_zarr(self, case):
+        self.model.finalize(save=True, output_filepath=str(self.directory / 'output.zarr'))
+
+    def time_write_checkpoint(self, case):
+        self.model.checkpoint(self.directory / 'checkpoint.zarr').result()
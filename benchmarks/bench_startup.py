@@ -0,0 +1,48 @@
+"""Startup benchmarks, following the airspeed velocity (asv) conventions.
+
+`timeraw_*` benchmarks return code that is timed in a fresh interpreter, so they
+measure cold imports rather than the modules already loaded by the benchmark runner.
+"""
+import warnings
+
+from clearwater_riverine.mesh import instantiate_model_mesh
+
+from benchmarks import cases
+
+
+class ImportTime:
+    """Cold import time of the package and of its optional plotting stack."""
+
+    def timeraw_import_clearwater_riverine(self):
+        return "import clearwater_riverine"
+
+    def timeraw_import_plotting(self):
+        return "import clearwater_riverine.plotting"
+
+
+class Startup:
+    """Reading hydrodynamics from HDF and calculating the transport parameters."""
+    params = [cases.CASES, [100, 1000]]
+    param_names = ['case', 'n_timesteps']
+    number = 1
+    repeat = 3
+    timeout = 300
+
+    def setup(self, case, n_timesteps):
+        warnings.filterwarnings('ignore')
+        self.inputs = cases.model_inputs(case)
+        self.datetime_range = cases.datetime_range(case, n_timesteps)
+
+    def _startup(self):
+        mesh = instantiate_model_mesh(self.inputs['diffusion_coefficient_input'])
+        mesh = mesh.cwr.read_ras(
+            self.inputs['flow_field_file_path'],
+            datetime_range=self.datetime_range,
+        )
+        return mesh.cwr.calculate_required_parameters()
+
+    def time_startup(self, case, n_timesteps):
+        self._startup()
+
+    def peakmem_startup(self, case, n_timesteps):
+        self._startup()
@@ -0,0 +1,33 @@
+"""Per-timestep benchmarks: `update()` across mesh sizes and numbers of constituents."""
+import warnings
+
+import clearwater_riverine as cwr
+
+from benchmarks import cases
+
+# timesteps solved per sample
+N_STEPS = 20
+
+
+class Update:
+    """`N_STEPS` calls of `update()` after model setup."""
+    params = [cases.CASES, [1, 4]]
+    param_names = ['case', 'n_constituents']
+    number = 1
+    repeat = 5
+    timeout = 300
+
+    def setup(self, case, n_constituents):
+        warnings.filterwarnings('ignore')
+        self.model = cwr.ClearwaterRiverine(
+            **cases.model_inputs(case, n_constituents),
+            datetime_range=cases.datetime_range(case, N_STEPS),
+        )
+
+    def time_update(self, case, n_constituents):
+        for _ in range(N_STEPS):
+            self.model.update()
+
+    def peakmem_update(self, case, n_constituents):
+        for _ in range(N_STEPS):
+            self.model.update()
@@ -0,0 +1,297 @@
+"""Model cases shared by the benchmarks: the shipped test cases and synthetic channels.
+
+Synthetic channels are rectangular grids of square cells with a steady, uniform flow
+from an upstream flow boundary to a downstream stage boundary. They are written as
+RAS-like HDF files with only the datasets `HDFReader` reads, so the benchmarks can scale
+the mesh size beyond the shipped test cases.
+"""
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Tuple,
+)
+import importlib.util
+import tempfile
+
+import h5py
+import numpy as np
+import pandas as pd
+
+DATA_DIRECTORY = Path(__file__).resolve().parents[1] / 'tests' / 'data'
+SYNTHETIC_DIRECTORY = Path(tempfile.gettempdir()) / 'clearwater_riverine_benchmarks'
+
+# name: (directory, plan)
+SHIPPED_CASES = {
+    'plan02_2x1': ('simple_test_cases/plan02_2x1', 'p02'),
+    'plan03_2x1': ('simple_test_cases/plan03_2x1', 'p03'),
+    'plan01_10x5': ('simple_test_cases/plan01_10x5', 'p01'),
+    'plan11_stormSurge': ('sumwere_test_cases/plan11_stormSurge', 'p11'),
+}
+# name: (cells along the channel, cells across the channel)
+SYNTHETIC_CASES = {
+    'channel_50x20': (50, 20),
+    'channel_200x50': (200, 50),
+}
+CASES = list(SHIPPED_CASES) + list(SYNTHETIC_CASES)
+SYNTHETIC_TIMESTEPS = 2001
+DIFFUSION_COEFFICIENT = 0.01
+
+_TIME_SERIES = 'Results/Unsteady/Output/Output Blocks/Base Output/Unsteady Time Series'
+_UPSTREAM = 'US_Flow'
+_DOWNSTREAM = 'DS_Stage'
+
+
+def _load_atomic_write():
+    # benchmarks also run against older versions of the package (see `harness.run_at_commit`),
+    # so the helper is loaded from this tree's source rather than from the imported package
+    spec = importlib.util.spec_from_file_location(
+        'clearwater_riverine_benchmarks_atomic',
+        Path(__file__).resolve().parents[1] / 'src' / 'clearwater_riverine' / 'io' / '_atomic.py',
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.atomic_write
+
+
+atomic_write = _load_atomic_write()
+
+
+def _compound(rows, fields) -> np.ndarray:
+    """Structured array, as RAS stores its attribute tables."""
+    return np.array(rows, dtype=np.dtype(fields))
+
+
+def write_channel(
+    file_path: str | Path,
+    nx: int,
+    ny: int,
+    n_time: int,
+    dx: float = 10.0,
+    depth: float = 2.0,
+    velocity: float = 0.5,
+    time_step: str = '30s',
+):
+    """Write a synthetic channel as a RAS-like HDF file.
+
+    Args:
+        file_path (str | Path): HDF file to write.
+        nx (int): Number of cells along the channel (x).
+        ny (int): Number of cells across the channel (y).
+        n_time (int): Number of output timesteps.
+        dx (float, optional): Cell size in meters.
+        depth (float, optional): Water depth in meters.
+        velocity (float, optional): Flow velocity along the channel in m/s.
+        time_step (str, optional): Time between output timesteps.
+    """
+    nreal = nx * ny
+
+    def node(i, j):
+        return j * (nx + 1) + i
+
+    def cell(i, j):
+        return j * nx + i
+
+    i_nodes, j_nodes = np.meshgrid(np.arange(nx + 1), np.arange(ny + 1))
+    node_coordinates = np.column_stack([i_nodes.ravel() * dx, j_nodes.ravel() * dx])
+
+    # faces: (face 1 cell, face 2 cell or None for a ghost, start node, end node, normal)
+    faces = []
+    for j in range(ny):
+        for i in range(1, nx):
+            faces.append((cell(i - 1, j), cell(i, j), node(i, j), node(i, j + 1), (1.0, 0.0)))
+    for j in range(1, ny):
+        for i in range(nx):
+            faces.append((cell(i, j - 1), cell(i, j), node(i, j), node(i + 1, j), (0.0, 1.0)))
+    upstream = []
+    downstream = []
+    for j in range(ny):
+        upstream.append(len(faces))
+        faces.append((cell(0, j), None, node(0, j + 1), node(0, j), (-1.0, 0.0)))
+        downstream.append(len(faces))
+        faces.append((cell(nx - 1, j), None, node(nx, j), node(nx, j + 1), (1.0, 0.0)))
+    for i in range(nx):
+        faces.append((cell(i, 0), None, node(i, 0), node(i + 1, 0), (0.0, -1.0)))
+        faces.append((cell(i, ny - 1), None, node(i + 1, ny), node(i, ny), (0.0, 1.0)))
+
+    n_ghost = sum(face[1] is None for face in faces)
+    n_cell = nreal + n_ghost
+    n_face = len(faces)
+    face_cells = np.zeros((n_face, 2), dtype=np.int32)
+    face_nodes = np.zeros((n_face, 2), dtype=np.int32)
+    normals = np.zeros((n_face, 3), dtype=np.float32)
+    cell_nodes = np.full((n_cell, 4), -1, dtype=np.int32)
+    cell_centers = np.zeros((n_cell, 2))
+    for j in range(ny):
+        for i in range(nx):
+            cell_nodes[cell(i, j)] = [node(i, j), node(i + 1, j), node(i + 1, j + 1), node(i, j + 1)]
+            cell_centers[cell(i, j)] = [(i + 0.5) * dx, (j + 0.5) * dx]
+    ghost = nreal
+    for k, (face1, face2, start, end, normal) in enumerate(faces):
+        if face2 is None:
+            face2 = ghost
+            cell_nodes[ghost, 0:2] = [start, end]
+            cell_centers[ghost] = (node_coordinates[start] + node_coordinates[end]) / 2
+            ghost += 1
+        face_cells[k] = [face1, face2]
+        face_nodes[k] = [start, end]
+        normals[k] = [normal[0], normal[1], dx]
+
+    surface_area = np.zeros(n_cell, dtype=np.float32)
+    surface_area[0:nreal] = dx * dx
+    face_velocity = (velocity * normals[:, 0]).astype(np.float32)
+    face_flow = face_velocity * depth * dx
+    time = pd.date_range('2023-01-01', periods=n_time, freq=time_step)
+    time_stamps = np.array([t.strftime('%d%b%Y %H:%M:%S').upper() for t in time], dtype='S19')
+
+    Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+    with h5py.File(file_path, 'w') as outfile:
+        outfile.attrs['File Type'] = np.bytes_('HEC-RAS Results')
+        outfile.attrs['Units System'] = np.bytes_('SI Units')
+        outfile['Geometry/2D Flow Areas/Attributes'] = _compound(
+            [('Channel', nreal)],
+            [('Name', 'S16'), ('Cell Count', '<i4')],
+        )
+        geometry = outfile.create_group('Geometry/2D Flow Areas/Channel')
+        geometry['FacePoints Coordinate'] = node_coordinates
+        geometry['Cells FacePoint Indexes'] = cell_nodes
+        geometry['Cells Center Coordinate'] = cell_centers
+        geometry['Cells Surface Area'] = surface_area
+        geometry['Faces FacePoint Indexes'] = face_nodes
+        geometry['Faces Cell Indexes'] = face_cells
+        geometry['Faces NormalUnitVector and Length'] = normals
+
+        boundary_faces = [(0, face) for face in upstream] + [(1, face) for face in downstream]
+        outfile['Geometry/Boundary Condition Lines/Attributes'] = _compound(
+            [(_UPSTREAM, 'Channel', 'External', ny * dx), (_DOWNSTREAM, 'Channel', 'External', ny * dx)],
+            [('Name', 'S32'), ('SA-2D', 'S16'), ('Type', 'S8'), ('Length', '<f4')],
+        )
+        outfile['Geometry/Boundary Condition Lines/External Faces'] = _compound(
+            [
+                (line, face, face_nodes[face, 0], face_nodes[face, 1], 0.0, dx)
+                for line, face in boundary_faces
+            ],
+            [
+                ('BC Line ID', '<i4'), ('Face Index', '<i4'), ('FP Start Index', '<i4'),
+                ('FP End Index', '<i4'), ('Station Start', '<f4'), ('Station End', '<f4'),
+            ],
+        )
+
+        series = outfile.create_group(_TIME_SERIES)
+        series['Time Date Stamp'] = time_stamps
+        for name, line_faces in [(_UPSTREAM, upstream), (_DOWNSTREAM, downstream)]:
+            flow_per_face = series.create_dataset(
+                f'Boundary Conditions/{name} - Flow per Face',
+                data=np.broadcast_to(face_flow[line_faces], (n_time, len(line_faces))),
+            )
+            flow_per_face.attrs['Faces'] = np.array(line_faces, dtype=np.int32)
+            flow_per_face.attrs['Units'] = np.bytes_('m^3/s')
+
+        results = series.create_group('2D Flow Areas/Channel')
+        for name, values, units in [
+            ('Face Velocity', face_velocity, 'm/s'),
+            ('Face Flow', face_flow, 'm^3/s'),
+            ('Water Surface', np.full(n_cell, depth, dtype=np.float32), 'm'),
+            ('Cell Volume', np.full(n_cell, depth * dx * dx, dtype=np.float32), 'm^3'),
+        ]:
+            dataset = results.create_dataset(name, data=np.broadcast_to(values, (n_time, len(values))))
+            dataset.attrs['Units'] = np.bytes_(units)
+
+
+def synthetic_plan(name: str) -> Path:
+    """HDF file of a synthetic channel, written on first use and reused afterwards."""
+    nx, ny = SYNTHETIC_CASES[name]
+    file_path = SYNTHETIC_DIRECTORY / f'{name}_{SYNTHETIC_TIMESTEPS}.hdf'
+    if not file_path.exists():
+        with atomic_write(file_path) as temporary_path:
+            write_channel(temporary_path, nx, ny, SYNTHETIC_TIMESTEPS)
+    return file_path
+
+
+def n_timesteps(case: str) -> int:
+    """Number of output timesteps of a case."""
+    with h5py.File(model_inputs(case, 1)['flow_field_file_path'], 'r') as infile:
+        return len(infile[f'{_TIME_SERIES}/Time Date Stamp'])
+
+
+def _constituent_dict(names, initial_conditions, boundary_conditions) -> Dict[str, Dict[str, Any]]:
+    return {
+        name: {
+            'units': 'mg/L',
+            'initial_conditions': initial_conditions,
+            'boundary_conditions': boundary_conditions,
+        }
+        for name in names
+    }
+
+
+def channel_inputs(file_path: str | Path, n_constituents: int = 1) -> Dict[str, Any]:
+    """Keyword arguments of `ClearwaterRiverine` for a synthetic channel (see `write_channel`).
+
+    Every constituent starts at 0 and flows in at 100 mg/L across the upstream boundary,
+    given at every timestep. The initial and boundary conditions are written to CSV files next to the HDF file, as
+    in the shipped cases, since every version of the model reads conditions from CSV files.
+    """
+    file_path = Path(file_path)
+    initial_conditions_path = file_path.with_name(f'{file_path.stem}_initial_conditions.csv')
+    boundary_conditions_path = file_path.with_name(f'{file_path.stem}_boundary_conditions.csv')
+    if not (initial_conditions_path.exists() and boundary_conditions_path.exists()):
+        with h5py.File(file_path, 'r') as infile:
+            stamps = infile[f'{_TIME_SERIES}/Time Date Stamp'][:]
+            nreal = infile['Geometry/2D Flow Areas/Attributes'][0]['Cell Count']
+        with atomic_write(initial_conditions_path) as temporary_path:
+            pd.DataFrame({
+                'Cell_Index': np.arange(nreal),
+                'Concentration': 0.0,
+            }).to_csv(temporary_path, index=False)
+        with atomic_write(boundary_conditions_path) as temporary_path:
+            pd.DataFrame({
+                'RAS2D_TS_Name': _UPSTREAM,
+                'Datetime': pd.to_datetime(pd.Series(stamps).str.decode('utf8'), format='%d%b%Y %H:%M:%S'),
+                'Concentration': 100.0,
+            }).to_csv(temporary_path, index=False)
+    return {
+        'flow_field_file_path': str(file_path),
+        'diffusion_coefficient_input': DIFFUSION_COEFFICIENT,
+        'constituent_dict': _constituent_dict(
+            [f'constituent_{i}' for i in range(n_constituents)],
+            str(initial_conditions_path),
+            str(boundary_conditions_path),
+        ),
+    }
+
+
+def model_inputs(case: str, n_constituents: int = 1) -> Dict[str, Any]:
+    """Keyword arguments of `ClearwaterRiverine` for a case.
+
+    Raises:
+        NotImplementedError: If the flow field of a shipped case is not available (e.g., a
+            Git LFS pointer), so that benchmark runners skip the case.
+    """
+    if case in SYNTHETIC_CASES:
+        return channel_inputs(synthetic_plan(case), n_constituents)
+    directory, plan = SHIPPED_CASES[case]
+    directory = DATA_DIRECTORY / directory
+    flow_field_file_path = directory / f'clearWaterTestCases.{plan}.hdf'
+    if not h5py.is_hdf5(flow_field_file_path):
+        raise NotImplementedError(f'{flow_field_file_path} is not available.')
+    return {
+        'flow_field_file_path': str(flow_field_file_path),
+        'diffusion_coefficient_input': DIFFUSION_COEFFICIENT,
+        'constituent_dict': _constituent_dict(
+            [f'constituent_{i}' for i in range(n_constituents)],
+            str(directory / f'cwr_initial_conditions_{plan}.csv'),
+            str(directory / f'cwr_boundary_conditions_{plan}.csv'),
+        ),
+    }
+
+
+def datetime_range(case: str, n_steps: int) -> Tuple[int, int]:
+    """Range of the first `n_steps` timesteps of a case.
+
+    Raises:
+        NotImplementedError: If the case has fewer timesteps.
+    """
+    if n_steps >= n_timesteps(case):
+        raise NotImplementedError(f'{case} has fewer than {n_steps + 1} timesteps.')
+    return (0, n_steps)
@@ -0,0 +1,461 @@
+"""Runs the benchmarks, stores results as JSON, and compares results between commits.
+
+Benchmarks follow the airspeed velocity (asv) conventions, so they can also be run with asv:
+classes in `bench_*` modules with `params`, `param_names`, `setup`, `teardown`, `number` and
+`repeat` attributes, and methods named by what they measure:
+
+- `time_*`: wall-clock time of the method, after `setup`.
+- `timeraw_*`: wall-clock time of the code the method returns, run in a fresh interpreter.
+- `peakmem_*`: peak resident set size of a fresh interpreter running `setup` and the method.
+- `track_*`: the value the method returns, in the method's `unit`.
+
+A `setup` that raises `NotImplementedError` skips the parameter combination. Any other error
+in `setup` or the benchmark (e.g., a commit that predates a feature the benchmark uses) is
+recorded as a failure of that parameter combination, and the run carries on.
+"""
+from importlib import import_module
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+import contextlib
+import datetime
+import io
+import itertools
+import json
+import os
+import pkgutil
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+BENCHMARK_DIRECTORY = Path(__file__).resolve().parent
+REPOSITORY_DIRECTORY = BENCHMARK_DIRECTORY.parent
+RESULTS_DIRECTORY = BENCHMARK_DIRECTORY / 'results'
+BENCHMARK_KINDS = ['timeraw', 'time', 'peakmem', 'track']
+UNITS = {'timeraw': 'seconds', 'time': 'seconds', 'peakmem': 'bytes'}
+PACKAGES = ['numpy', 'scipy', 'pandas', 'xarray', 'h5py', 'numba', 'zarr']
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 1.1
+
+
+class Benchmark:
+    """A benchmark method of a benchmark class.
+
+    Args:
+        module_name (str): Module of the benchmark class, e.g., `benchmarks.bench_startup`.
+        class_name (str): Benchmark class.
+        method_name (str): Benchmark method.
+    """
+    def __init__(self, module_name: str, class_name: str, method_name: str):
+        self.module_name = module_name
+        self.class_name = class_name
+        self.method_name = method_name
+        self.cls = getattr(import_module(module_name), class_name)
+        self.kind = next(kind for kind in BENCHMARK_KINDS if method_name.startswith(f'{kind}_'))
+        method = getattr(self.cls, method_name)
+        self.unit = getattr(method, 'unit', UNITS.get(self.kind, ''))
+        params = list(getattr(self.cls, 'params', []))
+        if params and not all(isinstance(values, (list, tuple)) for values in params):
+            # a single parameter
+            params = [params]
+        self.params = params
+        self.param_names = list(getattr(self.cls, 'param_names', []))
+        self.number = max(getattr(self.cls, 'number', 1), 1)
+        self.repeat = getattr(self.cls, 'repeat', DEFAULT_REPEAT)
+        if not isinstance(self.repeat, int):
+            # asv also accepts (min_repeat, max_repeat, max_time)
+            self.repeat = self.repeat[0]
+
+    @property
+    def name(self) -> str:
+        return f"{self.module_name.split('.')[-1]}.{self.class_name}.{self.method_name}"
+
+    def combinations(self) -> List[Tuple]:
+        """Every combination of parameter values."""
+        return list(itertools.product(*self.params))
+
+    def _instance(self, params: Tuple) -> Optional[Any]:
+        """Benchmark class instance after `setup`, or None if the combination is skipped."""
+        instance = self.cls()
+        if hasattr(instance, 'setup'):
+            try:
+                instance.setup(*params)
+            except NotImplementedError:
+                return None
+        return instance
+
+    @staticmethod
+    def _teardown(instance: Any, params: Tuple):
+        if hasattr(instance, 'teardown'):
+            instance.teardown(*params)
+
+    def _subprocess(self, code: str) -> float:
+        """Run code in a fresh interpreter and return the number it prints last."""
+        environment = dict(os.environ)
+        environment['PYTHONPATH'] = os.pathsep.join(
+            [str(REPOSITORY_DIRECTORY)] + [path for path in [environment.get('PYTHONPATH')] if path]
+        )
+        completed = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=REPOSITORY_DIRECTORY,
+            env=environment,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            lines = completed.stderr.strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else f'exit status {completed.returncode}')
+        return float(completed.stdout.split()[-1])
+
+    def run(self, params: Tuple, repeat: Optional[int] = None) -> Optional[List[float]]:
+        """Measure one parameter combination.
+
+        Args:
+            params (Tuple): Parameter values.
+            repeat (int, optional): Number of samples; defaults to the benchmark's `repeat`.
+
+        Returns:
+            One value per sample, or None if the combination is skipped.
+        """
+        repeat = repeat or self.repeat
+        instance = self._instance(params)
+        if instance is None:
+            return None
+        samples = []
+
+        if self.kind == 'timeraw':
+            code = getattr(instance, self.method_name)(*params)
+            setup_code = ''
+            if isinstance(code, tuple):
+                code, setup_code = code
+            self._teardown(instance, params)
+            for _ in range(repeat):
+                samples.append(self._subprocess(
+                    'import time\n'
+                    f'exec({setup_code!r})\n'
+                    'start = time.perf_counter()\n'
+                    f'exec({code!r})\n'
+                    'print(time.perf_counter() - start)\n'
+                ))
+        elif self.kind == 'peakmem':
+            self._teardown(instance, params)
+            samples.append(self._subprocess(
+                'from benchmarks.harness import _peakmem\n'
+                f'_peakmem({self.module_name!r}, {self.class_name!r}, {self.method_name!r}, {json.dumps(list(params))!r})\n'
+            ))
+        elif self.kind == 'track':
+            try:
+                samples.append(float(getattr(instance, self.method_name)(*params)))
+            finally:
+                self._teardown(instance, params)
+        else:
+            for i in range(repeat):
+                if i > 0:
+                    instance = self._instance(params)
+                method = getattr(instance, self.method_name)
+                try:
+                    start = time.perf_counter()
+                    for _ in range(self.number):
+                        method(*params)
+                    samples.append((time.perf_counter() - start) / self.number)
+                finally:
+                    self._teardown(instance, params)
+        return samples
+
+
+def _peakmem(module_name: str, class_name: str, method_name: str, params: str):
+    """Print the peak resident set size of `setup` and a benchmark method (run in a fresh interpreter)."""
+    # not `clearwater_riverine.memory.peak_rss`, which commits before it was added do not have
+    import resource
+
+    params = json.loads(params)
+    instance = getattr(import_module(module_name), class_name)()
+    if hasattr(instance, 'setup'):
+        instance.setup(*params)
+    getattr(instance, method_name)(*params)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    print(peak if sys.platform == 'darwin' else peak * 1024)
+
+
+def discover(pattern: Optional[str] = None) -> List[Benchmark]:
+    """Benchmarks in the `bench_*` modules, optionally only those with a name matching a regular expression."""
+    benchmarks = []
+    for module_info in sorted(pkgutil.iter_modules([str(BENCHMARK_DIRECTORY)]), key=lambda info: info.name):
+        if not module_info.name.startswith('bench_'):
+            continue
+        module_name = f'benchmarks.{module_info.name}'
+        module = import_module(module_name)
+        for class_name, cls in vars(module).items():
+            if not isinstance(cls, type) or cls.__module__ != module_name:
+                continue
+            for method_name in sorted(vars(cls)):
+                if not any(method_name.startswith(f'{kind}_') for kind in BENCHMARK_KINDS):
+                    continue
+                benchmark = Benchmark(module_name, class_name, method_name)
+                if pattern is None or re.search(pattern, benchmark.name):
+                    benchmarks.append(benchmark)
+    return benchmarks
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', *args],
+            cwd=REPOSITORY_DIRECTORY,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _cpu_model() -> str:
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def _memory_size() -> Optional[int]:
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def machine_metadata() -> Dict[str, Any]:
+    """Machine, operating system, Python and package versions the benchmarks run on."""
+    packages = {}
+    for package in PACKAGES:
+        try:
+            packages[package] = version(package)
+        except PackageNotFoundError:
+            packages[package] = None
+    return {
+        'machine': platform.node(),
+        'os': platform.platform(),
+        'arch': platform.machine(),
+        'cpu': _cpu_model(),
+        'num_cpu': os.cpu_count(),
+        'ram': _memory_size(),
+        'python': platform.python_version(),
+        'packages': packages,
+    }
+
+
+def run_benchmarks(
+    pattern: Optional[str] = None,
+    repeat: Optional[int] = None,
+    verbose: bool = True,
+    commit: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Run the benchmarks against the imported `clearwater_riverine`.
+
+    Args:
+        pattern (str, optional): Only run benchmarks with a name matching this regular expression.
+        repeat (int, optional): Number of samples per benchmark, overriding their `repeat`.
+        verbose (bool, optional): Whether to print each result.
+        commit (str, optional): Commit the package was imported from. Defaults to the checked-out commit.
+
+    Returns:
+        JSON-serializable results: the commit, date, machine metadata, and per benchmark
+        its kind, unit, parameter names, and the median and samples of each parameter combination
+        (None if it was skipped or failed, with the error of a failure).
+    """
+    results = {}
+    for benchmark in discover(pattern):
+        entries = []
+        for params in benchmark.combinations():
+            error = None
+            try:
+                # the model reports progress with print statements
+                with contextlib.redirect_stdout(io.StringIO()):
+                    samples = benchmark.run(params, repeat=repeat)
+            except Exception as exception:
+                samples = None
+                error = f'{type(exception).__name__}: {exception}'
+            value = None if samples is None else float(np.median(samples))
+            entries.append({'params': list(params), 'value': value, 'samples': samples, 'error': error})
+            if verbose:
+                label = f"{benchmark.name}({', '.join(map(str, params))})"
+                if error is not None:
+                    print(f'{label}: failed ({error})')
+                else:
+                    print(f'{label}: ' + ('skipped' if value is None else f'{value:.6g} {benchmark.unit}'))
+        results[benchmark.name] = {
+            'kind': benchmark.kind,
+            'unit': benchmark.unit,
+            'param_names': benchmark.param_names,
+            'results': entries,
+        }
+    return {
+        'version': 1,
+        'commit': commit or _git('rev-parse', 'HEAD'),
+        'dirty': False if commit else bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'machine': machine_metadata(),
+        'results': results,
+    }
+
+
+def _resolve_commit(commit: str) -> str:
+    sha = _git('rev-parse', '--verify', f'{commit}^{{commit}}')
+    if sha is None:
+        raise ValueError(f'{commit} is not a commit.')
+    return sha
+
+
+def results_path(commit: str) -> Path:
+    """Results file of a commit (any revision git understands, e.g., `HEAD~1`)."""
+    return RESULTS_DIRECTORY / f'{_resolve_commit(commit)[:12]}.json'
+
+
+def run_at_commit(
+    commit: str,
+    arguments: Optional[List[str]] = None,
+    output: Optional[str | Path] = None,
+) -> Path:
+    """Run the current benchmarks against the package at another commit.
+
+    The commit is checked out in a temporary git worktree, and its `src` directory is put
+    first on the path of a benchmark run in a fresh interpreter, so commits that predate a
+    benchmark can still be measured with it.
+
+    Args:
+        commit (str): Any revision git understands, e.g., `HEAD~1` or a branch name.
+        arguments (List[str], optional): Further arguments of `python -m benchmarks run`.
+        output (str | Path, optional): Results file. Defaults to `results/<commit>.json`.
+
+    Returns:
+        Results file of the commit.
+    """
+    sha = _resolve_commit(commit)
+    output = Path(output) if output else results_path(sha)
+    with tempfile.TemporaryDirectory(prefix='clearwater_riverine_worktree_') as directory:
+        worktree = Path(directory) / sha[:12]
+        subprocess.run(
+            ['git', 'worktree', 'add', '--detach', str(worktree), sha],
+            cwd=REPOSITORY_DIRECTORY,
+            capture_output=True,
+            check=True,
+        )
+        try:
+            environment = dict(os.environ)
+            environment['PYTHONPATH'] = str(worktree / 'src')
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks', 'run', '--commit-label', sha, '--output', str(output)]
+                + list(arguments or []),
+                cwd=REPOSITORY_DIRECTORY,
+                env=environment,
+                check=True,
+            )
+        finally:
+            subprocess.run(
+                ['git', 'worktree', 'remove', '--force', str(worktree)],
+                cwd=REPOSITORY_DIRECTORY,
+                capture_output=True,
+                check=True,
+            )
+    return output
+
+
+def write_results(results: Dict[str, Any], file_path: Optional[str | Path] = None) -> Path:
+    """Write results to JSON, by default to `results/<commit>.json`."""
+    if file_path is None:
+        file_path = results_path(results['commit'] or 'HEAD')
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(file_path, 'w') as outfile:
+        json.dump(results, outfile, indent=2)
+    return file_path
+
+
+def read_results(commit_or_path: str | Path) -> Dict[str, Any]:
+    """Read results from a JSON file, or the results file of a commit."""
+    file_path = Path(commit_or_path)
+    if not file_path.is_file():
+        file_path = results_path(str(commit_or_path))
+        if not file_path.is_file():
+            raise FileNotFoundError(
+                f'No results for {commit_or_path}; run `python -m benchmarks run --commit {commit_or_path}` first.'
+            )
+    with open(file_path) as infile:
+        return json.load(infile)
+
+
+def compare_results(
+    before: Dict[str, Any],
+    after: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> pd.DataFrame:
+    """Compare the results of two runs.
+
+    A benchmark regressed when its median grew by more than `threshold` (e.g., 1.1 for 10%)
+    and, with several samples, every sample after is larger than every sample before, so that
+    noise alone does not flag a change. Improvements are flagged the same way. All kinds of
+    benchmarks are taken to be better when smaller.
+
+    Args:
+        before (Dict[str, Any]): Results of the baseline (see `run_benchmarks`).
+        after (Dict[str, Any]): Results to compare against the baseline.
+        threshold (float, optional): Ratio of medians beyond which a change is flagged.
+
+    Returns:
+        DataFrame with the benchmark, parameters, unit, medians before and after, their
+        ratio, and `change` (`regression`, `improvement` or empty) of every benchmark in both runs.
+    """
+    if threshold <= 1:
+        raise ValueError('threshold must be greater than 1.')
+    rows = []
+    for name, result in after['results'].items():
+        if name not in before['results']:
+            continue
+        baseline = {
+            tuple(entry['params']): entry
+            for entry in before['results'][name]['results']
+        }
+        for entry in result['results']:
+            previous = baseline.get(tuple(entry['params']))
+            if previous is None or previous['value'] is None or entry['value'] is None:
+                continue
+            ratio = entry['value'] / previous['value'] if previous['value'] else np.inf
+            separated = len(entry['samples']) < 2 or len(previous['samples']) < 2
+            change = ''
+            if ratio > threshold and (separated or min(entry['samples']) > max(previous['samples'])):
+                change = 'regression'
+            elif ratio < 1 / threshold and (separated or max(entry['samples']) < min(previous['samples'])):
+                change = 'improvement'
+            rows.append({
+                'benchmark': name,
+                'params': ', '.join(map(str, entry['params'])),
+                'unit': result['unit'],
+                'before': previous['value'],
+                'after': entry['value'],
+                'ratio': ratio,
+                'change': change,
+            })
+    return pd.DataFrame(rows, columns=['benchmark', 'params', 'unit', 'before', 'after', 'ratio', 'change'])
+
+
+def machine_differences(before: Dict[str, Any], after: Dict[str, Any]) -> List[str]:
+    """Machine metadata keys that differ between two runs (results are then not comparable)."""
+    keys = ['machine', 'arch', 'cpu', 'num_cpu', 'python']
+    return [key for key in keys if before['machine'].get(key) != after['machine'].get(key)]
@@ -6,3 +6,4 @@ from clearwater_riverine import variables
 from clearwater_riverine.io import hdf, inputs, outputs
 from clearwater_riverine import mesh, utilities, linalg
 from clearwater_riverine.transport import *
+from clearwater_riverine.utilities import precompile
@@ -0,0 +1,234 @@
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+import multiprocessing
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import shapely
+from matplotlib import colormaps
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import Normalize
+from matplotlib.figure import Figure
+from PIL import Image
+
+# renderer of each worker process, set by `_initialize_worker`
+_renderer = None
+
+
+def polygon_vertices(polygons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Exterior ring vertices of polygons, as flat arrays that are cheap to send to worker processes.
+
+    Args:
+        polygons (np.ndarray): Array of shapely polygons.
+
+    Returns:
+        Array of shape (vertex x 2) with the coordinates of all exterior rings, and the offset
+        of each polygon's first vertex (with the total number of vertices appended).
+    """
+    coordinates, index = shapely.get_coordinates(
+        shapely.get_exterior_ring(polygons),
+        return_index=True,
+    )
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(index, minlength=len(polygons)))])
+    return coordinates, offsets
+
+
+class FrameRenderer:
+    """Renders cell values over fixed polygons to PNG files, without `pyplot`.
+
+    The figure and polygon collection are built once; each frame only updates the
+    cell values and title before saving.
+
+    Args:
+        coordinates (np.ndarray): Polygon vertices (see `polygon_vertices`).
+        offsets (np.ndarray): Offset of each polygon's first vertex (see `polygon_vertices`).
+        clim (Tuple[float, float]): Minimum and maximum color limit values.
+        cmap (str): Colormap.
+        label (str): Colorbar label.
+        dpi (int): Resolution of the PNG files.
+    """
+    def __init__(
+        self,
+        coordinates: np.ndarray,
+        offsets: np.ndarray,
+        clim: Tuple[float, float],
+        cmap: str,
+        label: str,
+        dpi: int,
+    ):
+        self.dpi = dpi
+        self.figure = Figure(facecolor='lightgrey')
+        FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot()
+        colormap = colormaps[cmap].with_extremes(bad=(0, 0, 0, 0))
+        self.collection = PolyCollection(
+            np.split(coordinates, offsets[1:-1]),
+            cmap=colormap,
+            norm=Normalize(vmin=clim[0], vmax=clim[1]),
+            edgecolor='white',
+            linewidth=0.1,
+        )
+        self.axes.add_collection(self.collection)
+        self.axes.set_xlim(coordinates[:, 0].min(), coordinates[:, 0].max())
+        self.axes.set_ylim(coordinates[:, 1].min(), coordinates[:, 1].max())
+        self.axes.set_aspect('equal')
+        self.axes.axis('off')
+        self.figure.colorbar(self.collection, ax=self.axes, label=label)
+
+    def render(self, values: np.ndarray, title: str, path: str | Path) -> Path:
+        """Render one frame.
+
+        Args:
+            values (np.ndarray): Value of each polygon; NaN values are not drawn.
+            title (str): Frame title.
+            path (str | Path): PNG file to write.
+        """
+        self.collection.set_array(np.ma.masked_invalid(values))
+        self.axes.set_title(title)
+        self.figure.savefig(path, dpi=self.dpi, facecolor=self.figure.get_facecolor())
+        return Path(path)
+
+
+def _initialize_worker(*args):
+    global _renderer
+    _renderer = FrameRenderer(*args)
+
+
+def _render(values: np.ndarray, title: str, path: str | Path) -> Path:
+    return _renderer.render(values, title, path)
+
+
+def render_frames(
+    polygons: np.ndarray,
+    frames: Iterable[Tuple[np.ndarray, str]],
+    directory: str | Path,
+    clim: Tuple[float, float],
+    cmap: str,
+    label: str,
+    dpi: int = 100,
+    workers: Optional[int] = None,
+) -> List[Path]:
+    """Render frames to numbered PNG files with a pool of worker processes.
+
+    The polygon vertices are sent to each worker once, when it starts; each frame only sends
+    its values. Frames are read lazily from `frames`, and only a few per worker are in flight
+    at a time, so the values of all frames never have to be held in memory.
+
+    Args:
+        polygons (np.ndarray): Array of shapely polygons.
+        frames (Iterable[Tuple[np.ndarray, str]]): Value of each polygon and title, per frame.
+        directory (str | Path): Directory to write `frame_00000.png`, `frame_00001.png`, ... to.
+        clim (Tuple[float, float]): Minimum and maximum color limit values.
+        cmap (str): Colormap.
+        label (str): Colorbar label.
+        dpi (int, optional): Resolution of the PNG files.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs;
+            with 1, frames are rendered in this process.
+
+    Returns:
+        Paths of the PNG files, in frame order.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    coordinates, offsets = polygon_vertices(polygons)
+    renderer_args = (coordinates, offsets, clim, cmap, label, dpi)
+    workers = workers or os.cpu_count() or 1
+    paths = []
+
+    if workers == 1:
+        renderer = FrameRenderer(*renderer_args)
+        for i, (values, title) in enumerate(frames):
+            paths.append(renderer.render(values, title, directory / f'frame_{i:05d}.png'))
+        return paths
+
+    # spawn rather than fork: the model may have live writer threads holding locks
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_initialize_worker,
+        initargs=renderer_args,
+    ) as executor:
+        pending: Dict[Future, int] = {}
+        for i, (values, title) in enumerate(frames):
+            if len(pending) >= 2 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                    del pending[future]
+            path = directory / f'frame_{i:05d}.png'
+            pending[executor.submit(_render, np.asarray(values, dtype=np.float32), title, path)] = i
+            paths.append(path)
+        for future in pending:
+            future.result()
+    return paths
+
+
+def write_gif(paths: List[Path], output_path: str | Path, fps: float):
+    """Combine PNG frames into a looping GIF.
+
+    Args:
+        paths (List[Path]): PNG files, in frame order.
+        output_path (str | Path): GIF file to write.
+        fps (float): Frames per second.
+    """
+    if not paths:
+        raise ValueError('At least one frame is required to write a GIF.')
+    frames = (Image.open(path) for path in paths)
+    first = next(frames)
+    first.save(
+        output_path,
+        save_all=True,
+        append_images=frames,
+        duration=1000 / fps,
+        loop=0,
+    )
+
+
+def write_mp4(paths: List[Path], output_path: str | Path, fps: float):
+    """Combine numbered PNG frames (see `render_frames`) into an MP4 video with `ffmpeg`.
+
+    Args:
+        paths (List[Path]): PNG files, in frame order.
+        output_path (str | Path): MP4 file to write.
+        fps (float): Frames per second.
+    """
+    if not paths:
+        raise ValueError('At least one frame is required to write an MP4.')
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise FileNotFoundError('ffmpeg is required to write MP4 files.')
+    subprocess.run(
+        [
+            ffmpeg, '-y', '-loglevel', 'error',
+            '-framerate', str(fps),
+            '-i', str(Path(paths[0]).parent / 'frame_%05d.png'),
+            '-frames:v', str(len(paths)),
+            # H.264 with yuv420p needs even frame dimensions
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+            '-pix_fmt', 'yuv420p',
+            str(output_path),
+        ],
+        check=True,
+    )
+
+
+ANIMATION_WRITERS: Dict[str, Callable[[List[Path], str | Path, float], None]] = {
+    '.gif': write_gif,
+    '.mp4': write_mp4,
+}
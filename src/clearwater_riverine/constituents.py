@@ -1,17 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import (
     Dict,
+    List,
     Literal,
-    Optional
+    Optional,
+    Tuple,
 )
 from pathlib import Path
 import warnings
 
+import dask.array as da
 import pandas as pd
 import xarray as xr
 import numpy as np
 
 from clearwater_riverine.linalg import RHS
-from clearwater_riverine.variables import NUMBER_OF_REAL_CELLS
+from clearwater_riverine.io.inputs import read_tabular_input
+from clearwater_riverine.io.outputs import ZarrStreamWriter
+from clearwater_riverine.io.scratch import ScratchStore
+from clearwater_riverine.output_policy import OutputPolicy, OutputRecorder
+from clearwater_riverine.variables import (
+    ADVECTION_COEFFICIENT,
+    CHANGE_IN_TIME,
+    COEFFICIENT_TO_DIFFUSION_TERM,
+    EDGES_FACE1,
+    EDGES_FACE2,
+    NUMBER_OF_REAL_CELLS,
+)
+
+MassFluxMode = Literal['full', 'boundary', 'deferred', 'off']
+MASS_FLUX_MODES = ['full', 'boundary', 'deferred', 'off']
+
+
+def resolve_mass_flux_mode(
+    mass_flux: Optional[MassFluxMode],
+    policy: Optional[OutputPolicy] = None,
+) -> MassFluxMode:
+    """Mass flux mode of a run: `full` by default, or `off` with an output policy.
+
+    An output policy never stores mass fluxes, and only keeps selected concentrations, so
+    mass fluxes across every edge could neither be output nor be calculated after the run.
+
+    Args:
+        mass_flux (str, optional): Requested mode (`full`, `boundary`, `deferred` or `off`).
+        policy (OutputPolicy, optional): Selection of results to store.
+    """
+    if mass_flux is None:
+        return 'full' if policy is None else 'off'
+    if mass_flux not in MASS_FLUX_MODES:
+        raise ValueError(f'mass_flux must be one of {MASS_FLUX_MODES}.')
+    if policy is not None and mass_flux in ['full', 'deferred']:
+        raise ValueError(
+            f"mass_flux='{mass_flux}' cannot be used with an output policy; use 'boundary' or 'off'."
+        )
+    return mass_flux
+
+
+def _boundary_series_to_model_time(
+    bc_df: pd.DataFrame,
+    model_time: np.ndarray,
+) -> Tuple[pd.Index, np.ndarray]:
+    """Map every boundary condition timeseries onto the model time axis.
+
+    Each model timestep takes the most recent boundary condition value at or
+    before it (as `pd.merge_asof` would); gaps are then filled by linear
+    interpolation. All timeseries are handled in a single pass: each row in
+    `bc_df` is assigned the run of model timesteps it governs using
+    `np.searchsorted`.
+
+    Args:
+        bc_df (pd.DataFrame): Boundary conditions with `RAS2D_TS_Name`, `Datetime`
+            and `Concentration` columns.
+        model_time (np.ndarray): Model timesteps.
+
+    Returns:
+        names (pd.Index): Name of each boundary condition timeseries.
+        values (np.ndarray): Array of shape (time x timeseries) of concentrations. 
+            Model timesteps before the first boundary condition value are NaN.
+    """
+    bc_df = bc_df.sort_values(['RAS2D_TS_Name', 'Datetime'], kind='stable')
+    codes, names = pd.factorize(bc_df['RAS2D_TS_Name'], sort=True)
+    names = pd.Index(names)
+    bc_time = bc_df['Datetime'].values.astype('datetime64[ns]')
+    model_time = np.asarray(model_time).astype('datetime64[ns]')
+
+    # first model timestep governed by each row, and by the next row in the same series
+    start = np.searchsorted(model_time, bc_time, side='left')
+    end = np.full(len(start), len(model_time))
+    same_series = codes[1:] == codes[:-1]
+    end[:-1][same_series] = start[1:][same_series]
+    lengths = np.maximum(end - start, 0)
+
+    # expand each row over its run of model timesteps
+    row = np.repeat(np.arange(len(start)), lengths)
+    offset = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    values = np.full((len(model_time), len(names)), np.nan)
+    values[start[row] + offset, codes[row]] = bc_df['Concentration'].values[row]
+
+    # fill gaps left by missing concentrations
+    values = pd.DataFrame(values).interpolate(method='linear').values
+    return names, values
+
+
+def boundary_edges(mesh: xr.Dataset) -> np.ndarray:
+    """Indices of the edges between a real cell and a ghost cell."""
+    nreal = mesh.attrs[NUMBER_OF_REAL_CELLS]
+    return np.flatnonzero(
+        (mesh[EDGES_FACE1].values > nreal) | (mesh[EDGES_FACE2].values > nreal)
+    )
+
+
+def calculate_mass_flux(
+    mesh: xr.Dataset,
+    concentrations: np.ndarray,
+    start: int,
+    edges: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculate advective and diffusive mass fluxes across edges for a block of timesteps.
+
+    The mass flux at timestep t uses the hydrodynamics at timestep t and the concentrations
+    at timestep t + 1 (i.e., the solution of timestep t). Only the requested block of
+    hydrodynamics is read, so this also works on lazily loaded model meshes.
+
+    Args:
+        mesh (xr.Dataset): Unstructured model mesh.
+        concentrations (np.ndarray): Array of shape (... x n x nface) with concentrations
+            at timesteps start + 1 to start + n.
+        start (int): First timestep of the block.
+        edges (np.ndarray, optional): Indices of the edges. Defaults to all edges.
+
+    Returns:
+        advection_mass_flux (np.ndarray): Array of shape (... x n x edges).
+        diffusion_mass_flux (np.ndarray): Array of shape (... x n x edges).
+    """
+    end = start + concentrations.shape[-2]
+    advection_coefficient = np.asarray(mesh[ADVECTION_COEFFICIENT].data[start:end])
+    diffusion_coefficient = np.asarray(mesh[COEFFICIENT_TO_DIFFUSION_TERM].data[start:end])
+    delta_time = np.asarray(mesh[CHANGE_IN_TIME].data[start:end])[:, np.newaxis]
+    parent_cells = mesh[EDGES_FACE1].values
+    neighbor_cells = mesh[EDGES_FACE2].values
+    if edges is not None:
+        advection_coefficient = advection_coefficient[:, edges]
+        diffusion_coefficient = diffusion_coefficient[:, edges]
+        parent_cells = parent_cells[edges]
+        neighbor_cells = neighbor_cells[edges]
+    parent_concentration = concentrations[..., parent_cells]
+    neighbor_concentration = concentrations[..., neighbor_cells]
+
+    advection_mass_flux = np.where(
+        advection_coefficient < 0,
+        advection_coefficient * neighbor_concentration,
+        advection_coefficient * parent_concentration,
+    ) * delta_time
+    diffusion_mass_flux = diffusion_coefficient * \
+        (neighbor_concentration - parent_concentration) * \
+        delta_time
+    return advection_mass_flux, diffusion_mass_flux
+
 
 
 class Constituent:
@@ -22,31 +167,71 @@ class Constituent:
         mesh: xr.Dataset,
         flow_field_boundaries: Optional[pd.DataFrame] = None,
         constituent_config: Optional[Dict] = None,
-        method: Optional[Literal['initialize', 'load']] = 'initialize',
+        method: Optional[Literal['initialize', 'load', 'restore']] = 'initialize',
+        time_chunk: Optional[int] = None,
+        scratch: Optional[ScratchStore] = None,
     ):
+        """
+        Args:
+            name (str): Constituent name.
+            mesh (xr.Dataset): Unstructured model mesh.
+            flow_field_boundaries (pd.DataFrame, optional): pandas dataframe definining how the 
+                boundaries are configured within the flow field.
+            constituent_config (Dict, optional): Constituent configuration (`units`, `initial_conditions`
+                and `boundary_conditions`).
+            method (str, optional): `initialize` from user inputs, `load` from a saved model mesh,
+                or `restore` from a checkpoint (inputs are then set by `ConstituentSet.restore`).
+            time_chunk (int, optional): If given, the constituent history in the model mesh
+                is allocated lazily as a dask array with this many timesteps per chunk, rather
+                than in memory (e.g., because results are streamed to disk).
+            scratch (ScratchStore, optional): If given (and no `time_chunk`), the constituent
+                history is allocated as a memory-mapped array in this store.
+        """
         self.name = name
-        self.advection_mass_flux = np.zeros((len(mesh.time), len(mesh.nedge)))
-        self.diffusion_mass_flux = np.zeros((len(mesh.time), len(mesh.nedge)))
-        self.total_mass_flux = np.zeros((len(mesh.time), len(mesh.nedge)))
-        self.input_array = np.zeros((len(mesh.time), len(mesh.nface)))
+        # views into the mass flux arrays of all constituents, set by `ConstituentSet`
+        self.advection_mass_flux = None
+        self.diffusion_mass_flux = None
+        self.total_mass_flux = None
+        self.flux_edges = None
+
+        # compact storage of user inputs: initial conditions in every cell
+        # and boundary conditions in the ghost cells only (time x boundary cell)
+        self.initial_conditions = np.zeros(len(mesh.nface))
+        self.boundary_cells = np.array([], dtype=int)
+        self.boundary_values = np.zeros((len(mesh.time), 0))
         # TODO: make units optional
-        if method == 'initialize':
+        if method in ['initialize', 'restore']:
             self.units = constituent_config['units']
             self.max_value = None
             self.min_value = None
 
             # add to model mesh
-            mesh[self.name] = xr.DataArray(
-                np.full(
+            if time_chunk is None and scratch is not None:
+                history = scratch.full(
+                    self.name,
+                    (len(mesh.time), len(mesh.nface)),
+                    np.nan,
+                )
+            elif time_chunk is None:
+                history = np.full(
                     (len(mesh.time), len(mesh.nface)),
                     np.nan
-                ),
+                )
+            else:
+                history = da.full(
+                    (len(mesh.time), len(mesh.nface)),
+                    np.nan,
+                    chunks=(time_chunk, len(mesh.nface)),
+                )
+            mesh[self.name] = xr.DataArray(
+                history,
                 dims = ('time', 'nface'),
                 attrs = {
                     'Units': f'{self.units}'
                 }
             )
 
+        if method == 'initialize':
             # define initial and boundary conditions
             self.set_initial_conditions(
                 filepath=constituent_config['initial_conditions'],
@@ -58,10 +243,13 @@ class Constituent:
                 flow_field_boundaries=flow_field_boundaries,
             )
 
+        if method in ['initialize', 'restore']:
             # set up RHS matrix
             self.b = RHS(
                 mesh=mesh,
-                input_array=self.input_array,
+                initial_conditions=self.initial_conditions,
+                boundary_cells=self.boundary_cells,
+                boundary_values=self.boundary_values,
             )
         elif method == 'load':
             try:
@@ -77,97 +265,692 @@ class Constituent:
 
     def set_initial_conditions(
         self,
-        filepath: str | Path,
+        filepath: str | Path | pd.DataFrame,
         mesh: xr.Dataset
     ):
-        """Define initial conditions for costituents from CSV file. 
+        """Define initial conditions for costituents from a CSV, Parquet or Arrow file. 
 
         Args:
-            filepath (str): Filepath to a CSV containing initial conditions.
-                The CSV should have two columns: one called `Cell_Index` and
+            filepath (str): Filepath to a CSV (or Parquet / Arrow file) containing initial conditions.
+                The file should have two columns: one called `Cell_Index` and
                 one called `Concentration`. The file should the concentration
                 in each cell within the model domain at the first timestep. 
         """
-        initial_condition_df = pd.read_csv(filepath)
-        initial_condition_df['Cell_Index'] = initial_condition_df.Cell_Index.astype(int)
-        self.input_array[0, [initial_condition_df['Cell_Index']]] =  initial_condition_df['Concentration']
+        initial_condition_df = read_tabular_input(filepath)
+        cell_index = initial_condition_df['Cell_Index'].values.astype(int)
+        self.initial_conditions[cell_index] = initial_condition_df['Concentration'].values
         mesh[self.name].loc[
             {
                 'time': mesh['time'][0],
             }
-        ] = self.input_array[0]
+        ] = self.initial_conditions
 
     def set_boundary_conditions(
         self,
-        filepath: str | Path,
+        filepath: str | Path | pd.DataFrame,
         mesh: xr.Dataset,
         flow_field_boundaries: pd.DataFrame
     ):
-        """Define boundary conditions for Clearwater Riverine model from a CSV file. 
+        """Define boundary conditions for Clearwater Riverine model from a CSV, Parquet or Arrow file. 
 
         Args:
-            filepath (str): Filepath to a CSV containing boundary conditions. 
-                The CSV should have the following columns: `RAS2D_TS_Name` 
+            filepath (str): Filepath to a CSV (or Parquet / Arrow file) containing boundary conditions. 
+                The file should have the following columns: `RAS2D_TS_Name` 
                 (the timeseries name, as labeled in the HEC-RAS model), `Datetime`,
                 `Concentration`. This file should contain the concentration for all
                 relevant boundary cells at every RAS timestep. If a timestep / boundary
-                cell is not included in this CSV file, the concentration will be set to 0
+                cell is not included in this file, the concentration will be set to 0
                 in the Clearwater Riverine model. 
             mesh (xr.Dataset): Unstructured model mesh.
             flow_field_boundaries (pd.DataFrame): pandas dataframe definining how the 
                 boundaries are configured within the flow field.
         """
         # Read in boundary condition data from user
-        bc_df = pd.read_csv(
+        bc_df = read_tabular_input(
             filepath,
             parse_dates=['Datetime']
         )
 
-        xarray_time_index = pd.DatetimeIndex(
-            mesh.time.values
+        # Put every boundary timeseries on the model time axis at once
+        boundary_names, series_values = _boundary_series_to_model_time(
+            bc_df,
+            mesh.time.values,
         )
-        model_dataframe = pd.DataFrame({
-            'Datetime': xarray_time_index,
-            'Time Index': range(len(xarray_time_index))
-        })
-
-        result_df = pd.DataFrame()
-        for boundary, group_df in bc_df.groupby('RAS2D_TS_Name'):
-            # Merge with model timestep
-            merged_group = pd.merge_asof(
-                model_dataframe,
-                group_df,
-                on='Datetime'
-            )
-            # Interpolate
-            merged_group['Concentration'] = merged_group['Concentration'].interpolate(
-                method='linear'
-            )
-            # Append to dataframe
-            result_df = pd.concat(
-                [result_df, merged_group], 
-                ignore_index=True
+
+        # Identify the ghost cell on the far side of each boundary face
+        boundary_faces = flow_field_boundaries[
+            flow_field_boundaries['Name'].isin(boundary_names)
+        ]
+        missing = set(boundary_names) - set(boundary_faces['Name'])
+        if missing:
+            raise ValueError(
+                f'Boundary conditions {sorted(missing)} are not defined in the flow field.'
             )
-        
-        # Merge with boundary data
-        boundary_df = pd.merge(
-            result_df,
-            flow_field_boundaries,
-            left_on = 'RAS2D_TS_Name',
-            right_on = 'Name',
-            how='left'
-        )
-        boundary_df['Ghost Cell'] = mesh.edges_face2[boundary_df['Face Index'].to_list()]
-        boundary_df['Domain Cell'] = mesh.edges_face1[boundary_df['Face Index'].to_list()]
+        series_index = boundary_names.get_indexer(boundary_faces['Name'])
+        ghost_cells = mesh[EDGES_FACE2].values[boundary_faces['Face Index'].values]
+
+        # Assign to appropriate position in the (time x boundary cell) array
+        self.boundary_cells = np.unique(ghost_cells)
+        self.boundary_values = np.zeros((len(mesh.time), len(self.boundary_cells)))
+        self.boundary_values[
+            :,
+            np.searchsorted(self.boundary_cells, ghost_cells)
+        ] = series_values[:, series_index]
+
+    def boundary_input(self, t: int):
+        """Boundary concentrations supplied by the user at timestep t.
 
-        # Assign to appropriate position in array
-        self.input_array[[boundary_df['Time Index']], [boundary_df['Ghost Cell']]] = boundary_df['Concentration']
+        Only non-zero values are returned; ghost cells without a user-defined
+        boundary condition are not included.
+
+        Args:
+            t (int): Timestep.
+
+        Returns:
+            cells (np.ndarray): Indices of the ghost cells.
+            values (np.ndarray): Concentration in each of those ghost cells.
+        """
+        values = self.boundary_values[t]
+        nonzero = values != 0
+        return self.boundary_cells[nonzero], values[nonzero]
     
+    def flux_columns(self, edges: np.ndarray) -> np.ndarray:
+        """Columns of the mass flux arrays that hold the given edges.
+
+        Args:
+            edges (np.ndarray): Edge indices.
+        """
+        edges = np.asarray(edges, dtype=int)
+        columns = np.searchsorted(self.flux_edges, edges)
+        stored = columns < len(self.flux_edges)
+        stored[stored] = self.flux_edges[columns[stored]] == edges[stored]
+        if not stored.all():
+            raise ValueError(
+                f'Mass fluxes of {self.name} are not stored for edges {edges[~stored].tolist()}.'
+            )
+        return columns
+
     ## TODO: probably a more elegant way to do this
     def set_value_range(
         self,
-        mesh: xr.Dataset
+        mesh: xr.Dataset,
+        minimum: Optional[np.ndarray] = None,
+        maximum: Optional[np.ndarray] = None,
     ):
+        """Set the range of values in the real cells, e.g., for color limits.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+            minimum (np.ndarray, optional): Running minimum in each cell. If given with `maximum`,
+                it is used instead of scanning the history in the model mesh.
+            maximum (np.ndarray, optional): Running maximum in each cell.
+        """
+        if minimum is not None and maximum is not None:
+            nreal_index = mesh.attrs[NUMBER_OF_REAL_CELLS] + 1
+            self.max_value = int(np.nanmax(maximum[0:nreal_index]))
+            self.min_value = int(np.nanmin(minimum[0:nreal_index]))
+            return
         self.max_value = int(mesh[self.name].sel(nface=slice(0, mesh.attrs[NUMBER_OF_REAL_CELLS])).max())
         self.min_value = int(mesh[self.name].sel(nface=slice(0, mesh.attrs[NUMBER_OF_REAL_CELLS])).min())
 
+
+class ConstituentSet:
+    """Collection of constituents that are transported together.
+
+    The concentrations of all constituents at the current timestep are held in a single
+    contiguous (constituent x nface) array, and the mass fluxes in (constituent x time x nedge)
+    arrays. This allows the per-timestep work (building the right hand side, solving the
+    sparse system and calculating mass fluxes) to be done once for all constituents rather
+    than in a Python loop over constituents.
+
+    Solutions are written by position to a preallocated (constituent x sync_every x nface)
+    buffer and flushed to the model mesh every `sync_every` timesteps, or when `flush` is called.
+    If a `writer` is given, buffered solutions are streamed to disk instead, and the constituent
+    history in the model mesh is read back lazily from the written store. If a `policy` is given,
+    only the selected timesteps, cells and constituents are stored (see `OutputPolicy`).
+
+    Mass fluxes are calculated according to `mass_flux`:
+
+    - `full`: every timestep, across every edge.
+    - `boundary`: every timestep, only across edges between real and ghost cells. The columns
+      of the mass flux arrays then correspond to `flux_edges`.
+    - `deferred`: in a single vectorized pass over the stored concentrations when
+      `calculate_mass_flux` is called, e.g., after the run.
+    - `off`: not calculated.
+
+    Args:
+        sync_every (int, optional): Number of timesteps between writes to the model mesh
+            (or, with a `policy`, number of stored timesteps between writes).
+        writer (ZarrStreamWriter, optional): Writer to stream results to.
+        stream_mass_flux (bool, optional): Whether to also stream mass fluxes. Only used with a `writer`.
+        policy (OutputPolicy, optional): Selection of results to store.
+        scratch (ScratchStore, optional): Store for memory-mapped constituent histories and mass fluxes.
+        mass_flux (str, optional): When and where mass fluxes are calculated: `full`, `boundary`,
+            `deferred` or `off`. Defaults to `full`, or to `off` with a `policy` (see `resolve_mass_flux_mode`).
+
+    Attributes:
+        constituents (Dict[str, Constituent]): Constituents in the set, keyed by name.
+        values (np.ndarray): Concentrations of all constituents at the current timestep.
+        minimum (np.ndarray): Running minimum of each constituent in each cell (NaN where never defined).
+        maximum (np.ndarray): Running maximum of each constituent in each cell (NaN where never defined).
+        b (RHS): Right hand side for all constituents.
+    """
+    def __init__(
+        self,
+        sync_every: int = 1,
+        writer: Optional[ZarrStreamWriter] = None,
+        stream_mass_flux: bool = False,
+        policy: Optional[OutputPolicy] = None,
+        scratch: Optional[ScratchStore] = None,
+        mass_flux: Optional[MassFluxMode] = None,
+    ):
+        if sync_every < 1:
+            raise ValueError('sync_every must be a positive integer.')
+        mass_flux = resolve_mass_flux_mode(mass_flux, policy)
+        if policy is not None and stream_mass_flux:
+            raise ValueError('Mass fluxes cannot be streamed with an output policy.')
+        if stream_mass_flux and mass_flux != 'full':
+            raise ValueError("Mass fluxes can only be streamed with mass_flux='full'.")
+        self.constituents = {}
+        self.values = None
+        self.b = None
+        self.sync_every = sync_every
+        self.buffer = None
+        self.buffer_start = 0
+        self.buffer_count = 0
+        self.writer = writer
+        self.stream_mass_flux = stream_mass_flux
+        self.flux_start = 0
+        self.flux_count = 0
+        self.policy = policy
+        self.recorder = None
+        self.scratch = scratch
+        self.mass_flux_mode = mass_flux
+        self.flux_edges = None
+        self.minimum = None
+        self.maximum = None
+
+    @property
+    def _time_chunk(self) -> Optional[int]:
+        """Chunk size of lazily allocated constituent histories (None when held in memory)."""
+        if self.writer is None and self.policy is None:
+            return None
+        return self.sync_every
+
+    @property
+    def names(self) -> List[str]:
+        """Names of the constituents, in storage order."""
+        return list(self.constituents.keys())
+
+    def __len__(self) -> int:
+        return len(self.constituents)
+
+    def __getitem__(self, name: str) -> Constituent:
+        return self.constituents[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.constituents
+
+    def items(self):
+        return self.constituents.items()
+
+    def register(
+        self,
+        mesh: xr.Dataset,
+        constituent_configs: Dict[str, Dict],
+        flow_field_boundaries: pd.DataFrame,
+        max_workers: Optional[int] = None,
+    ):
+        """Register many constituents at once.
+
+        Initial and boundary condition files for all constituents are read in parallel
+        (files shared by several constituents are only read once), and the constituents
+        are then added to the model mesh.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+            constituent_configs (Dict[str, Dict]): Configuration of each constituent, keyed by name.
+                Each configuration needs `units`, `initial_conditions` and `boundary_conditions`.
+            flow_field_boundaries (pd.DataFrame): pandas dataframe definining how the 
+                boundaries are configured within the flow field.
+            max_workers (int, optional): Number of threads used to read input files. 
+        """
+        inputs = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for config in constituent_configs.values():
+                for key, parse_dates in [
+                    ('initial_conditions', None),
+                    ('boundary_conditions', ['Datetime']),
+                ]:
+                    filepath = config[key]
+                    if not isinstance(filepath, pd.DataFrame) and (key, filepath) not in inputs:
+                        inputs[(key, filepath)] = executor.submit(
+                            read_tabular_input,
+                            filepath,
+                            parse_dates,
+                        )
+            inputs = {key: future.result() for key, future in inputs.items()}
+
+        for name, config in constituent_configs.items():
+            config = dict(config)
+            for key in ['initial_conditions', 'boundary_conditions']:
+                if not isinstance(config[key], pd.DataFrame):
+                    config[key] = inputs[(key, config[key])]
+            self.constituents[name] = Constituent(
+                name=name,
+                mesh=mesh,
+                constituent_config=config,
+                flow_field_boundaries=flow_field_boundaries,
+                time_chunk=self._time_chunk,
+                scratch=self.scratch,
+            )
+        if len(self.constituents) > 0:
+            self._stack(mesh)
+            self._open_stream(mesh)
+
+    def load(
+        self,
+        mesh: xr.Dataset,
+        names: List[str],
+    ):
+        """Register constituents from a previously saved model mesh.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+            names (List[str]): Names of the constituents in the mesh.
+        """
+        for name in names:
+            self.constituents[name] = Constituent(
+                name=name,
+                mesh=mesh,
+                method='load',
+            )
+        if len(self.constituents) > 0:
+            self._allocate_mass_flux(mesh)
+
+    def restore(
+        self,
+        mesh: xr.Dataset,
+        checkpoint: xr.Dataset,
+    ):
+        """Register constituents from a checkpoint, to continue a simulation.
+
+        The first timestep of the model mesh must be the timestep the checkpoint was written at.
+        The concentrations in the checkpoint become the initial conditions, and the boundary
+        conditions are taken from the checkpoint rather than re-read from user inputs.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+            checkpoint (xr.Dataset): Checkpoint dataset (see `clearwater_riverine.io.checkpoint`).
+        """
+        if not np.array_equal(
+            mesh.time.values,
+            checkpoint.time.values.astype(mesh.time.dtype),
+        ):
+            raise ValueError('The model time does not match the time in the checkpoint.')
+
+        boundary_cells = checkpoint['boundary_cells'].values.astype(int)
+        for i, name in enumerate(checkpoint.constituent.values):
+            name = str(name)
+            constituent = Constituent(
+                name=name,
+                mesh=mesh,
+                constituent_config={'units': str(checkpoint.units.values[i])},
+                method='restore',
+                time_chunk=self._time_chunk,
+                scratch=self.scratch,
+            )
+            constituent.initial_conditions = checkpoint['concentration'].values[i].copy()
+            constituent.boundary_cells = boundary_cells
+            constituent.boundary_values = checkpoint['boundary_values'].values[:, i, :]
+            mesh[name].loc[
+                {
+                    'time': mesh['time'][0],
+                }
+            ] = constituent.initial_conditions
+            self.constituents[name] = constituent
+        if len(self.constituents) > 0:
+            self._stack(mesh)
+            self._open_stream(mesh)
+
+    def _stack(self, mesh: xr.Dataset):
+        """Gather the inputs, state and mass fluxes of all constituents into contiguous arrays.
+
+        The per-constituent attributes become views into the stacked arrays, so they can still
+        be used as before.
+        """
+        constituents = list(self.constituents.values())
+        initial_conditions = np.stack([c.initial_conditions for c in constituents])
+
+        boundary_cells = np.unique(
+            np.concatenate([c.boundary_cells for c in constituents])
+        ).astype(int)
+        boundary_values = np.zeros((len(mesh.time), len(constituents), len(boundary_cells)))
+        for i, constituent in enumerate(constituents):
+            boundary_values[
+                :, i, np.searchsorted(boundary_cells, constituent.boundary_cells)
+            ] = constituent.boundary_values
+
+        self._allocate_mass_flux(mesh)
+        for i, constituent in enumerate(constituents):
+            constituent.initial_conditions = initial_conditions[i]
+            constituent.boundary_cells = boundary_cells
+            constituent.boundary_values = boundary_values[:, i, :]
+            constituent.b.initial_conditions = constituent.initial_conditions
+            constituent.b.boundary_cells = constituent.boundary_cells
+            constituent.b.boundary_values = constituent.boundary_values
+
+        self.values = initial_conditions.copy()
+        self.minimum = initial_conditions.copy()
+        self.maximum = initial_conditions.copy()
+        self.buffer = np.empty((len(constituents), self.sync_every, len(mesh.nface)))
+        self.buffer_start = 0
+        self.buffer_count = 0
+        self.b = RHS(
+            mesh=mesh,
+            initial_conditions=initial_conditions,
+            boundary_cells=boundary_cells,
+            boundary_values=boundary_values,
+        )
+
+    def _allocate_mass_flux(self, mesh: xr.Dataset):
+        """Allocate the mass flux arrays of all constituents, for the edges `mass_flux` stores.
+
+        The mass flux attributes of each constituent become views into these arrays.
+        """
+        if self.mass_flux_mode == 'boundary':
+            self.flux_edges = boundary_edges(mesh)
+        elif self.mass_flux_mode == 'off':
+            self.flux_edges = np.array([], dtype=int)
+        else:
+            self.flux_edges = np.arange(len(mesh.nedge))
+        flux_shape = (len(self.constituents), len(mesh.time), len(self.flux_edges))
+        if self.scratch is None:
+            self.advection_mass_flux = np.zeros(flux_shape)
+            self.diffusion_mass_flux = np.zeros(flux_shape)
+            self.total_mass_flux = np.zeros(flux_shape)
+        else:
+            self.advection_mass_flux = self.scratch.zeros('advection_mass_flux', flux_shape)
+            self.diffusion_mass_flux = self.scratch.zeros('diffusion_mass_flux', flux_shape)
+            self.total_mass_flux = self.scratch.zeros('total_mass_flux', flux_shape)
+
+        for i, constituent in enumerate(self.constituents.values()):
+            constituent.advection_mass_flux = self.advection_mass_flux[i]
+            constituent.diffusion_mass_flux = self.diffusion_mass_flux[i]
+            constituent.total_mass_flux = self.total_mass_flux[i]
+            constituent.flux_edges = self.flux_edges
+
+    def _open_stream(self, mesh: xr.Dataset):
+        """Create the output store, write the initial conditions, and release the in-memory history."""
+        if self.policy is not None:
+            self.recorder = OutputRecorder(
+                policy=self.policy,
+                mesh=mesh,
+                names=self.names,
+                units=[constituent.units for constituent in self.constituents.values()],
+                block_size=self.sync_every,
+                writer=self.writer,
+            )
+            self.recorder.record(0, self.values)
+            return
+        if self.writer is None:
+            return
+        streamed = {name: mesh[name] for name in self.constituents}
+        if self.stream_mass_flux:
+            for name in self.constituents:
+                for flux in self._mass_flux_variables(name):
+                    streamed[flux] = xr.DataArray(
+                        da.zeros(
+                            (len(mesh.time), len(mesh.nedge)),
+                            chunks=(self.sync_every, len(mesh.nedge)),
+                        ),
+                        dims=('time', 'nedge'),
+                    )
+        self.writer.open(mesh, streamed)
+        self._store(mesh, 0, self.values[:, np.newaxis].copy())
+        if self.stream_mass_flux:
+            # mass fluxes are not calculated at the last timestep
+            self.writer.write(
+                len(mesh.time) - 1,
+                {flux: np.zeros((1, len(mesh.nedge))) for flux in streamed if flux not in self.constituents},
+            )
+        for name in self.constituents:
+            mesh[name] = self.writer.read(name)
+
+    @staticmethod
+    def _mass_flux_variables(name: str) -> List[str]:
+        """Names of the streamed advection, diffusion and total mass flux variables of a constituent."""
+        return [f'{name}_{flux}_mass_flux' for flux in ['advection', 'diffusion', 'total']]
+
+    def index(self, names: List[str]) -> np.ndarray:
+        """Position of each constituent in the stacked arrays.
+
+        Args:
+            names (List[str]): Constituent names.
+        """
+        positions = {name: i for i, name in enumerate(self.constituents)}
+        return np.array([positions[name] for name in names], dtype=int)
+
+    def get(self, names: Optional[List[str]] = None) -> np.ndarray:
+        """Get the current concentrations of several constituents.
+
+        Args:
+            names (List[str], optional): Constituent names. Defaults to all constituents.
+
+        Returns:
+            values (np.ndarray): Array of shape (len(names) x nface).
+        """
+        if names is None:
+            return self.values.copy()
+        return self.values[self.index(names)]
+
+    def set(self, names: List[str], values: np.ndarray):
+        """Override the current concentrations of several constituents.
+
+        Args:
+            names (List[str]): Constituent names.
+            values (np.ndarray): Array of shape (len(names) x n), where n <= nface.
+                Values are assigned to the first n cells.
+        """
+        values = np.atleast_2d(np.asarray(values))
+        self.values[self.index(names), 0:values.shape[-1]] = values
+
+    def advance(
+        self,
+        mesh: xr.Dataset,
+        t: int,
+        solution: np.ndarray,
+    ):
+        """Store the solution for timestep t + 1 as the current concentrations.
+
+        Real cells take the solution of the sparse system; ghost cells take any non-zero
+        user-defined boundary conditions, and are otherwise undefined (NaN).
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+            t (int): Timestep that was solved.
+            solution (np.ndarray): Array of shape (constituent x nreal) with concentrations at t + 1.
+        """
+        values = np.full(self.values.shape, np.nan)
+        values[:, 0:solution.shape[-1]] = solution
+        boundary_values = self.b.boundary_values[t + 1]
+        values[:, self.b.boundary_cells] = np.where(
+            boundary_values != 0,
+            boundary_values,
+            np.nan,
+        )
+        self.values = values
+        self._update_range()
+
+        if self.recorder is not None:
+            self.recorder.record(t + 1, values)
+            return
+
+        # hold on to the solution until the next write to the model mesh
+        if self.buffer_count == 0:
+            self.buffer_start = t + 1
+        self.buffer[:, self.buffer_count] = values
+        self.buffer_count += 1
+        if self.buffer_count == self.sync_every:
+            self.flush(mesh)
+
+    def flush(self, mesh: xr.Dataset):
+        """Write buffered solutions to the model mesh (or stream them to disk).
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+        """
+        if self.recorder is not None:
+            self.recorder.flush()
+
+        if self.buffer_count > 0:
+            self._store(mesh, self.buffer_start, self.buffer[:, 0:self.buffer_count].copy())
+            self.buffer_count = 0
+
+        if self.writer is not None and self.stream_mass_flux and self.flux_count > self.flux_start:
+            rows = slice(self.flux_start, self.flux_count)
+            data = {}
+            for i, name in enumerate(self.constituents):
+                advection, diffusion, total = self._mass_flux_variables(name)
+                data[advection] = self.advection_mass_flux[i, rows].copy()
+                data[diffusion] = self.diffusion_mass_flux[i, rows].copy()
+                data[total] = self.total_mass_flux[i, rows].copy()
+            self.writer.write(self.flux_start, data)
+            self.flux_start = self.flux_count
+
+    def wait(self):
+        """Block until results streamed to disk are written."""
+        if self.writer is not None:
+            self.writer.wait()
+
+    def sync(self, mesh: xr.Dataset):
+        """Commit all buffered results and make them available in the model mesh.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+        """
+        self.flush(mesh)
+        self.wait()
+        if self.recorder is not None:
+            self.recorder.update_mesh(mesh)
+
+    def output(self, mesh: xr.Dataset) -> xr.Dataset:
+        """Stored results.
+
+        Without an output policy, this is the model mesh itself. With a policy, it is a dataset of
+        the selected constituents with dimensions (stored timestep x stored cell).
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+        """
+        self.sync(mesh)
+        if self.recorder is None:
+            return mesh
+        return self.recorder.output()
+
+    def store_current(self, mesh: xr.Dataset, t: int):
+        """Store the current concentrations (timestep t) again, e.g., after they were overridden.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+            t (int): Current timestep.
+        """
+        self._update_range()
+        if self.recorder is not None:
+            self.recorder.store_current(t, self.values)
+        elif self.buffer_count > 0 and self.buffer_start + self.buffer_count - 1 == t:
+            self.buffer[:, self.buffer_count - 1] = self.values
+        else:
+            self._store(mesh, t, self.values[:, np.newaxis].copy())
+
+    def _update_range(self):
+        """Include the current concentrations in the running minimum and maximum."""
+        np.fmin(self.minimum, self.values, out=self.minimum)
+        np.fmax(self.maximum, self.values, out=self.maximum)
+
+    def set_value_range(self, mesh: xr.Dataset, names: List[str]):
+        """Set the range of values of constituents, from the running minimum and maximum when available.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+            names (List[str]): Constituent names.
+        """
+        for name in names:
+            constituent = self.constituents[name]
+            if self.minimum is None:
+                constituent.set_value_range(mesh)
+            else:
+                i = self.index([name])[0]
+                constituent.set_value_range(mesh, self.minimum[i], self.maximum[i])
+
+    def _store(self, mesh: xr.Dataset, start: int, block: np.ndarray):
+        """Write a (constituent x time x nface) block of concentrations, starting at timestep `start`."""
+        if self.writer is not None:
+            self.writer.write(
+                start,
+                {name: block[i] for i, name in enumerate(self.constituents)},
+            )
+        else:
+            end = start + block.shape[1]
+            for i, name in enumerate(self.constituents):
+                mesh[name].values[start:end] = block[i]
+
+    def mass_flux(self, mesh: xr.Dataset, t: int):
+        """Calculates mass flux across cell boundaries for all constituents.
+
+        Uses the current concentrations, i.e., the concentrations at timestep t + 1.
+        Does nothing when mass fluxes are deferred or off.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+            t (int): Timestep that was solved.
+        """
+        if self.mass_flux_mode in ['deferred', 'off']:
+            return
+        advection_mass_flux, diffusion_mass_flux = calculate_mass_flux(
+            mesh,
+            self.values[:, np.newaxis],
+            t,
+            edges=self.flux_edges if self.mass_flux_mode == 'boundary' else None,
+        )
+        self.advection_mass_flux[:, t] = advection_mass_flux[:, 0]
+        self.diffusion_mass_flux[:, t] = diffusion_mass_flux[:, 0]
+        self.total_mass_flux[:, t] = self.advection_mass_flux[:, t] + self.diffusion_mass_flux[:, t]
+        self.flux_count = t + 1
+
+    def calculate_mass_flux(
+        self,
+        mesh: xr.Dataset,
+        end: int,
+        block_size: int = 256,
+    ):
+        """Calculate mass fluxes from the concentrations stored in the model mesh.
+
+        Fills in the mass fluxes of timesteps that have not been calculated yet, up to (but not
+        including) timestep `end`, in vectorized blocks of timesteps. Used when mass fluxes are
+        deferred, or for model meshes loaded from disk.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+            end (int): Timestep to calculate mass fluxes up to.
+            block_size (int, optional): Number of timesteps calculated at once.
+        """
+        if self.mass_flux_mode == 'off':
+            raise ValueError("Mass fluxes are not calculated with mass_flux='off'.")
+        if self.recorder is not None:
+            raise ValueError('Mass fluxes cannot be calculated when an output policy selects the results.')
+        self.sync(mesh)
+        edges = self.flux_edges if self.mass_flux_mode == 'boundary' else None
+        for start in range(self.flux_count, end, block_size):
+            stop = min(start + block_size, end)
+            for name, constituent in self.constituents.items():
+                advection_mass_flux, diffusion_mass_flux = calculate_mass_flux(
+                    mesh,
+                    np.asarray(mesh[name].data[start + 1:stop + 1]),
+                    start,
+                    edges=edges,
+                )
+                constituent.advection_mass_flux[start:stop] = advection_mass_flux
+                constituent.diffusion_mass_flux[start:stop] = diffusion_mass_flux
+                constituent.total_mass_flux[start:stop] = advection_mass_flux + diffusion_mass_flux
+        self.flux_count = max(self.flux_count, end)
@@ -0,0 +1,135 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from scipy.sparse import csr_matrix
+
+from clearwater_riverine.variables import (
+    ADVECTION_COEFFICIENT,
+    CHANGE_IN_TIME,
+    COEFFICIENT_TO_DIFFUSION_TERM,
+    EDGES_FACE1,
+    EDGES_FACE2,
+    NUMBER_OF_REAL_CELLS,
+    VOLUME,
+)
+
+
+class DiagnosticsRecorder:
+    """Records solver and hydrodynamic diagnostics of every timestep into columnar buffers.
+
+    Per timestep, the diagnostics are:
+        - `wet_cells`: number of real cells with a volume at the end of the timestep.
+        - `nnz`: number of stored entries of the sparse system matrix.
+        - `max_courant`: largest cell Courant number, i.e., the outflow across a cell's edges
+          over the timestep divided by its volume, over wet real cells.
+        - `max_peclet`: largest grid Peclet number, i.e., the advection coefficient of an edge
+          divided by its coefficient to the diffusion term.
+        - `residual`: largest relative residual norm ||Ax - b|| / ||b|| of the constituents.
+        - `iterations`: solver iterations (0 for the direct solver).
+        - `seconds`: wall-clock time of the timestep.
+
+    Args:
+        mesh (xr.Dataset): Unstructured model mesh.
+    """
+    def __init__(self, mesh: xr.Dataset):
+        self.nreal_index = mesh.attrs[NUMBER_OF_REAL_CELLS] + 1
+        self.nface = len(mesh.nface)
+        self.edges_face1 = mesh[EDGES_FACE1].values
+        self.edges_face2 = mesh[EDGES_FACE2].values
+        self.time = mesh.time.values
+        n_steps = len(self.time) - 1
+        self.recorded = np.zeros(n_steps, dtype=bool)
+        self.wet_cells = np.zeros(n_steps, dtype=np.int64)
+        self.nnz = np.zeros(n_steps, dtype=np.int64)
+        self.max_courant = np.full(n_steps, np.nan)
+        self.max_peclet = np.full(n_steps, np.nan)
+        self.residual = np.full(n_steps, np.nan)
+        self.iterations = np.zeros(n_steps, dtype=np.int64)
+        self.seconds = np.full(n_steps, np.nan)
+
+    def record(
+        self,
+        mesh: xr.Dataset,
+        t: int,
+        A: csr_matrix,
+        b: np.ndarray,
+        x: np.ndarray,
+        empty_cells: np.ndarray,
+        seconds: float,
+        iterations: int = 0,
+    ):
+        """Record the diagnostics of the timestep from t to t + 1.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+            t (int): Timestep.
+            A (csr_matrix): System matrix.
+            b (np.ndarray): Right hand sides, with shape (constituent x real cells).
+            x (np.ndarray): Solutions, with shape (constituent x real cells).
+            empty_cells (np.ndarray): Real cells without volume at t + 1 (see `LHS.update_values`).
+            seconds (float): Wall-clock time of the timestep.
+            iterations (int, optional): Solver iterations (0 for a direct solver).
+        """
+        advection_coefficient = np.asarray(mesh[ADVECTION_COEFFICIENT].data[t])
+        diffusion_coefficient = np.asarray(mesh[COEFFICIENT_TO_DIFFUSION_TERM].data[t])
+        volume = np.asarray(mesh[VOLUME].data[t + 1])[0:self.nreal_index]
+        delta_time = float(mesh[CHANGE_IN_TIME].data[t])
+
+        # flow leaves face 1 where the advection coefficient is positive, and face 2 where it is negative
+        upstream = np.where(advection_coefficient > 0, self.edges_face1, self.edges_face2)
+        outflow = np.bincount(
+            upstream,
+            weights=np.abs(advection_coefficient),
+            minlength=self.nface,
+        )[0:self.nreal_index]
+        wet = volume > 0
+        if wet.any():
+            self.max_courant[t] = np.max(outflow[wet] * delta_time / volume[wet])
+
+        diffusive = diffusion_coefficient > 0
+        if diffusive.any():
+            self.max_peclet[t] = np.max(
+                np.abs(advection_coefficient[diffusive]) / diffusion_coefficient[diffusive]
+            )
+
+        if len(b) > 0:
+            residual = np.linalg.norm(A @ x.T - b.T, axis=0)
+            norm = np.linalg.norm(b, axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self.residual[t] = np.max(np.where(norm > 0, residual / norm, residual))
+
+        self.wet_cells[t] = self.nreal_index - len(empty_cells)
+        self.nnz[t] = A.nnz
+        self.iterations[t] = iterations
+        self.seconds[t] = seconds
+        self.recorded[t] = True
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Diagnostics of the recorded timesteps, indexed by timestep.
+
+        The `time` column is the model time at the end of each timestep.
+        """
+        steps = np.nonzero(self.recorded)[0]
+        return pd.DataFrame(
+            {
+                'time': self.time[steps + 1],
+                'wet_cells': self.wet_cells[steps],
+                'nnz': self.nnz[steps],
+                'max_courant': self.max_courant[steps],
+                'max_peclet': self.max_peclet[steps],
+                'residual': self.residual[steps],
+                'iterations': self.iterations[steps],
+                'seconds': self.seconds[steps],
+            },
+            index=pd.Index(steps, name='time_step'),
+        )
+
+    def write_parquet(self, file_path: str | Path):
+        """Write the diagnostics of the recorded timesteps to a Parquet file.
+
+        Args:
+            file_path (str | Path): Parquet file to write.
+        """
+        self.to_dataframe().to_parquet(file_path)
@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+import os
+import shutil
+
+
+def _remove(path: Path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+@contextmanager
+def atomic_write(path: str | Path) -> Iterator[Path]:
+    """Path to write a file or directory (e.g., a Zarr store) to, moved to `path` once the write succeeds.
+
+    The write goes to a temporary path next to `path` first, so an interrupted write never leaves
+    a partial file at `path` or clobbers the previous one.
+
+    Args:
+        path (str | Path): File or directory to write.
+
+    Yields:
+        Temporary path to write to.
+    """
+    path = Path(path)
+    temporary_path = path.with_name(f'{path.stem}.tmp{path.suffix}')
+    _remove(temporary_path)
+    try:
+        yield temporary_path
+    except BaseException:
+        _remove(temporary_path)
+        raise
+    if path.is_dir():
+        shutil.rmtree(path)
+    os.replace(temporary_path, path)
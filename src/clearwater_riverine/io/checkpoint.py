@@ -0,0 +1,165 @@
+from concurrent.futures import Future
+from pathlib import Path
+from typing import (
+    Dict,
+    List,
+    Optional,
+)
+import hashlib
+
+import numpy as np
+import xarray as xr
+
+from clearwater_riverine.io._atomic import atomic_write
+from clearwater_riverine.io.inputs import loading_factory
+from clearwater_riverine.io.outputs import BackgroundWriter, writing_factory
+
+# format accepted by the `datetime_range` argument when reading RAS output
+CHECKPOINT_DATETIME_FORMAT = '%m-%d-%Y %H:%M:%S'
+# separates the name of a recorder from the names of its state variables in a checkpoint
+STATE_SEPARATOR = '__'
+
+
+def hash_flow_field(file_path: str | Path, chunk_size: int = 2**23) -> str:
+    """Hash the contents of a hydrodynamic (flow field) file.
+
+    Args:
+        file_path (str | Path): Filepath to HEC-RAS output.
+        chunk_size (int, optional): Number of bytes read at a time.
+
+    Returns:
+        Hexadecimal digest of the file contents.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_checkpoint(
+    mesh: xr.Dataset,
+    time_step: int,
+    names: List[str],
+    units: List[str],
+    values: np.ndarray,
+    boundary_cells: np.ndarray,
+    boundary_values: np.ndarray,
+    flow_field_file_path: str | Path,
+    flow_field_hash: Optional[str] = None,
+    states: Optional[Dict[str, xr.Dataset]] = None,
+) -> xr.Dataset:
+    """Gather everything needed to restart a simulation at a timestep.
+
+    Args:
+        mesh (xr.Dataset): Unstructured model mesh.
+        time_step (int): Current timestep.
+        names (List[str]): Constituent names.
+        units (List[str]): Units of each constituent.
+        values (np.ndarray): Array of shape (constituent x nface) with concentrations at `time_step`.
+        boundary_cells (np.ndarray): Indices of the ghost cells with user-defined boundary conditions.
+        boundary_values (np.ndarray): Array of shape (time x constituent x boundary_cells) with
+            user-defined boundary conditions from `time_step` onward.
+        flow_field_file_path (str | Path): Filepath to HEC-RAS output.
+        flow_field_hash (str, optional): Hash of the HEC-RAS output (see `hash_flow_field`).
+            If not provided, `CheckpointWriter` computes it in its background thread.
+        states (Dict[str, xr.Dataset], optional): State of the recorders that run alongside the
+            model (e.g., cell statistics or probes), by name. Read them back with `checkpoint_state`.
+
+    Returns:
+        checkpoint (xr.Dataset): Checkpoint dataset.
+    """
+    checkpoint = xr.Dataset(
+        data_vars={
+            'concentration': (('constituent', 'nface'), values),
+            'boundary_cells': (('boundary_cell',), boundary_cells),
+            'boundary_values': (('time', 'constituent', 'boundary_cell'), boundary_values),
+        },
+        coords={
+            'constituent': np.array(names, dtype=object),
+            'units': (('constituent',), np.array(units, dtype=object)),
+            'time': mesh.time.values[time_step:],
+        },
+        attrs={
+            'time_step': int(time_step),
+            'diffusion_coefficient': float(mesh.attrs['diffusion_coefficient']),
+            'flow_field_file_path': str(flow_field_file_path),
+            'flow_field_hash': flow_field_hash,
+        },
+    )
+    for name, state in (states or {}).items():
+        checkpoint = checkpoint.merge(_rename_state(state, '', f'{name}{STATE_SEPARATOR}'))
+    return checkpoint
+
+
+def _rename_state(state: xr.Dataset, old_prefix: str, new_prefix: str) -> xr.Dataset:
+    names = set(state.variables) | set(state.dims)
+    return state.rename({name: new_prefix + name[len(old_prefix):] for name in names})
+
+
+def checkpoint_state(checkpoint: xr.Dataset, name: str) -> Optional[xr.Dataset]:
+    """State of a recorder saved in a checkpoint (see `build_checkpoint`).
+
+    Args:
+        checkpoint (xr.Dataset): Checkpoint dataset.
+        name (str): Name the state was saved under.
+
+    Returns:
+        The saved state, or None if the checkpoint has no state under `name`.
+    """
+    prefix = f'{name}{STATE_SEPARATOR}'
+    names = [variable for variable in checkpoint.variables if variable.startswith(prefix)]
+    if not names:
+        return None
+    state = xr.Dataset({variable: checkpoint[variable].variable for variable in names})
+    return _rename_state(state, prefix, '')
+
+
+def read_checkpoint(checkpoint_file_path: str | Path) -> xr.Dataset:
+    """Read a checkpoint into memory.
+
+    Args:
+        checkpoint_file_path (str | Path): Filepath to a Zarr or NetCDF checkpoint.
+    """
+    loader = loading_factory.get_loader(checkpoint_file_path)
+    return loader.load(checkpoint_file_path).load()
+
+
+def _write_checkpoint(checkpoint: xr.Dataset, checkpoint_file_path: Path):
+    writer = writing_factory.get_writer(checkpoint_file_path)
+    with atomic_write(checkpoint_file_path) as temporary_path:
+        writer.write(checkpoint, temporary_path)
+
+
+class CheckpointWriter(BackgroundWriter):
+    """Writes checkpoints in a background thread so they do not stall the model.
+
+    Checkpoints are written one at a time, in the order they are submitted.
+    Errors raised while writing are re-raised by the next call to `write` or `wait`.
+    Hashes of the flow field files are also computed in the background thread, once per file.
+    """
+    def __init__(self):
+        super().__init__()
+        self._flow_field_hashes: Dict[str, str] = {}
+
+    def _write(self, checkpoint: xr.Dataset, checkpoint_file_path: Path):
+        if checkpoint.attrs['flow_field_hash'] is None:
+            flow_field_file_path = checkpoint.attrs['flow_field_file_path']
+            if flow_field_file_path not in self._flow_field_hashes:
+                self._flow_field_hashes[flow_field_file_path] = hash_flow_field(flow_field_file_path)
+            checkpoint.attrs['flow_field_hash'] = self._flow_field_hashes[flow_field_file_path]
+        _write_checkpoint(checkpoint, checkpoint_file_path)
+
+    def write(self, checkpoint: xr.Dataset, checkpoint_file_path: str | Path) -> Future:
+        """Queue a checkpoint to be written.
+
+        Args:
+            checkpoint (xr.Dataset): Checkpoint dataset (see `build_checkpoint`).
+                Must not share memory with arrays that are still being updated.
+            checkpoint_file_path (str | Path): Filepath to a Zarr or NetCDF checkpoint.
+        """
+        return self.submit(
+            self._write,
+            checkpoint,
+            Path(checkpoint_file_path),
+        )
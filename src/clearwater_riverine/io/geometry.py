@@ -0,0 +1,86 @@
+from pathlib import Path
+from typing import Optional
+import hashlib
+
+import geopandas as gpd
+import numpy as np
+import pyproj
+import xarray as xr
+
+from clearwater_riverine.io._atomic import atomic_write
+from clearwater_riverine.mesh import cell_polygons
+from clearwater_riverine.variables import (
+    FACE_NODES,
+    NODE_X,
+    NODE_Y,
+    NUMBER_OF_REAL_CELLS,
+)
+
+# coordinate system of the plotted cell geometry
+PLOTTING_CRS = 'EPSG:4326'
+
+
+def hash_cell_geometry(mesh: xr.Dataset, crs: str) -> str:
+    """Hash the real cell geometry of a mesh and its coordinate system.
+
+    Args:
+        mesh (xr.Dataset): Unstructured model mesh.
+        crs (str): Coordinate system of the RAS model.
+
+    Returns:
+        Hexadecimal digest of the face node connectivity, node coordinates and coordinate system.
+    """
+    nreal_index = mesh.attrs[NUMBER_OF_REAL_CELLS] + 1
+    digest = hashlib.blake2b(digest_size=16)
+    for array in [
+        mesh[FACE_NODES].values[0:nreal_index],
+        mesh[NODE_X].values,
+        mesh[NODE_Y].values,
+    ]:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.dtype, array.shape)).encode())
+        digest.update(array.tobytes())
+    digest.update(pyproj.CRS.from_user_input(crs).to_wkt().encode())
+    digest.update(PLOTTING_CRS.encode())
+    return digest.hexdigest()
+
+
+def cell_geodataframe(
+    mesh: xr.Dataset,
+    crs: str,
+    cache_directory: Optional[str | Path] = None,
+) -> gpd.GeoDataFrame:
+    """Polygons of the real cells, reprojected for plotting.
+
+    With a `cache_directory`, the reprojected polygons are stored as GeoParquet, keyed by
+    a hash of the cell geometry and coordinate system (see `hash_cell_geometry`), and
+    reused for the same mesh.
+
+    Args:
+        mesh (xr.Dataset): Unstructured model mesh.
+        crs (str): Coordinate system of the RAS model.
+        cache_directory (str | Path, optional): Directory to cache polygons in.
+
+    Returns:
+        GeoDataFrame with `nface` and `geometry` columns, in EPSG:4326.
+    """
+    cache_path = None
+    if cache_directory is not None:
+        cache_path = Path(cache_directory) / f'cell_geometry_{hash_cell_geometry(mesh, crs)}.parquet'
+        if cache_path.exists():
+            return gpd.read_parquet(cache_path)
+
+    nreal_index = mesh.attrs[NUMBER_OF_REAL_CELLS] + 1
+    poly_gdf = gpd.GeoDataFrame(
+        {
+            'nface': mesh.nface.values[0:nreal_index],
+            'geometry': cell_polygons(mesh, nreal_index),
+        },
+        crs=crs,
+    ).to_crs(PLOTTING_CRS)
+
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(cache_path) as temporary_path:
+            poly_gdf.to_parquet(temporary_path)
+    return poly_gdf
@@ -11,6 +11,8 @@ import xarray as xr
 import numpy as np
 import pandas as pd
 
+from clearwater_riverine.io.scratch import ScratchStore
+
 from clearwater_riverine.variables import (
     NODE_X,
     NODE_Y,
@@ -98,12 +100,27 @@ def _hdf_to_xarray(
     dims,
     attrs=None,
     time_constraint: Optional[Tuple] = (None, None),
+    scratch: Optional[ScratchStore] = None,
 ) -> xr.DataArray:
-    """Read n-dimensional HDF5 dataset and return it as an xarray.DataArray"""
+    """Read n-dimensional HDF5 dataset and return it as an xarray.DataArray
+
+    Only the timesteps within `time_constraint` are read. If a `scratch` store is given,
+    HDF5 datasets are read directly into a memory-mapped array.
+    """
     if attrs is None:
         attrs = _parse_attributes(dataset)
-    if time_constraint != (None, None):
-        data_to_read = dataset[()][time_constraint[0]: time_constraint[1]]
+    if scratch is not None and isinstance(dataset, h5py.Dataset):
+        selection = np.s_[time_constraint[0]: time_constraint[1]]
+        rows = len(range(*selection.indices(dataset.shape[0])))
+        data_to_read = scratch.empty(
+            dataset.name,
+            (rows,) + dataset.shape[1:],
+            dataset.dtype,
+        )
+        if data_to_read.size > 0:
+            dataset.read_direct(data_to_read, source_sel=selection)
+    elif time_constraint != (None, None):
+        data_to_read = dataset[time_constraint[0]: time_constraint[1]]
     else:
         data_to_read = dataset[()]
     data_array = xr.DataArray(
@@ -132,11 +149,13 @@ class HDFReader:
     def __init__(
         self,
         file_path: str,
-        datetime_range: Optional[Tuple[int, int] | Tuple[str, str]] = None
+        datetime_range: Optional[Tuple[int, int] | Tuple[str, str]] = None,
+        scratch: Optional[ScratchStore] = None,
     ) -> None:
         """
         Opens HDF file and reads information required to
-        set-up model mesh.
+        set-up model mesh. If a `scratch` store is given, time-varying
+        hydrodynamics are read into memory-mapped arrays.
         """
         self.file_path = file_path
         self.infile = h5py.File(file_path, 'r')
@@ -145,6 +164,7 @@ class HDFReader:
         ][()][0][0].decode('UTF-8')
         self.paths = _hdf_internal_paths(self.project_name)
         self.datetime_range = datetime_range
+        self.scratch = scratch
 
     def _parse_dates(self):
         """Date handling."""
@@ -276,7 +296,7 @@ class HDFReader:
             self.infile[self.paths[EDGE_VELOCITY]],
             ('time', 'nedge'),
             time_constraint=self.datetime_range_indices,
-
+            scratch=self.scratch,
         )
         mesh[EDGE_LENGTH] = _hdf_to_xarray(
             self.infile[self.paths[EDGE_LENGTH]][:, 2],
@@ -286,13 +306,15 @@ class HDFReader:
         mesh[WATER_SURFACE_ELEVATION] = _hdf_to_xarray(
             self.infile[self.paths[WATER_SURFACE_ELEVATION]],
             (['time', 'nface']),
-            time_constraint=self.datetime_range_indices
+            time_constraint=self.datetime_range_indices,
+            scratch=self.scratch,
         )
         try:
             mesh[VOLUME] = _hdf_to_xarray(
                 self.infile[self.paths[VOLUME]],
                 ('time', 'nface'),
-                time_constraint=self.datetime_range_indices
+                time_constraint=self.datetime_range_indices,
+                scratch=self.scratch,
             )
         except KeyError:
             mesh.attrs['volume_calculation_required'] = True
@@ -306,7 +328,8 @@ class HDFReader:
             mesh[FLOW_ACROSS_FACE] = _hdf_to_xarray(
                 self.infile[self.paths[FLOW_ACROSS_FACE]],
                 ('time', 'nedge'),
-                time_constraint=self.datetime_range_indices
+                time_constraint=self.datetime_range_indices,
+                scratch=self.scratch,
             )
         except:
             mesh.attrs['face_area_calculation_required'] = True
@@ -326,7 +349,8 @@ class HDFReader:
             mesh[FACE_HYD_DEPTH] = _hdf_to_xarray(
                 self.infile[self.paths[FACE_HYD_DEPTH]],
                 (['time', 'nface']),
-                time_constraint=self.datetime_range_indices
+                time_constraint=self.datetime_range_indices,
+                scratch=self.scratch,
             )
         except KeyError:
             print("'Cell Hydraulic Depth' not found in hdf file; skip reading it. ")
@@ -334,7 +358,8 @@ class HDFReader:
             mesh[FACE_VEL_X] = _hdf_to_xarray(
                 self.infile[self.paths[FACE_VEL_X]],
                 (['time', 'nface']),
-                time_constraint=self.datetime_range_indices
+                time_constraint=self.datetime_range_indices,
+                scratch=self.scratch,
             )
         except KeyError:
             print("'Cell Velocity - Velocity X' not found in hdf file; skip reading it. ")
@@ -342,7 +367,8 @@ class HDFReader:
             mesh[FACE_VEL_Y] = _hdf_to_xarray(
                 self.infile[self.paths[FACE_VEL_Y]],
                 (['time', 'nface']),
-                time_constraint=self.datetime_range_indices
+                time_constraint=self.datetime_range_indices,
+                scratch=self.scratch,
             )
         except KeyError:
             print("'Cell Velocity - Velocity Y' not found in hdf file; skip reading it. ")
@@ -398,38 +424,42 @@ class HDFReader:
         Fixes a HEC-RAS bug in designating faces associated with
         boundary conditions.
         """
-        df_ls = []
+        fix_path = self.paths['boundary_condition_fixes']
+        names = boundary_data.Name.unique()
 
         # Identify correct boundary faces
-        for boundary in boundary_data.Name.unique():
-            fix_path = self.paths['boundary_condition_fixes']
+        boundary_faces_fix = []
+        for boundary in names:
             fpath = f"{fix_path}/{boundary} - Flow per Face"
             attrs = _parse_attributes(self.infile[fpath])
-            boundary_faces_fix = attrs['Faces']
-            boundary_faces_orig = boundary_data[
-                (boundary_data.Name == boundary)]['Face Index']
-
-            # compare with boundaries already identified
-            # notify users if issues exist
-            if set(boundary_faces_fix) != set(boundary_faces_orig):
-                print(f'Extra boundary faces identified for {boundary}.')
-                diff = set(boundary_faces_orig) - \
-                    set(boundary_faces_fix)
-                print(f'Removing erroneous boundaries {diff}.')
-
-            # remove erroneous boundaries
-            fixed_df = boundary_data[
-                (boundary_data.Name == boundary) &
-                (boundary_data['Face Index'].isin(boundary_faces_fix))
-            ]
-            df_ls.append(fixed_df)
+            boundary_faces_fix.append(
+                pd.DataFrame({'Name': boundary, 'Face Index': attrs['Faces']})
+            )
+        boundary_faces_fix = pd.concat(boundary_faces_fix, ignore_index=True)
+
+        # compare with boundaries already identified in a single pass
+        # notify users if issues exist
+        keys = pd.MultiIndex.from_frame(boundary_data[['Name', 'Face Index']])
+        valid = keys.isin(
+            pd.MultiIndex.from_frame(boundary_faces_fix[['Name', 'Face Index']])
+        )
+        for boundary in boundary_data.Name[~valid].unique():
+            print(f'Extra boundary faces identified for {boundary}.')
+            diff = set(boundary_data['Face Index'][~valid & (boundary_data.Name == boundary)])
+            print(f'Removing erroneous boundaries {diff}.')
+
+        # remove erroneous boundaries, keeping rows grouped by boundary
+        fixed_df_full = boundary_data[valid]
+        order = np.argsort(
+            pd.Index(names).get_indexer(fixed_df_full.Name),
+            kind='stable'
+        )
+        fixed_df_full = fixed_df_full.iloc[order]
 
         # remove any potential duplicates
-        fixed_df_full = pd.concat(df_ls)
-        fixed_df_full.drop(
+        fixed_df_full = fixed_df_full.drop(
             ['Station Start', 'Station End'],
             axis=1,
-            inplace=True
         )
         fixed_df_full.drop_duplicates(inplace=True)
 
@@ -2,6 +2,7 @@ from abc import ABC
 from abc import abstractmethod
 from pathlib import Path
 from typing import (
+    List,
     Type,
     Union,
     Optional,
@@ -10,9 +11,11 @@ from typing import (
 import errno
 import os
 
+import pandas as pd
 import xarray as xr
 
 from clearwater_riverine.io.hdf import HDFReader
+from clearwater_riverine.io.scratch import ScratchStore
 from clearwater_riverine.variables import (
     FACE_NODES
 )
@@ -66,16 +69,19 @@ class RASReader:
         self,
         readable: Type[RASInput],
         file_path: str,
-        datetime_range: Optional[Tuple[int, int] | Tuple[str, str]] = None
+        datetime_range: Optional[Tuple[int, int] | Tuple[str, str]] = None,
+        scratch: Optional[ScratchStore] = None,
     ) -> None:
         """Use the RAS filepath to identify the correct reader from the reading_factory
         Args:
             readable (RASInput): abstract interface implemented on any file we weant to read
             file_path (str):  Filepath to RAS output file
+            scratch (ScratchStore, optional): Store for memory-mapped hydrodynamics
         """
         reader = reading_factory.get_reader(
             file_path,
             datetime_range=datetime_range,
+            scratch=scratch,
         )
         readable.read_to_xarray(reader)
         return readable
@@ -89,11 +95,13 @@ class RASInputFactory:
     def get_reader(
         self,
         file_path: str,
-        datetime_range: Optional[Tuple[int, int] | Tuple[str, str]] = None
+        datetime_range: Optional[Tuple[int, int] | Tuple[str, str]] = None,
+        scratch: Optional[ScratchStore] = None,
 ) -> Type[HDFReader]:
         """ Retrieve the correct reader from the reading factory
         Args:
             file_path (str): RAS output file path
+            scratch (ScratchStore, optional): Store for memory-mapped hydrodynamics
         
         Returns:
             reader based on RAS filepath extension. Currently only handles HDFReader.
@@ -103,7 +111,8 @@ class RASInputFactory:
         if self.extension == '.hdf':
             return HDFReader(
                 self.file_path,
-                datetime_range=datetime_range
+                datetime_range=datetime_range,
+                scratch=scratch,
             )
         else:
             raise ValueError("File type is not accepted.")
@@ -184,3 +193,47 @@ class ClearWaterRiverineLoadingFactory:
             raise ValueError(f"Cannot save as {self.extension}.")
     
 loading_factory = ClearWaterRiverineLoadingFactory()
+
+
+TABULAR_EXTENSIONS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'feather',
+    '.feather': 'feather',
+    '.ipc': 'feather',
+}
+
+
+def read_tabular_input(
+    filepath: str | Path | pd.DataFrame,
+    parse_dates: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """Read user-supplied initial or boundary conditions to a pandas DataFrame.
+
+    Args:
+        filepath (str | Path | pd.DataFrame): CSV, Parquet or Arrow (Feather/IPC) file.
+            A DataFrame that is already in memory is returned as-is.
+        parse_dates (list, optional): Columns that should be converted to datetimes.
+
+    Returns:
+        df (pd.DataFrame): Table of user inputs.
+    """
+    if isinstance(filepath, pd.DataFrame):
+        df = filepath
+    else:
+        extension = Path(filepath).suffix.lower()
+        if extension not in TABULAR_EXTENSIONS:
+            raise ValueError(f"File type {extension} is not accepted.")
+        file_format = TABULAR_EXTENSIONS[extension]
+        if file_format == 'csv':
+            df = pd.read_csv(filepath)
+        elif file_format == 'parquet':
+            df = pd.read_parquet(filepath)
+        else:
+            df = pd.read_feather(filepath)
+
+    for column in parse_dates or []:
+        if not pd.api.types.is_datetime64_any_dtype(df[column]):
+            df = df.assign(**{column: pd.to_datetime(df[column])})
+    return df
@@ -1,12 +1,34 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Type, Union
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Type,
+    Union,
+)
 import errno
 import os 
 
+import numpy as np
 import xarray as xr
 
 # from utilities import MeshManager
 
+# attributes of the model mesh that cannot be written to Zarr or NetCDF
+UNSAVED_ATTRIBUTES = [
+    'face_area_elevation_info',
+    'face_area_elevation_values',
+    'face_normalunitvector_and_length',
+    'face_cell_indexes_df',
+    'face_volume_elevation_info',
+    'face_volume_elevation_values',
+    'boundary_data',
+    'volume_calculation_required',
+    'face_area_calculation_required',
+]
+
 class ZarrWriter:
     """Writes Zarr Output"""
     def write(self, mesh: xr.Dataset, output_file_path):
@@ -16,6 +38,153 @@ class ZarrWriter:
             consolidated=True
         )
 
+def _write_region(block: xr.Dataset, output_file_path: Path, time_slice: slice):
+    """Write a block of timesteps into an existing Zarr store."""
+    block.to_zarr(
+        output_file_path,
+        mode='r+',
+        region={'time': time_slice},
+    )
+
+def _append_block(block: xr.Dataset, output_file_path: Path, create: bool):
+    """Append a block of timesteps to a Zarr store, creating the store with the first block."""
+    if create:
+        block.to_zarr(output_file_path, mode='w', consolidated=True)
+    else:
+        block.to_zarr(output_file_path, append_dim='time', consolidated=True)
+
+class BackgroundWriter:
+    """Runs writes in a background thread so they do not stall the model.
+
+    Writes run one at a time, in the order they are submitted.
+    Errors raised while writing are re-raised by the next call to `submit` or `wait`.
+    """
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: List[Future] = []
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Queue a write.
+
+        Args:
+            fn (Callable): Function that performs the write.
+            *args: Arguments passed to `fn`. Must not share memory with arrays that are still being updated.
+        """
+        self._raise_errors()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        future = self._executor.submit(fn, *args)
+        self._pending.append(future)
+        return future
+
+    def wait(self):
+        """Block until all queued writes are done."""
+        pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def _raise_errors(self):
+        """Re-raise any error from a finished write and forget finished writes."""
+        pending = []
+        for future in self._pending:
+            if future.done():
+                future.result()
+            else:
+                pending.append(future)
+        self._pending = pending
+
+class ZarrStreamWriter(BackgroundWriter):
+    """Writes results to a Zarr store in blocks of timesteps while the model runs.
+
+    `open` creates the store with the full model mesh, but only allocates the streamed
+    variables (chunked along time). Blocks of timesteps are then written to the streamed
+    variables with `write`, from a background thread. Alternatively, a store that only holds
+    the streamed variables can be grown block by block along time with `append`.
+
+    Args:
+        output_file_path (str | Path): Filepath to the Zarr store.
+        time_chunk (int): Number of timesteps in each chunk of the streamed variables.
+    """
+    def __init__(self, output_file_path: str | Path, time_chunk: int):
+        super().__init__()
+        self.output_file_path = Path(output_file_path)
+        if self.output_file_path.suffix != '.zarr':
+            raise ValueError(f"Cannot stream to {self.output_file_path.suffix}; only .zarr is supported.")
+        if self.output_file_path.parent.is_dir() == False:
+            raise FileNotFoundError(
+                errno.ENOENT, os.strerror(errno.ENOENT), output_file_path
+            )
+        self.time_chunk = time_chunk
+        self.dims = {}
+        self._created = False
+
+    def open(self, mesh: xr.Dataset, streamed: Dict[str, xr.DataArray]):
+        """Create the store.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh, written to the store in full.
+            streamed (Dict[str, xr.DataArray]): Templates of the variables to stream, keyed by name.
+                Each has a time dimension; their values are not written.
+        """
+        template = mesh.copy()
+        template.attrs = {
+            key: value for key, value in mesh.attrs.items()
+            if key not in UNSAVED_ATTRIBUTES
+        }
+        for name, variable in streamed.items():
+            template[name] = variable.chunk({'time': self.time_chunk})
+            self.dims[name] = variable.dims
+        template.to_zarr(
+            self.output_file_path,
+            mode='w',
+            compute=False,
+            consolidated=True,
+        )
+
+    def write(self, start: int, data: Dict[str, np.ndarray]) -> Future:
+        """Queue a block of timesteps to be written.
+
+        Args:
+            start (int): Index of the first timestep in the block.
+            data (Dict[str, np.ndarray]): Values of streamed variables, keyed by name.
+                All have the same number of timesteps. Must not be modified after being passed.
+        """
+        block = xr.Dataset(
+            {name: (self.dims[name], values) for name, values in data.items()}
+        )
+        steps = len(next(iter(data.values())))
+        return self.submit(
+            _write_region,
+            block,
+            self.output_file_path,
+            slice(start, start + steps),
+        )
+
+    def append(self, block: xr.Dataset) -> Future:
+        """Queue a block of timesteps to be appended along time. The first block creates the store.
+
+        Args:
+            block (xr.Dataset): Streamed variables, with a time dimension. Must not be modified after being passed.
+        """
+        for name, variable in block.data_vars.items():
+            self.dims[name] = variable.dims
+        create = not self._created
+        self._created = True
+        return self.submit(
+            _append_block,
+            block,
+            self.output_file_path,
+            create,
+        )
+
+    def read(self, name: str) -> xr.DataArray:
+        """Lazily read a variable back from the store.
+
+        Args:
+            name (str): Variable name.
+        """
+        return xr.open_zarr(self.output_file_path)[name]
+
 class NetCDFWriter:
     """Writes NetCDF Output"""
     def write(self, mesh: xr.Dataset, output_file_path):
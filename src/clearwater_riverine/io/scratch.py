@@ -0,0 +1,79 @@
+from pathlib import Path
+from typing import Tuple
+import re
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+import xarray as xr
+
+
+class ScratchStore:
+    """Allocates arrays backed by `np.memmap` files in a scratch directory.
+
+    Wrapped in an `xr.DataArray`, a memory-mapped array behaves like an in-memory
+    array, but the operating system decides which pages stay resident. This allows
+    model meshes whose full history exceeds the available memory.
+
+    The files are written to a new subdirectory of `directory`, which is removed
+    when the store is garbage collected or `cleanup` is called.
+
+    Args:
+        directory (str | Path): Scratch directory, preferably on fast local disk.
+    """
+    def __init__(self, directory: str | Path):
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.path = Path(tempfile.mkdtemp(prefix='clearwater_riverine_', dir=directory))
+        self._count = 0
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, True)
+
+    def empty(self, name: str, shape: Tuple[int, ...], dtype=np.float64) -> np.ndarray:
+        """Allocate an uninitialized memory-mapped array.
+
+        Args:
+            name (str): Name used in the file name.
+            shape (Tuple[int, ...]): Array shape.
+            dtype (optional): Array data type.
+        """
+        if np.prod(shape) == 0:
+            # empty files cannot be memory-mapped
+            return np.empty(shape, dtype=dtype)
+        self._count += 1
+        file_name = f"{self._count:04d}_{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}.dat"
+        return np.memmap(self.path / file_name, dtype=dtype, mode='w+', shape=shape)
+
+    def zeros(self, name: str, shape: Tuple[int, ...], dtype=np.float64) -> np.ndarray:
+        """Allocate a memory-mapped array of zeros (new files are zero-filled)."""
+        return self.empty(name, shape, dtype)
+
+    def full(self, name: str, shape: Tuple[int, ...], fill_value: float, dtype=np.float64) -> np.ndarray:
+        """Allocate a memory-mapped array filled with `fill_value`."""
+        array = self.empty(name, shape, dtype)
+        array[...] = fill_value
+        return array
+
+    def copy(self, name: str, array: np.ndarray) -> np.ndarray:
+        """Copy an array to a memory-mapped array."""
+        copied = self.empty(name, array.shape, array.dtype)
+        copied[...] = array
+        return copied
+
+    def move_to_disk(self, mesh: xr.Dataset, dim: str = 'time'):
+        """Move the NumPy variables of a mesh along a dimension to memory-mapped arrays, in place.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+            dim (str, optional): Only variables with this dimension are moved.
+        """
+        for name in list(mesh.data_vars):
+            variable = mesh[name].variable
+            if dim not in variable.dims:
+                continue
+            data = variable.data
+            if isinstance(data, np.ndarray) and not isinstance(data, np.memmap):
+                mesh[name] = variable.copy(data=self.copy(name, data))
+
+    def cleanup(self):
+        """Remove the scratch files. Arrays allocated by the store must no longer be used."""
+        self._finalizer()
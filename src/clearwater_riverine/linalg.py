@@ -30,6 +30,13 @@ class LHS:
         self.real_edges_face1 = np.where(mesh[EDGES_FACE1] <= mesh.nreal)[0]
         self.real_edges_face2 = np.where(mesh[EDGES_FACE2] <= mesh.nreal)[0]
         self.nreal_count = mesh.nreal + 1
+
+        # mesh connectivity does not change between timesteps
+        self.is_internal_edge = np.isin(mesh.nedge.values, self.internal_edges)
+        self.faces = mesh[FACES].values
+        self.edges_face1 = mesh[EDGES_FACE1].values
+        self.edges_face2 = mesh[EDGES_FACE2].values
+        self.edge_face_connectivity = mesh[EDGE_FACE_CONNECTIVITY].values.T
                 
     def update_values(self, mesh: xr.Dataset, t: float):
         """ Updates values in the LHS matrix based on the timestep. 
@@ -55,15 +62,21 @@ class LHS:
         Attributes:
             rows / cols: point to the row and column of each cell
             coef: value in the specified row, column pair in the matrix 
+            empty_cells: real cells without volume at the t+1 timestep
         """
+        advection_coefficient = mesh[ADVECTION_COEFFICIENT].values[t]
+        diffusion_coefficient = mesh[COEFFICIENT_TO_DIFFUSION_TERM].values[t]
+        volume = mesh[VOLUME].values[t+1]
+
         # define edges where flow is flowing in versus out and find all empty cells
         # at the t+1 timestep
-        flow_out_indices = np.where((mesh[ADVECTION_COEFFICIENT][t] > 0))[0]
-        flow_out_indices_internal = np.where((mesh[ADVECTION_COEFFICIENT][t] > 0) & \
-                                             (np.isin(mesh.nedge, self.internal_edges)))[0]
-        flow_in_indices = np.where((mesh[ADVECTION_COEFFICIENT][t] < 0) & \
-                                   (np.isin(mesh.nedge, self.internal_edges)))[0]
-        empty_cells = np.where((mesh[VOLUME][t+1] == 0) & (np.arange(len(mesh[VOLUME][t+1])) < self.nreal_count))[0][0:self.nreal_count]
+        flow_out_indices = np.where((advection_coefficient > 0))[0]
+        flow_out_indices_internal = np.where((advection_coefficient > 0) & \
+                                             (self.is_internal_edge))[0]
+        flow_in_indices = np.where((advection_coefficient < 0) & \
+                                   (self.is_internal_edge))[0]
+        empty_cells = np.where((volume == 0) & (np.arange(len(volume)) < self.nreal_count))[0][0:self.nreal_count]
+        self.empty_cells = empty_cells
 
         # initialize arrays that will define the sparse matrix 
         len_val = self.internal_edge_count * 2 + self.nreal_count * 2 + \
@@ -83,24 +96,24 @@ class LHS:
         ###### diagonal terms - load and sum of diffusion coefficients associated with each cell
         start = end
         end = end + self.nreal_count
-        self.rows[start:end] = mesh[FACES][0:self.nreal_count]
-        self.cols[start:end] = mesh[FACES][0:self.nreal_count]
+        self.rows[start:end] = self.faces[0:self.nreal_count]
+        self.cols[start:end] = self.faces[0:self.nreal_count]
         seconds = mesh[CHANGE_IN_TIME].values[t] 
-        self.coef[start:end] = mesh[VOLUME][t+1][0:self.nreal_count] / seconds 
+        self.coef[start:end] = volume[0:self.nreal_count] / seconds 
 
         # diagonal terms - sum of diffusion coefficients associated with each cell
         start = end
         end = end + len(self.real_edges_face1)
 
-        self.rows[start:end] = mesh[EDGES_FACE1][self.real_edges_face1]
-        self.cols[start:end] = mesh[EDGES_FACE1][self.real_edges_face1]
-        self.coef[start:end] = mesh[COEFFICIENT_TO_DIFFUSION_TERM][t][self.real_edges_face1]
+        self.rows[start:end] = self.edges_face1[self.real_edges_face1]
+        self.cols[start:end] = self.edges_face1[self.real_edges_face1]
+        self.coef[start:end] = diffusion_coefficient[self.real_edges_face1]
 
         start = end
         end = end + len(self.real_edges_face2)
-        self.rows[start:end] = mesh[EDGES_FACE2][self.real_edges_face2]
-        self.cols[start:end] = mesh[EDGES_FACE2][self.real_edges_face2]
-        self.coef[start:end] = mesh[COEFFICIENT_TO_DIFFUSION_TERM][t][self.real_edges_face2]
+        self.rows[start:end] = self.edges_face2[self.real_edges_face2]
+        self.cols[start:end] = self.edges_face2[self.real_edges_face2]
+        self.coef[start:end] = diffusion_coefficient[self.real_edges_face2]
 
         ###### Advection
         # if statement to prevent errors if flow_out_indices or flow_in_indices have length of 0
@@ -110,16 +123,16 @@ class LHS:
 
             # where advection coefficient is positive, the concentration across the face will be the REFERENCE CELL 
             # so the the coefficient will go in the diagonal - both row and column will equal diag_cell
-            self.rows[start:end] = mesh[EDGE_FACE_CONNECTIVITY].T[0][flow_out_indices]
-            self.cols[start:end] = mesh[EDGE_FACE_CONNECTIVITY].T[0][flow_out_indices]
-            self.coef[start:end] = mesh[ADVECTION_COEFFICIENT][t][flow_out_indices]  
+            self.rows[start:end] = self.edge_face_connectivity[0][flow_out_indices]
+            self.cols[start:end] = self.edge_face_connectivity[0][flow_out_indices]
+            self.coef[start:end] = advection_coefficient[flow_out_indices]  
 
             # subtract from corresponding neighbor cell (off-diagonal)
             start = end
             end = end + len(flow_out_indices_internal)
-            self.rows[start:end] = mesh[EDGE_FACE_CONNECTIVITY].T[1][flow_out_indices_internal]
-            self.cols[start:end] = mesh[EDGE_FACE_CONNECTIVITY].T[0][flow_out_indices_internal]
-            self.coef[start:end] = mesh[ADVECTION_COEFFICIENT][t][flow_out_indices_internal] * -1  
+            self.rows[start:end] = self.edge_face_connectivity[1][flow_out_indices_internal]
+            self.cols[start:end] = self.edge_face_connectivity[0][flow_out_indices_internal]
+            self.coef[start:end] = advection_coefficient[flow_out_indices_internal] * -1  
 
         if len(flow_in_indices) > 0:
             # update indices
@@ -128,51 +141,64 @@ class LHS:
 
             ## where it is negative, the concentration across the face will be the neighbor cell ("N")
             ## so the coefficient will be off-diagonal 
-            self.rows[start:end] = mesh[EDGE_FACE_CONNECTIVITY].T[0][flow_in_indices]
-            self.cols[start:end] = mesh[EDGE_FACE_CONNECTIVITY].T[1][flow_in_indices]
-            self.coef[start:end] = mesh[ADVECTION_COEFFICIENT][t][flow_in_indices] 
+            self.rows[start:end] = self.edge_face_connectivity[0][flow_in_indices]
+            self.cols[start:end] = self.edge_face_connectivity[1][flow_in_indices]
+            self.coef[start:end] = advection_coefficient[flow_in_indices] 
 
             ## update indices 
             start = end
             end = end + len(flow_in_indices)
             ## do the opposite on the corresponding diagonal 
-            self.rows[start:end] = mesh[EDGE_FACE_CONNECTIVITY].T[1][flow_in_indices]
-            self.cols[start:end] = mesh[EDGE_FACE_CONNECTIVITY].T[1][flow_in_indices]
-            self.coef[start:end] = mesh[ADVECTION_COEFFICIENT][t][flow_in_indices]  * -1 
+            self.rows[start:end] = self.edge_face_connectivity[1][flow_in_indices]
+            self.cols[start:end] = self.edge_face_connectivity[1][flow_in_indices]
+            self.coef[start:end] = advection_coefficient[flow_in_indices]  * -1 
         
         ###### off-diagonal terms - diffusion
         # update indices
         start = end
         end = end + self.internal_edge_count
-        self.rows[start:end] = mesh[EDGES_FACE1][self.internal_edges]
-        self.cols[start:end] = mesh[EDGES_FACE2][self.internal_edges]
-        self.coef[start:end] = -1 * mesh[COEFFICIENT_TO_DIFFUSION_TERM][t][self.internal_edges]
+        self.rows[start:end] = self.edges_face1[self.internal_edges]
+        self.cols[start:end] = self.edges_face2[self.internal_edges]
+        self.coef[start:end] = -1 * diffusion_coefficient[self.internal_edges]
 
         # update indices and repeat 
         start = end
         end = end + self.internal_edge_count
-        self.rows[start:end] = mesh[EDGES_FACE2][self.internal_edges]
-        self.cols[start:end] = mesh[EDGES_FACE1][self.internal_edges]
-        self.coef[start:end] = -1 * mesh[COEFFICIENT_TO_DIFFUSION_TERM][t][self.internal_edges]    
+        self.rows[start:end] = self.edges_face2[self.internal_edges]
+        self.cols[start:end] = self.edges_face1[self.internal_edges]
+        self.coef[start:end] = -1 * diffusion_coefficient[self.internal_edges]    
     
 class RHS:
     def __init__(
         self,
         mesh: xr.Dataset,
-        input_array: np.array,
+        initial_conditions: np.ndarray,
+        boundary_cells: np.ndarray,
+        boundary_values: np.ndarray,
     ):
         """
         Initialize the right-hand side matrix of concentrations based on user-defined boundary conditions. 
 
+        The right hand side can be built for a single constituent or for a stack of constituents
+        at once; in the latter case every array gains a leading constituent axis.
+
         Args:
-            mesh (xr.Dataset):   UGRID-complaint xarray Dataset with all data required for the transport equation.
-            inp (np.array):      Array of shape (time x nface) with user-defined inputs of concentrations
-                                    in each cell at each timestep. 
+            mesh (xr.Dataset):              UGRID-complaint xarray Dataset with all data required for the transport equation.
+            initial_conditions (np.array):  Array of length nface (or constituent x nface) with user-defined 
+                                                concentrations in each cell at the first timestep.
+            boundary_cells (np.array):      Indices of the ghost cells with user-defined boundary conditions.
+            boundary_values (np.array):     Array of shape (time x boundary_cells), or (time x constituent x boundary_cells), 
+                                                with user-defined concentrations in each boundary cell at each timestep.
         """
         self.nreal_count = mesh.nreal + 1  # 0 indexed
-        self.input_array = input_array
-        self.vals = np.zeros(self.nreal_count)
+        self.nface_count = len(mesh.nface)
+        self.initial_conditions = initial_conditions
+        self.boundary_cells = boundary_cells
+        self.boundary_values = boundary_values
+        self.vals = np.zeros(initial_conditions.shape[:-1] + (self.nreal_count,))
         self.ghost_cells = np.where(mesh[EDGES_FACE2] > mesh.nreal)[0]
+        self.edges_face1 = mesh[EDGES_FACE1].values
+        self.edges_face2 = mesh[EDGES_FACE2].values
 
     def update_values(
         self,
@@ -189,16 +215,32 @@ class RHS:
             solution (np.array):    Solution of concentrations at timestep t from solving sparse matrix. 
             mesh (xr.Dataset):      UGRID-complaint xarray Dataset with all data required for the transport equation.
             t (int):                Timestep
-            name (str):             Constituent name.
+            name (str):             Constituent name (or list of names for a stack of constituents).
+        """
+        solver = np.zeros(self.initial_conditions.shape)
+        solver[..., 0:self.nreal_count] = solution
+        if t == 0:
+            nonzero = self.initial_conditions.nonzero()
+            solver[nonzero] = self.initial_conditions[nonzero]
+        self.vals[:] = self._calculate_rhs(mesh, t, solver[..., 0:self.nreal_count])
+
+    def _boundary_concentrations(self, t: int):
+        """Expand the user-defined boundary conditions at timestep t to all faces.
+
+        Args:
+            t (int):                        Timestep
+
+        Returns:
+            concentrations (np.ndarray):    Array with a length equal to the number of faces in the model
+                                                (per constituent), populated with boundary concentrations in 
+                                                the ghost cells (and the initial conditions at the first timestep).
         """
-        solver = np.zeros(
-            len(
-                mesh[name].isel(time=t)
-            )
-        ) 
-        solver[0:self.nreal_count] = solution
-        solver[self.input_array[t].nonzero()] = self.input_array[t][self.input_array[t].nonzero()] 
-        self.vals[:] = self._calculate_rhs(mesh, t, solver[0:self.nreal_count])
+        if t == 0:
+            concentrations = self.initial_conditions.copy()
+        else:
+            concentrations = np.zeros(self.initial_conditions.shape)
+        concentrations[..., self.boundary_cells] = self.boundary_values[t]
+        return concentrations
 
     def _calculate_change_in_time(self, mesh: xr.Dataset, t: int):
         """Calculate the change in time.
@@ -220,9 +262,9 @@ class RHS:
             t (int):                Timestep
 
         Returns:
-            xr.DataArray of volume values for internal (real) cells at timestep t.
+            np.ndarray of volume values for internal (real) cells at timestep t.
         """
-        return mesh[VOLUME][t][0:self.nreal_count]
+        return mesh[VOLUME].values[t][0:self.nreal_count]
     
     def _calculate_load(self, mesh: xr.DataArray, t: int, concentrations: np.ndarray):
         """Calculate the load 
@@ -253,10 +295,9 @@ class RHS:
             ghost_cells_in (np.ndarray):    Indices of ghost cells that are flowing in to the model mesh
             ghost_cells_out (np.ndarray):   Indices of ghost cells that are receiving flow out of the model mesh.
         """
-        ghost_cells_in = np.zeros(self.nreal_count)
-        ghost_cells_out = np.zeros(self.nreal_count)
-        ghost_cells_in[:] = self._ghost_cell(mesh, t, flowing_in=True)[0:self.nreal_count]
-        ghost_cells_out[:] = self._ghost_cell(mesh, t, flowing_in=False)[0:self.nreal_count]
+        boundary_concentrations = self._boundary_concentrations(t)
+        ghost_cells_in = self._ghost_cell(mesh, t, True, boundary_concentrations)[..., 0:self.nreal_count]
+        ghost_cells_out = self._ghost_cell(mesh, t, False, boundary_concentrations)[..., 0:self.nreal_count]
         return ghost_cells_in, ghost_cells_out
     
     def _calculate_rhs(self, mesh: xr.Dataset, t: int, concentrations: np.ndarray):
@@ -351,7 +392,7 @@ class RHS:
         face_array[np.array(internal_cell_index)] = edge_array[values]
         return face_array
 
-    def _ghost_cell(self, mesh: xr.Dataset, t: int, flowing_in: bool):
+    def _ghost_cell(self, mesh: xr.Dataset, t: int, flowing_in: bool, boundary_concentrations: np.ndarray):
         """
         Manages terms on the right hand side of the matrix associated with ghost cells
             that are flowing in or out of the model mesh.
@@ -362,6 +403,7 @@ class RHS:
             flowing_in (bool):              Indicator of whether the function should return values
                                                 for ghost cells flowing in to the model (True) or
                                                 receiving flow out of the model (false).
+            boundary_concentrations (np.ndarray): User-defined concentrations in the ghost cells at timestep t.
         Returns:
             add_to_rhs (np.ndarray):        Array of transport terms associated with ghost cells
                                                 that should be added to the right hand side.
@@ -369,20 +411,20 @@ class RHS:
         advection, diffusion, condition = self._transport_mechanisms(flowing_in)
         advection_edge, advection_face, diffusion_edge, diffusion_face = self._define_arrays(mesh, advection)
 
-        velocity_indices = np.where(condition(mesh[EDGE_VELOCITY][t], 0))[0]
+        velocity_indices = np.where(condition(mesh[EDGE_VELOCITY].values[t], 0))[0]
         index_list = np.intersect1d(velocity_indices, self.ghost_cells)
-        internal_cell_index = mesh[EDGES_FACE1][index_list]
-        external_cell_index = mesh[EDGES_FACE2][index_list]
+        internal_cell_index = self.edges_face1[index_list]
+        external_cell_index = self.edges_face2[index_list]
 
-        concentration_multipliers = np.zeros(len(mesh.nface))
-        concentration_multipliers[internal_cell_index] = self.input_array[t][external_cell_index] 
+        concentration_multipliers = np.zeros(boundary_concentrations.shape)
+        concentration_multipliers[..., internal_cell_index] = boundary_concentrations[..., external_cell_index]
 
         if len(index_list) != 0:
             if advection:
                 advection_face[:] = self._edge_to_face(
                     advection_edge,
                     advection_face,
-                    mesh[ADVECTION_COEFFICIENT][t],
+                    mesh[ADVECTION_COEFFICIENT].values[t],
                     index_list,
                     internal_cell_index
                     )
@@ -391,7 +433,7 @@ class RHS:
                     diffusion_face[:] = self._edge_to_face(
                         diffusion_edge,
                         diffusion_face,
-                        mesh[COEFFICIENT_TO_DIFFUSION_TERM][t],
+                        mesh[COEFFICIENT_TO_DIFFUSION_TERM].values[t],
                         index_list,
                         internal_cell_index
                         )
@@ -0,0 +1,311 @@
+from typing import (
+    List,
+    Optional,
+    Tuple,
+)
+
+import dask
+import dask.array as da
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from clearwater_riverine.constituents import calculate_mass_flux
+from clearwater_riverine.variables import (
+    ADVECTION_COEFFICIENT,
+    CHANGE_IN_TIME,
+    COEFFICIENT_TO_DIFFUSION_TERM,
+    EDGES_FACE1,
+    EDGES_FACE2,
+    FLOW_ACROSS_FACE,
+    NUMBER_OF_REAL_CELLS,
+    VOLUME,
+)
+
+
+def _boundary_lines(boundary_data: pd.DataFrame):
+    """Boundary condition lines, ordered by ID, and a (boundary edge x line) indicator matrix.
+
+    Returns:
+        names (List[str]): Name of each boundary condition line.
+        edges (np.ndarray): Indices of the edges on the boundary condition lines.
+        membership (np.ndarray): Array of shape (edge x line) that is 1 where an edge is on a line.
+    """
+    lines = boundary_data.groupby('Name')['BC Line ID'].first().sort_values()
+    edges = boundary_data['Face Index'].values.astype(int)
+    line_index = lines.index.get_indexer(boundary_data['Name'])
+    membership = np.zeros((len(edges), len(lines)))
+    membership[np.arange(len(edges)), line_index] = 1
+    return list(lines.index), edges, membership
+
+
+def _domain_totals(mesh: xr.Dataset, t: int, values: np.ndarray):
+    """Volume and mass of each constituent in the real cells at timestep t."""
+    nreal_index = mesh.attrs[NUMBER_OF_REAL_CELLS] + 1
+    volume = np.asarray(mesh[VOLUME].data[t, 0:nreal_index])
+    return np.nansum(volume), np.nansum(volume * values[:, 0:nreal_index], axis=-1)
+
+
+def _domain_budget(
+    names: List[str],
+    volume_start: float,
+    volume_end: float,
+    volume_in: float,
+    volume_out: float,
+    mass_start: np.ndarray,
+    mass_end: np.ndarray,
+    mass_in: np.ndarray,
+    mass_out: np.ndarray,
+) -> pd.DataFrame:
+    """Volume and mass budgets for the whole domain, indexed by constituent."""
+    return pd.DataFrame(
+        {
+            'volume_start': volume_start,
+            'volume_end': volume_end,
+            'volume_in': volume_in,
+            'volume_out': volume_out,
+            'volume_error': volume_start + volume_in - volume_out - volume_end,
+            'mass_start': mass_start,
+            'mass_end': mass_end,
+            'mass_in': mass_in,
+            'mass_out': mass_out,
+            'storage_change': mass_end - mass_start,
+            'mass_error': mass_start + mass_in - mass_out - mass_end,
+        },
+        index=pd.Index(names, name='constituent'),
+    )
+
+
+def _boundary_budget(
+    names: List[str],
+    lines: List[str],
+    volume_in: np.ndarray,
+    volume_out: np.ndarray,
+    mass_in: np.ndarray,
+    mass_out: np.ndarray,
+) -> pd.DataFrame:
+    """Volume and mass budgets per boundary condition line, indexed by (constituent, boundary)."""
+    return pd.DataFrame(
+        {
+            'volume_in': np.tile(volume_in, len(names)),
+            'volume_out': np.tile(volume_out, len(names)),
+            'mass_in': np.ravel(mass_in),
+            'mass_out': np.ravel(mass_out),
+        },
+        index=pd.MultiIndex.from_product(
+            [names, lines],
+            names=['constituent', 'boundary'],
+        ),
+    )
+
+
+def calculate_mass_balance(
+    mesh: xr.Dataset,
+    boundary_data: pd.DataFrame,
+    names: List[str],
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Volume and mass budgets of a completed run, for all constituents at once.
+
+    Works on model meshes that are held in memory as well as on meshes loaded lazily from
+    disk. The flows across boundary condition lines are expressed as dask array operations
+    over all timesteps and reduced with `einsum` against a (boundary edge x line) indicator
+    matrix; only the boundary edges and the first and last timesteps of the domain are read,
+    one chunk at a time, so the full results never need to fit in memory.
+
+    Args:
+        mesh (xr.Dataset): Unstructured model mesh with results for every timestep.
+        boundary_data (pd.DataFrame): RAS model boundaries, with `Name`, `BC Line ID` and `Face Index` columns.
+        names (List[str]): Constituent names.
+
+    Returns:
+        domain (pd.DataFrame): Budgets for the whole domain (see `MassBalanceAccumulator.domain`).
+        boundaries (pd.DataFrame): Budgets per boundary condition line (see `MassBalanceAccumulator.boundaries`).
+    """
+    lines, edges, membership = _boundary_lines(boundary_data)
+    nreal_index = mesh.attrs[NUMBER_OF_REAL_CELLS] + 1
+    end = len(mesh.time) - 1
+
+    def lazy(name: str) -> da.Array:
+        return da.asarray(mesh[name].data)
+
+    # flows during timestep t use the hydrodynamics at t and the concentrations at t + 1
+    delta_time = lazy(CHANGE_IN_TIME)[0:end, np.newaxis]
+    volume = lazy(FLOW_ACROSS_FACE)[0:end][:, edges] * delta_time
+    concentrations = da.stack([lazy(name) for name in names])
+    parent_concentration = concentrations[:, 1:end + 1][..., mesh[EDGES_FACE1].values[edges]]
+    neighbor_concentration = concentrations[:, 1:end + 1][..., mesh[EDGES_FACE2].values[edges]]
+    advection_coefficient = lazy(ADVECTION_COEFFICIENT)[0:end][:, edges]
+    diffusion_coefficient = lazy(COEFFICIENT_TO_DIFFUSION_TERM)[0:end][:, edges]
+    mass = da.where(
+        advection_coefficient < 0,
+        advection_coefficient * neighbor_concentration,
+        advection_coefficient * parent_concentration,
+    ) * delta_time + diffusion_coefficient * \
+        (neighbor_concentration - parent_concentration) * \
+        delta_time
+
+    # volume and mass in the real cells at the start and end
+    cell_volume = lazy(VOLUME)[[0, end], 0:nreal_index]
+    cell_mass = da.nansum(
+        concentrations[:, [0, end], 0:nreal_index] * cell_volume,
+        axis=-1,
+    )
+
+    (
+        volume_in, volume_out, mass_in, mass_out, domain_volume, domain_mass,
+    ) = dask.compute(
+        da.einsum('te,el->l', -da.minimum(volume, 0), membership),
+        da.einsum('te,el->l', da.maximum(volume, 0), membership),
+        da.einsum('cte,el->cl', -da.minimum(mass, 0), membership),
+        da.einsum('cte,el->cl', da.maximum(mass, 0), membership),
+        da.nansum(cell_volume, axis=-1),
+        cell_mass,
+    )
+    domain = _domain_budget(
+        names,
+        volume_start=domain_volume[0],
+        volume_end=domain_volume[1],
+        volume_in=volume_in.sum(),
+        volume_out=volume_out.sum(),
+        mass_start=domain_mass[:, 0],
+        mass_end=domain_mass[:, 1],
+        mass_in=mass_in.sum(axis=1),
+        mass_out=mass_out.sum(axis=1),
+    )
+    boundaries = _boundary_budget(names, lines, volume_in, volume_out, mass_in, mass_out)
+    return domain, boundaries
+
+
+class MassBalanceAccumulator:
+    """Running mass and volume budgets, updated as the model runs.
+
+    For each boundary condition line, the volume and mass of each constituent that crossed
+    the line into and out of the domain are accumulated every timestep. Only the edges on
+    boundary condition lines are visited, so the per-timestep cost does not depend on the
+    size of the mesh, and no mass flux history needs to be kept.
+
+    Volume and mass in the domain are only computed when a budget is requested; the
+    conservation error is the difference between the mass in the domain and the starting
+    mass plus the net inflow across the boundaries.
+
+    Args:
+        mesh (xr.Dataset): Unstructured model mesh.
+        boundary_data (pd.DataFrame): RAS model boundaries, with `Name`, `BC Line ID` and `Face Index` columns.
+        names (List[str]): Constituent names, in storage order.
+        values (np.ndarray): Array of shape (constituent x nface) with concentrations at `start`.
+        start (int, optional): Timestep the budgets start at.
+        state (xr.Dataset, optional): State saved by `state` (e.g., in a checkpoint) at timestep
+            `start`. The budgets continue from it, rather than starting at `start`.
+    """
+    def __init__(
+        self,
+        mesh: xr.Dataset,
+        boundary_data: pd.DataFrame,
+        names: List[str],
+        values: np.ndarray,
+        start: int = 0,
+        state: Optional[xr.Dataset] = None,
+    ):
+        self.names = list(names)
+        self.lines, self.edges, self.membership = _boundary_lines(boundary_data)
+        self.start = start
+        self.time_step = start
+        self._mesh = mesh
+        self._values = values
+
+        if state is not None:
+            if list(state['constituent'].values) != self.names or list(state['line'].values) != self.lines:
+                raise ValueError('The saved budgets do not match the constituents and boundary condition lines.')
+            self.volume_start = state['volume_start'].values[()]
+            self.mass_start = state['mass_start'].values.copy()
+            self.volume_in = state['volume_in'].values.copy()
+            self.volume_out = state['volume_out'].values.copy()
+            self.mass_in = state['mass_in'].values.copy()
+            self.mass_out = state['mass_out'].values.copy()
+            return
+        self.volume_start, self.mass_start = _domain_totals(mesh, start, values)
+        self.volume_in = np.zeros(len(self.lines))
+        self.volume_out = np.zeros(len(self.lines))
+        self.mass_in = np.zeros((len(self.names), len(self.lines)))
+        self.mass_out = np.zeros((len(self.names), len(self.lines)))
+
+    def update(self, mesh: xr.Dataset, t: int, values: np.ndarray):
+        """Accumulate the flows across boundary condition lines during timestep t.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+            t (int): Timestep that was solved.
+            values (np.ndarray): Array of shape (constituent x nface) with concentrations at t + 1.
+        """
+        # positive flows leave the domain
+        volume = np.asarray(mesh[FLOW_ACROSS_FACE].data[t, self.edges]) * \
+            np.asarray(mesh[CHANGE_IN_TIME].data[t])
+        advection_mass_flux, diffusion_mass_flux = calculate_mass_flux(
+            mesh,
+            values[:, np.newaxis],
+            t,
+            edges=self.edges,
+        )
+        mass = advection_mass_flux[:, 0] + diffusion_mass_flux[:, 0]
+
+        self.volume_in -= np.minimum(volume, 0) @ self.membership
+        self.volume_out += np.maximum(volume, 0) @ self.membership
+        self.mass_in -= np.minimum(mass, 0) @ self.membership
+        self.mass_out += np.maximum(mass, 0) @ self.membership
+        self.time_step = t + 1
+        self._mesh = mesh
+        self._values = values
+
+    def state(self) -> xr.Dataset:
+        """Copy of the budgets accumulated so far, to continue accumulating from."""
+        return xr.Dataset(
+            data_vars={
+                'volume_start': self.volume_start,
+                'mass_start': (('constituent',), np.array(self.mass_start)),
+                'volume_in': (('line',), self.volume_in.copy()),
+                'volume_out': (('line',), self.volume_out.copy()),
+                'mass_in': (('constituent', 'line'), self.mass_in.copy()),
+                'mass_out': (('constituent', 'line'), self.mass_out.copy()),
+            },
+            coords={
+                'constituent': np.array(self.names, dtype=object),
+                'line': np.array(self.lines, dtype=object),
+            },
+        )
+
+    def boundaries(self) -> pd.DataFrame:
+        """Volume and mass that entered and left the domain across each boundary condition line.
+
+        Returns:
+            DataFrame indexed by (constituent, boundary) with `volume_in`, `volume_out`,
+            `mass_in` and `mass_out` columns. Inflows and outflows are both positive.
+        """
+        return _boundary_budget(
+            self.names,
+            self.lines,
+            self.volume_in,
+            self.volume_out,
+            self.mass_in,
+            self.mass_out,
+        )
+
+    def domain(self) -> pd.DataFrame:
+        """Volume and mass budgets for the whole domain, from `start` to the last timestep solved.
+
+        Returns:
+            DataFrame indexed by constituent with the volume and mass at the start and end,
+            total inflows and outflows, storage change, and conservation errors
+            (expected minus actual volume and mass at the end).
+        """
+        volume_end, mass_end = _domain_totals(self._mesh, self.time_step, self._values)
+        return _domain_budget(
+            self.names,
+            volume_start=self.volume_start,
+            volume_end=volume_end,
+            volume_in=self.volume_in.sum(),
+            volume_out=self.volume_out.sum(),
+            mass_start=self.mass_start,
+            mass_end=mass_end,
+            mass_in=self.mass_in.sum(axis=1),
+            mass_out=self.mass_out.sum(axis=1),
+        )
@@ -0,0 +1,376 @@
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Literal,
+    Optional,
+    Tuple,
+)
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from clearwater_riverine.constituents import resolve_mass_flux_mode
+from clearwater_riverine.io.hdf import HDFReader
+from clearwater_riverine.output_policy import OutputPolicy
+from clearwater_riverine.variables import (
+    EDGE_FACE_CONNECTIVITY,
+    EDGE_LENGTH,
+    EDGE_NODES,
+    EDGE_VELOCITY,
+    FACE_HYD_DEPTH,
+    FACE_NODES,
+    FACE_SURFACE_AREA,
+    FACE_VEL_X,
+    FACE_VEL_Y,
+    FACE_X,
+    FACE_Y,
+    FLOW_ACROSS_FACE,
+    NODE_X,
+    VOLUME,
+    WATER_SURFACE_ELEVATION,
+)
+
+MEMORY_STAGES = ['read_hydrodynamics', 'calculate_parameters', 'initialize_constituents', 'run']
+BUDGET_ACTIONS = ['raise', 'scratch']
+
+# time-varying hydrodynamics read by `HDFReader.define_hydrodynamics`
+_HYDRODYNAMIC_VARIABLES = [
+    EDGE_VELOCITY,
+    WATER_SURFACE_ELEVATION,
+    VOLUME,
+    FLOW_ACROSS_FACE,
+    FACE_HYD_DEPTH,
+    FACE_VEL_X,
+    FACE_VEL_Y,
+]
+# geometry read in full
+_STATIC_VARIABLES = [
+    NODE_X,
+    FACE_NODES,
+    EDGE_NODES,
+    EDGE_FACE_CONNECTIVITY,
+    FACE_X,
+    FACE_SURFACE_AREA,
+    EDGE_LENGTH,
+]
+_UNITS = {'': 1, 'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12, 'KI': 2**10, 'MI': 2**20, 'GI': 2**30, 'TI': 2**40}
+
+
+def parse_bytes(size: int | str) -> int:
+    """Number of bytes in a size such as 8_000_000_000, '8GB', '512 MiB' or '1.5G'."""
+    if isinstance(size, (int, np.integer)):
+        return int(size)
+    match = re.fullmatch(r'\s*([0-9.]+)\s*([kmgt]i?)?b?\s*', str(size), flags=re.IGNORECASE)
+    if match is None:
+        raise ValueError(f'Invalid memory size: {size!r}.')
+    return int(float(match.group(1)) * _UNITS[(match.group(2) or '').upper()])
+
+
+def format_bytes(size: float) -> str:
+    """Human-readable size, e.g., '1.5 GB'."""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(size) < 1000:
+            return f'{size:.1f} {unit}'
+        size /= 1000
+    return f'{size:.1f} TB'
+
+
+def read_plan_dimensions(
+    flow_field_file_path: str | Path,
+    datetime_range: Optional[Tuple[int, int] | Tuple[str, str]] = None,
+) -> Dict[str, Any]:
+    """Read the dimensions of a RAS plan from HDF metadata, without reading its hydrodynamics.
+
+    Args:
+        flow_field_file_path (str | Path): Filepath to HEC-RAS output.
+        datetime_range (Tuple[int, int] | Tuple[str, str], optional): Timesteps to read (see `ClearwaterRiverine`).
+
+    Returns:
+        Dictionary with the model time (`time`), the number of cells (`nface`), real cells (`nreal`),
+        edges (`nedge`) and boundary edges (`nboundary_edge`), the bytes of geometry read in full
+        (`static_bytes`), and the shape and data type of each time-varying variable in the file
+        (`hydrodynamics`), with its time dimension limited to `datetime_range`.
+    """
+    reader = HDFReader(str(flow_field_file_path), datetime_range=datetime_range)
+    try:
+        time = reader._parse_dates().values
+        edge_faces = reader.infile[reader.paths[EDGE_FACE_CONNECTIVITY]][()]
+        nreal = int(edge_faces[:, 0].max())
+        face_coordinates = reader.infile[reader.paths[FACE_X]][()]
+        static_bytes = sum(
+            reader.infile[reader.paths[name]].nbytes for name in _STATIC_VARIABLES
+        )
+        hydrodynamics = {}
+        for name in _HYDRODYNAMIC_VARIABLES:
+            if reader.paths[name] in reader.infile:
+                dataset = reader.infile[reader.paths[name]]
+                hydrodynamics[name] = ((len(time),) + dataset.shape[1:], dataset.dtype)
+    finally:
+        reader.close()
+    return {
+        'time': time,
+        'nface': len(face_coordinates),
+        'nreal': nreal,
+        'nedge': len(edge_faces),
+        'nboundary_edge': int(np.count_nonzero(edge_faces[:, 1] > nreal)),
+        'face_x': face_coordinates[:, 0],
+        'face_y': face_coordinates[:, 1],
+        'static_bytes': int(static_bytes),
+        'hydrodynamics': hydrodynamics,
+    }
+
+
+def _stored_timesteps(policy: OutputPolicy, time: np.ndarray) -> int:
+    """Number of timesteps an output policy stores (an upper bound with a `tolerance`)."""
+    if policy.every is None and policy.interval is None:
+        return len(time)
+    stored = 0
+    last_time = None
+    for t in range(len(time)):
+        if policy.every is not None and t % policy.every != 0:
+            continue
+        if last_time is not None and policy.interval is not None and time[t] - last_time < policy.interval:
+            continue
+        stored += 1
+        last_time = time[t]
+    return stored
+
+
+def estimate_memory(
+    flow_field_file_path: str | Path,
+    datetime_range: Optional[Tuple[int, int] | Tuple[str, str]] = None,
+    n_constituents: int = 1,
+    output_policy: Optional[OutputPolicy] = None,
+    mass_flux: Optional[str] = None,
+    sync_every: int = 1,
+    streaming: bool = False,
+    scratch: bool = False,
+) -> pd.DataFrame:
+    """Estimate the memory held by a model run at each stage, from the HDF metadata of a RAS plan.
+
+    The stages are:
+        - `read_hydrodynamics`: geometry and time-varying hydrodynamics read by `HDFReader`.
+        - `calculate_parameters`: advection and diffusion coefficients and edge areas
+          calculated by `WQVariableCalculator`.
+        - `initialize_constituents`: constituent histories, boundary conditions and state.
+        - `run`: mass fluxes and the results stored by an output policy, which fill up while
+          the model runs.
+
+    Only the large arrays are counted. Memory-mapped scratch arrays are not counted, since the
+    operating system can release their pages at any time (although they count towards the
+    resident set size while they are in the page cache).
+
+    Args:
+        flow_field_file_path (str | Path): Filepath to HEC-RAS output.
+        datetime_range (Tuple[int, int] | Tuple[str, str], optional): Timesteps to read (see `ClearwaterRiverine`).
+        n_constituents (int, optional): Number of constituents.
+        output_policy (OutputPolicy, optional): Selection of results to store.
+        mass_flux (str, optional): Mass flux mode (`full`, `boundary`, `deferred` or `off`). Defaults
+            to `full`, or to `off` with an output policy.
+        sync_every (int, optional): Number of timesteps between writes to the model mesh.
+        streaming (bool, optional): Whether results are streamed to disk.
+        scratch (bool, optional): Whether a scratch directory holds the time-varying arrays.
+
+    Returns:
+        DataFrame indexed by stage, with the bytes allocated by each stage (`allocated`), the
+        bytes held at its end (`resident`), and the highest number of bytes held during it
+        (`peak`), including temporary arrays.
+    """
+    mass_flux = resolve_mass_flux_mode(mass_flux, output_policy)
+    plan = read_plan_dimensions(flow_field_file_path, datetime_range)
+    n_time = len(plan['time'])
+    n_face = plan['nface']
+    n_edge = plan['nedge']
+    n_ghost = n_face - plan['nreal'] - 1
+    hydrodynamics = plan['hydrodynamics']
+    itemsize = {name: np.dtype(dtype).itemsize for name, (_, dtype) in hydrodynamics.items()}
+    float_size = np.dtype(np.float64).itemsize
+    rows = {}
+    resident = 0
+
+    def add_stage(stage: str, allocated: int, transient: int = 0, released: int = 0):
+        nonlocal resident
+        peak = resident + allocated + transient
+        resident += allocated - released
+        rows[stage] = {'allocated': allocated - released, 'resident': resident, 'peak': peak}
+
+    # read hydrodynamics
+    allocated = plan['static_bytes']
+    if not scratch:
+        allocated += sum(
+            int(np.prod(shape)) * itemsize[name] for name, (shape, _) in hydrodynamics.items()
+        )
+    derived = 0
+    transient = 0
+    if FACE_VEL_X in hydrodynamics and FACE_VEL_Y in hydrodynamics:
+        # velocity magnitude, and the squared components it is calculated from
+        derived = n_time * n_face * itemsize[FACE_VEL_X]
+        transient = 2 * derived
+    add_stage('read_hydrodynamics', allocated + derived, transient)
+
+    # calculate parameters
+    if FLOW_ACROSS_FACE in hydrodynamics:
+        # advection coefficient and vertical area (in the hydrodynamic precision),
+        # and the coefficient to the diffusion term
+        edge_size = itemsize[FLOW_ACROSS_FACE]
+        parameters = n_time * n_edge * (2 * edge_size + float_size)
+        transient = 2 * n_time * n_edge * edge_size
+    else:
+        # vertical areas, advection coefficient, face flow and coefficient to the diffusion term
+        parameters = 4 * n_time * n_edge * float_size
+        transient = n_time * n_edge * float_size
+    if VOLUME not in hydrodynamics:
+        parameters += n_time * n_face * float_size
+    # with scratch, parameters are calculated in memory and then moved to disk
+    add_stage(
+        'calculate_parameters',
+        parameters,
+        transient,
+        released=parameters + derived if scratch else 0,
+    )
+
+    # initialize constituents
+    in_memory_history = not (scratch or streaming or output_policy is not None)
+    histories = n_constituents * n_time * n_face * float_size if in_memory_history else 0
+    boundary_values = n_constituents * n_time * n_ghost * float_size
+    state = n_constituents * n_face * float_size * (sync_every + 3)
+    # boundary conditions are read per constituent before they are stacked
+    add_stage('initialize_constituents', histories + boundary_values + state, boundary_values)
+
+    # run
+    flux_edges = {'full': n_edge, 'deferred': n_edge, 'boundary': plan['nboundary_edge'], 'off': 0}[mass_flux]
+    fluxes = 0 if scratch else 3 * n_constituents * n_time * flux_edges * float_size
+    stored = 0
+    transient = 0
+    if output_policy is not None:
+        n_stored_constituents = n_constituents
+        if output_policy.constituents is not None:
+            n_stored_constituents = min(len(output_policy.constituents), n_constituents)
+        cells = output_policy.select_cells(
+            xr.Dataset(coords={
+                FACE_X: ('nface', plan['face_x']),
+                FACE_Y: ('nface', plan['face_y']),
+            })
+        )
+        buffer = n_stored_constituents * sync_every * len(cells) * float_size
+        stored = buffer
+        if not streaming:
+            blocks = n_stored_constituents * _stored_timesteps(output_policy, plan['time']) * len(cells) * float_size
+            stored += blocks
+            # blocks are concatenated when the output is read
+            transient = blocks
+    add_stage('run', fluxes + stored, transient)
+
+    return pd.DataFrame.from_dict(
+        rows,
+        orient='index',
+        columns=['allocated', 'resident', 'peak'],
+    ).rename_axis('stage')
+
+
+class MemoryBudget:
+    """Limits the memory a model run may use, based on `estimate_memory`.
+
+    The estimate is made from the HDF metadata before any hydrodynamics are read. When the
+    estimated peak exceeds the limit, the model either refuses to run (`raise`), or (`scratch`)
+    holds the time-varying hydrodynamics, constituent histories and mass fluxes in memory-mapped
+    scratch files, and only refuses to run if the estimate still exceeds the limit.
+
+    Args:
+        limit (int | str): Maximum number of bytes, e.g., 8_000_000_000 or '8GB'.
+        action (str, optional): `raise` or `scratch`.
+        scratch_directory (str | Path, optional): Directory for scratch files with the `scratch`
+            action. Defaults to the system temporary directory.
+    """
+    def __init__(
+        self,
+        limit: int | str,
+        action: Literal['raise', 'scratch'] = 'raise',
+        scratch_directory: Optional[str | Path] = None,
+    ):
+        self.limit = parse_bytes(limit)
+        if self.limit <= 0:
+            raise ValueError('The memory limit must be positive.')
+        if action not in BUDGET_ACTIONS:
+            raise ValueError(f'action must be one of {BUDGET_ACTIONS}.')
+        self.action = action
+        self.scratch_directory = scratch_directory
+
+    def exceeded(self, estimate: pd.DataFrame) -> bool:
+        """Whether the estimated peak of any stage exceeds the limit."""
+        return bool(estimate['peak'].max() > self.limit)
+
+    def error(self, estimate: pd.DataFrame) -> MemoryError:
+        """Error describing the stage with the highest estimated peak."""
+        stage = estimate['peak'].idxmax()
+        return MemoryError(
+            f'Estimated peak memory of {format_bytes(estimate.loc[stage, "peak"])} '
+            f'(during {stage}) exceeds the budget of {format_bytes(self.limit)}. '
+            'Reduce the datetime_range or constituents, or use an output policy, '
+            'stream_file_path or scratch_directory.'
+        )
+
+
+def current_rss() -> Optional[int]:
+    """Current resident set size of this process in bytes, or None where it is not available."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        return None
+    return pages * resource.getpagesize()
+
+
+def peak_rss() -> Optional[int]:
+    """Highest resident set size of this process so far in bytes, or None where it is not available."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryProfiler:
+    """Records the resident set size of the process at the end of each stage of a model run.
+
+    The peak resident set size is the high-water mark of the process, so `peak_increase`
+    is how much a stage raised it: a stage that stays below an earlier peak shows no increase.
+    A disabled profiler returns immediately from `mark()`.
+
+    Args:
+        enabled (bool, optional): Whether to record memory use.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._stages: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+
+    def mark(self, stage: str):
+        """Record the memory use at the end of a stage; marking a stage again replaces its record.
+
+        Args:
+            stage (str): Stage name.
+        """
+        if not self.enabled:
+            return
+        self._stages[stage] = (current_rss(), peak_rss())
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Resident set size (`rss`), peak resident set size (`peak_rss`) and the increase of the
+        peak (`peak_increase`) at the end of each stage, in bytes."""
+        measured = pd.DataFrame.from_dict(
+            self._stages,
+            orient='index',
+            columns=['rss', 'peak_rss'],
+            dtype=float,
+        ).rename_axis('stage')
+        measured['peak_increase'] = measured['peak_rss'].diff()
+        return measured
@@ -3,8 +3,10 @@ from pathlib import Path
 from typing import (
     Optional,
     Tuple,
+    TYPE_CHECKING,
 )
 
+import numpy as np
 import xarray as xr
 import pandas as pd
 
@@ -13,8 +15,22 @@ from clearwater_riverine.io.inputs import (
     RASReader,
     ClearWaterRiverineLoader,
 )
-from clearwater_riverine.io.outputs import ClearWaterRiverineOutput, ClearWaterRiverineWriter
+from clearwater_riverine.io.scratch import ScratchStore
+from clearwater_riverine.io.outputs import (
+    ClearWaterRiverineOutput,
+    ClearWaterRiverineWriter,
+    UNSAVED_ATTRIBUTES,
+)
 from clearwater_riverine.utilities import WQVariableCalculator
+from clearwater_riverine.variables import (
+    FACE_NODES,
+    NODE_X,
+    NODE_Y,
+)
+
+if TYPE_CHECKING:
+    import shapely
+
 
 def instantiate_model_mesh(diffusion_coefficient_input: float) -> xr.Dataset:
     """ Initialize the Clearwater Model Mesh
@@ -60,6 +76,50 @@ def load_model_mesh(
     # write output
     loader = ClearWaterRiverineLoader(mesh_file_path)
     return loader.load_mesh()
+
+
+def cell_polygons(mesh: xr.Dataset, n_cells: Optional[int] = None) -> np.ndarray:
+    """Build a polygon for each cell from the face node connectivity, in a single vectorized call.
+
+    Args:
+        mesh (xr.Dataset): Unstructured model mesh.
+        n_cells (int, optional): Only build polygons for the first `n_cells` cells (e.g., the real cells).
+
+    Returns:
+        Array of shapely polygons, in the coordinate system of the RAS model.
+    """
+    import shapely
+
+    face_nodes = mesh[FACE_NODES].values[0:n_cells]
+    valid = face_nodes != -1
+    nodes = face_nodes[valid]
+    coordinates = np.column_stack([mesh[NODE_X].values[nodes], mesh[NODE_Y].values[nodes]])
+    rings = shapely.linearrings(
+        coordinates,
+        indices=np.nonzero(valid)[0],
+    )
+    return shapely.polygons(rings)
+
+
+def containing_cells(tree: 'shapely.STRtree', x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Find the cell containing each point with a spatial index over cell polygons.
+
+    Args:
+        tree (shapely.STRtree): Spatial index over cell polygons (e.g., of `cell_polygons`).
+        x (np.ndarray): Point x-coordinates, in the coordinate system of the polygons.
+        y (np.ndarray): Point y-coordinates, in the coordinate system of the polygons.
+
+    Returns:
+        Index of the cell containing each point, or -1 for points outside the cells.
+    """
+    import shapely
+
+    points, cells = tree.query(shapely.points(x, y), predicate='intersects')
+    # a point on a cell edge takes the first cell it touches
+    cell = np.full(len(x), -1)
+    found, first = np.unique(points, return_index=True)
+    cell[found] = cells[first]
+    return cell
     
 
 @xr.register_dataset_accessor("cwr")
@@ -83,18 +143,22 @@ class ClearWaterXarray:
     def read_ras(
         self,
         file_path: str,
-        datetime_range: Optional[Tuple[int, int] | Tuple[str, str]] = None
+        datetime_range: Optional[Tuple[int, int] | Tuple[str, str]] = None,
+        scratch: Optional[ScratchStore] = None,
     ) -> xr.Dataset:
         """Read information in RAS output file to the mesh
         Args:
             file_path (str): RAS output filepath
+            scratch (ScratchStore, optional): If given, time-varying hydrodynamics
+                are read into memory-mapped arrays in this store.
         """
         ras_data = RASInput(file_path, self._obj)
         reader = RASReader()
         reader.read_to_xarray(
             ras_data,
             file_path,
-            datetime_range=datetime_range
+            datetime_range=datetime_range,
+            scratch=scratch,
         )
         self._obj = ras_data.mesh
         return self._obj
@@ -117,15 +181,7 @@ class ClearWaterXarray:
             output_file_path (str): name of file path to save clearwater output
         """
         # must delete certain attributes before saving 
-        for key in ['face_area_elevation_info',
-                    'face_area_elevation_values',
-                    'face_normalunitvector_and_length',
-                    'face_cell_indexes_df',
-                    'face_volume_elevation_info',
-                    'face_volume_elevation_values',
-                    'boundary_data',
-                    'volume_calculation_required',
-                    'face_area_calculation_required']:
+        for key in UNSAVED_ATTRIBUTES:
             self._attempt_delete(key)
 
         # write output
@@ -0,0 +1,247 @@
+from typing import (
+    Any,
+    List,
+    Optional,
+    TYPE_CHECKING,
+)
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from clearwater_riverine.io.outputs import ZarrStreamWriter
+from clearwater_riverine.variables import (
+    FACE_X,
+    FACE_Y,
+)
+
+if TYPE_CHECKING:
+    import shapely
+
+
+class OutputPolicy:
+    """Selects which results are stored.
+
+    By default every timestep of every constituent in every cell is stored. Timestep
+    selections combine: a timestep is stored if it is an `every`th timestep, at least
+    `interval` of model time has passed since the last stored timestep, and (with a
+    `tolerance`) the stored values changed by more than the tolerance. The initial
+    conditions are always stored.
+
+    Args:
+        every (int, optional): Store every Nth timestep.
+        interval (str | pd.Timedelta, optional): Minimum model time between stored timesteps, e.g., '15min'.
+        cells (array-like, optional): Indices of the cells to store.
+        region (shapely.Geometry, optional): Only store cells with a centroid inside this region,
+            in the coordinate system of the RAS model.
+        constituents (List[str], optional): Names of the constituents to store.
+        tolerance (float, optional): Only store a timestep when at least one stored value changed
+            by more than this amount since the last stored timestep.
+    """
+    def __init__(
+        self,
+        every: Optional[int] = None,
+        interval: Optional[str | pd.Timedelta] = None,
+        cells: Optional[Any] = None,
+        region: Optional['shapely.Geometry'] = None,
+        constituents: Optional[List[str]] = None,
+        tolerance: Optional[float] = None,
+    ):
+        if every is not None and every < 1:
+            raise ValueError('every must be a positive integer.')
+        self.every = every
+        self.interval = None if interval is None else pd.Timedelta(interval).to_timedelta64()
+        self.cells = None if cells is None else np.unique(np.asarray(cells, dtype=int))
+        self.region = region
+        self.constituents = constituents
+        self.tolerance = tolerance
+
+    def select_constituents(self, names: List[str]) -> List[str]:
+        """Names of the constituents to store, in model order."""
+        if self.constituents is None:
+            return list(names)
+        missing = set(self.constituents) - set(names)
+        if missing:
+            raise ValueError(f'Output constituents {sorted(missing)} are not in the model.')
+        return [name for name in names if name in self.constituents]
+
+    def select_cells(self, mesh: xr.Dataset) -> np.ndarray:
+        """Indices of the cells to store."""
+        cells = np.arange(len(mesh.nface))
+        if self.cells is not None:
+            cells = self.cells
+        if self.region is not None:
+            import shapely
+
+            inside = shapely.contains_xy(
+                self.region,
+                mesh[FACE_X].values[cells],
+                mesh[FACE_Y].values[cells],
+            )
+            cells = cells[inside]
+        return cells
+
+    def should_store(
+        self,
+        t: int,
+        time: np.datetime64,
+        last_time: np.datetime64,
+        values: np.ndarray,
+        last_values: np.ndarray,
+    ) -> bool:
+        """Whether timestep t is stored, given the last stored timestep.
+
+        Args:
+            t (int): Timestep.
+            time (np.datetime64): Model time at timestep t.
+            last_time (np.datetime64): Model time of the last stored timestep.
+            values (np.ndarray): Values that would be stored at timestep t.
+            last_values (np.ndarray): Values stored at the last stored timestep.
+        """
+        if self.every is not None and t % self.every != 0:
+            return False
+        if self.interval is not None and time - last_time < self.interval:
+            return False
+        if self.tolerance is not None:
+            with np.errstate(invalid='ignore'):
+                changed = np.abs(values - last_values) > self.tolerance
+            changed |= np.isnan(values) != np.isnan(last_values)
+            return bool(changed.any())
+        return True
+
+
+class OutputRecorder:
+    """Stores the results selected by an `OutputPolicy`.
+
+    Stored timesteps are buffered and committed in blocks, either to memory or to a
+    Zarr store that grows along time.
+
+    Args:
+        policy (OutputPolicy): Selection of results to store.
+        mesh (xr.Dataset): Unstructured model mesh.
+        names (List[str]): Names of all constituents in the model, in storage order.
+        units (List[str]): Units of each constituent.
+        block_size (int): Number of stored timesteps in each block.
+        writer (ZarrStreamWriter, optional): Writer to stream stored results to.
+    """
+    def __init__(
+        self,
+        policy: OutputPolicy,
+        mesh: xr.Dataset,
+        names: List[str],
+        units: List[str],
+        block_size: int,
+        writer: Optional[ZarrStreamWriter] = None,
+    ):
+        self.policy = policy
+        self.names = policy.select_constituents(names)
+        self.units = {name: unit for name, unit in zip(names, units) if name in self.names}
+        self.constituent_index = np.array([names.index(name) for name in self.names], dtype=int)
+        self.cells = policy.select_cells(mesh)
+        self.model_time = mesh.time.values
+        self.writer = writer
+
+        self.buffer = np.empty((len(self.names), block_size, len(self.cells)))
+        self.buffer_steps: List[int] = []
+        self.steps: List[int] = []
+        self.blocks: List[np.ndarray] = []
+        self.last_values = None
+
+    def _select(self, values: np.ndarray) -> np.ndarray:
+        """Select the stored constituents and cells from a (constituent x nface) array."""
+        return values[np.ix_(self.constituent_index, self.cells)]
+
+    def record(self, t: int, values: np.ndarray):
+        """Store timestep t if the policy selects it.
+
+        Args:
+            t (int): Timestep.
+            values (np.ndarray): Array of shape (constituent x nface) with concentrations at timestep t.
+        """
+        selected = self._select(values)
+        if self.steps and not self.policy.should_store(
+            t,
+            self.model_time[t],
+            self.model_time[self.steps[-1]],
+            selected,
+            self.last_values,
+        ):
+            return
+        self.buffer[:, len(self.buffer_steps)] = selected
+        self.buffer_steps.append(t)
+        self.steps.append(t)
+        self.last_values = selected
+        if len(self.buffer_steps) == self.buffer.shape[1]:
+            self.flush()
+
+    def store_current(self, t: int, values: np.ndarray):
+        """Store timestep t again, if it was stored, e.g., after it was overridden.
+
+        Args:
+            t (int): Timestep.
+            values (np.ndarray): Array of shape (constituent x nface) with concentrations at timestep t.
+        """
+        if not self.steps or self.steps[-1] != t:
+            return
+        selected = self._select(values)
+        self.last_values = selected
+        if self.buffer_steps:
+            self.buffer[:, len(self.buffer_steps) - 1] = selected
+        elif self.writer is not None:
+            self.writer.write(
+                len(self.steps) - 1,
+                {name: selected[i][np.newaxis].copy() for i, name in enumerate(self.names)},
+            )
+        else:
+            self.blocks[-1][:, -1] = selected
+
+    def flush(self):
+        """Commit buffered timesteps to memory (or stream them to disk)."""
+        if not self.buffer_steps:
+            return
+        block = self.buffer[:, 0:len(self.buffer_steps)].copy()
+        if self.writer is not None:
+            self.writer.append(self._to_dataset(block, self.buffer_steps))
+        else:
+            self.blocks.append(block)
+        self.buffer_steps = []
+
+    def _to_dataset(self, block: np.ndarray, steps: List[int]) -> xr.Dataset:
+        """Wrap a (constituent x time x cell) block of stored results."""
+        return xr.Dataset(
+            data_vars={
+                name: xr.DataArray(
+                    block[i],
+                    dims=('time', 'nface'),
+                    attrs={'Units': f'{self.units[name]}'},
+                )
+                for i, name in enumerate(self.names)
+            },
+            coords={
+                'time': self.model_time[steps],
+                'nface': self.cells,
+            },
+        )
+
+    def output(self) -> xr.Dataset:
+        """Results committed so far, with dimensions (stored timestep x stored cell)."""
+        if self.writer is not None:
+            return xr.open_zarr(self.writer.output_file_path)
+        committed = len(self.steps) - len(self.buffer_steps)
+        if len(self.blocks) > 1:
+            self.blocks = [np.concatenate(self.blocks, axis=1)]
+        block = self.blocks[0] if self.blocks else self.buffer[:, 0:0]
+        return self._to_dataset(block, self.steps[0:committed])
+
+    def update_mesh(self, mesh: xr.Dataset):
+        """Expose committed results in the model mesh on the full (time x nface) grid.
+
+        Results are placed lazily, so only the requested slices are ever materialized;
+        timesteps and cells that were not stored are NaN.
+        """
+        output = self.output()
+        for name in self.names:
+            mesh[name] = output[name].chunk().reindex(
+                time=self.model_time,
+                nface=np.arange(len(mesh.nface)),
+            ).drop_vars('nface')
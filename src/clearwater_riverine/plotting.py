@@ -0,0 +1,503 @@
+"""Plotting of model results, imported on the first call to a plotting method.
+
+Importing this module loads the HoloViz, geopandas and matplotlib stack and activates
+the HoloViews Bokeh extension, so that headless runs (e.g., batch workers) do not pay for it.
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import (
+    List,
+    Optional,
+    Sequence,
+    TYPE_CHECKING,
+)
+import tempfile
+import warnings
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import holoviews as hv
+import geoviews as gv
+import geopandas as gpd
+hv.extension("bokeh")
+
+from clearwater_riverine.animation import ANIMATION_WRITERS, render_frames
+from clearwater_riverine.io.geometry import cell_geodataframe
+from clearwater_riverine.mesh import cell_polygons
+from clearwater_riverine.rasterize import CellRasterizer
+from clearwater_riverine.variables import (
+    FACE_X,
+    FACE_Y,
+    NUMBER_OF_REAL_CELLS,
+    VOLUME,
+)
+
+if TYPE_CHECKING:
+    from clearwater_riverine.transport import ClearwaterRiverine
+
+# number of recently plotted timesteps to keep as GeoDataFrames
+FRAME_CACHE_SIZE = 64
+# coordinate system of rasterized plots, matching the web map tiles
+PLOT_RASTER_CRS = 'EPSG:3857'
+
+
+class ModelPlotter:
+    """Plots the results of a `ClearwaterRiverine` model.
+
+    Holds the plotting state of the model: the cell polygons, recently plotted frames and
+    rasterizers. Use the plotting methods of `ClearwaterRiverine`, which create a plotter on first use.
+
+    Args:
+        model (ClearwaterRiverine): Model to plot.
+    """
+    def __init__(self, model: 'ClearwaterRiverine'):
+        self.model = model
+        self.poly_gdf = None
+        self.plotting_time_step = model.time_step
+        self._frames = OrderedDict()
+        self._rasterizers = {}
+
+    def _prep_gdf(
+        self,
+        crs: str,
+        ):
+        """ Creates a geodataframe of polygons to represent each RAS cell. 
+
+        Args:
+            crs: coordinate system of RAS project.
+
+        Notes:
+            Could we parse the CRS from the PRJ file?
+        """
+
+        self.nreal_index = self.model.mesh.attrs[NUMBER_OF_REAL_CELLS] + 1
+        self.poly_gdf = cell_geodataframe(
+            self.model.mesh,
+            crs,
+            cache_directory=self.model.geometry_cache_directory,
+        )
+        self._rasterizers.pop(PLOT_RASTER_CRS, None)
+        self._clear_frames()
+
+    def _rasterizer(self, crs: str | None) -> CellRasterizer:
+        """Rasterizer over the real cells, in `PLOT_RASTER_CRS` or (if `crs` is None) in model coordinates."""
+        if crs not in self._rasterizers:
+            if crs is None:
+                polygons = cell_polygons(self.model.mesh, self.model.mesh.attrs[NUMBER_OF_REAL_CELLS] + 1)
+            else:
+                polygons = np.asarray(self.poly_gdf.to_crs(crs).geometry.values)
+            self._rasterizers[crs] = CellRasterizer(polygons)
+        return self._rasterizers[crs]
+
+    def _raster_map(
+        self,
+        crs: str | None,
+        constituent_name: str,
+        filter_empty: bool,
+        width: int,
+        height: int,
+    ) -> hv.DynamicMap:
+        """DynamicMap of images of a constituent, re-rasterized whenever the plot is zoomed or panned."""
+        rasterizer = self._rasterizer(crs)
+        nreal_index = self.model.mesh.attrs[NUMBER_OF_REAL_CELLS] + 1
+        time_index = pd.Index(self.model.mesh.time.values)
+
+        def raster_generator(datetime, x_range, y_range):
+            """This function generates images for the DynamicMap"""
+            t = time_index.get_loc(datetime)
+            values = np.asarray(self.model.mesh[constituent_name].data[t, 0:nreal_index], dtype=float)
+            if filter_empty:
+                values = np.where(np.asarray(self.model.mesh[VOLUME].data[t, 0:nreal_index]) != 0, values, np.nan)
+            xs, ys, image = rasterizer.rasterize(values, x_range, y_range, width, height)
+            return hv.Image((xs, ys, image), kdims=['x', 'y'], vdims=[constituent_name])
+
+        return hv.DynamicMap(raster_generator, kdims=['datetime'], streams=[hv.streams.RangeXY()])
+
+    def _clear_frames(self):
+        """Drop cached plot frames, e.g., after the model has advanced."""
+        self.plotting_time_step = self.model.time_step
+        self._frames.clear()
+
+    def _build_frame(self, t: int) -> gpd.GeoDataFrame:
+        """Join the concentrations and volumes of the real cells at timestep t to the cell polygons."""
+        cells = slice(0, self.nreal_index)
+        frame = {
+            'datetime': np.repeat(self.model.mesh.time.values[t], self.nreal_index),
+            'cell': self.model.mesh.nface.values[cells],
+            FACE_X: self.model.mesh[FACE_X].values[cells],
+            FACE_Y: self.model.mesh[FACE_Y].values[cells],
+        }
+        for element in self.model.constituents + [VOLUME]:
+            frame[element] = np.asarray(self.model.mesh[element].data[t, cells])
+        frame['geometry'] = self.poly_gdf.geometry.values
+        return gpd.GeoDataFrame(frame, crs=self.poly_gdf.crs)
+
+    def _frame(self, t: int) -> gpd.GeoDataFrame:
+        """GeoDataFrame of the real cells at timestep t, from a cache of recently plotted timesteps.
+
+        The cell polygons are stored once (`poly_gdf`), and each timestep is joined to them on demand,
+        so memory does not grow with the number of timesteps.
+        """
+        if t in self._frames:
+            self._frames.move_to_end(t)
+            return self._frames[t]
+        frame = self._build_frame(t)
+        self._frames[t] = frame
+        if len(self._frames) > FRAME_CACHE_SIZE:
+            self._frames.popitem(last=False)
+        return frame
+
+    @property
+    def gdf(self) -> gpd.GeoDataFrame | None:
+        """GeoDataFrame of the real cells at every timestep, once a polygon plot has been made.
+
+        This is built on demand and repeats each polygon for every timestep; plots only join the
+        timesteps they show.
+        """
+        if self.poly_gdf is None:
+            return None
+        return pd.concat(
+            [self._build_frame(t) for t in range(len(self.model.mesh.time))],
+            ignore_index=True,
+        )
+
+
+    def _maximum_plotting_value(
+        self,
+        clim_max: float,
+        constituent_name: str,
+    ) -> float:
+        """ Calculate the maximum value for color bar. 
+        
+        Uses the maximum concentration value in the model mesh if no user-defined  clim_max is specified,
+        otherwise defines the maximum value as clim_max. 
+
+        Args:
+            clim_max (float): user defined maximum colorbar value or default (None)
+            constituent_name (str): constituent to plot. 
+        
+        Returns:
+            mval (float): maximum plotting value, either based on user input or the maximum concentration value.
+        """
+        if clim_max != None:
+            mx_val = clim_max
+        else:
+            if self.model.constituent_dict[constituent_name].max_value == None:
+                self.model.set_value_range(constituent_name)
+            mx_val = self.model.constituent_dict[constituent_name].max_value
+        return mx_val
+
+    def _minimum_plotting_value(
+        self,
+        clim_min,
+        constituent_name: str,
+    ) -> float:
+        """ Calculate the maximum value for color bar. 
+        
+        Uses the maximum concentration value in the model mesh if no user-defined  clim_max is specified,
+        otherwise defines the maximum value as clim_max. 
+
+        Args:
+            clim_min (float): user defined minimum colorbar value or default (None)
+            constituent_name (str): constituent to plot. 
+        
+        Returns:
+            mval (float): minimum plotting value, either based on user input or the minimum concentration value.
+        """
+        if clim_min != None:
+            mn_val = clim_min
+        else:
+            if self.model.constituent_dict[constituent_name].min_value == None:
+                self.model.set_value_range(constituent_name)
+            mn_val = self.model.constituent_dict[constituent_name].min_value
+        return mn_val
+
+    def _check_constituent(
+        self,
+        constituent_name,
+    ):
+        """User warning."""
+        if constituent_name is None:
+            constituent_name = self.model.constituents[0]
+            warnings.warn(
+                f"No constituent name defined. Plotting {constituent_name}.",
+                UserWarning
+            )
+        return constituent_name
+    
+    def _define_clims(
+        self,
+        clim: tuple,
+        constituent_name: str,
+    ):
+        """Define color limit extent."""
+
+        mx_val = self._maximum_plotting_value(
+            clim_max=clim[1],
+            constituent_name=constituent_name
+        )
+        mn_val = self._minimum_plotting_value(
+            clim_min=clim[0],
+            constituent_name=constituent_name
+        )
+        return mx_val, mn_val
+
+    def _prep_plot(
+        self,
+        constituent_name: str | None,
+        clim: tuple,
+        gdf_plot=False,
+        crs: Optional[str] = None,
+    ):
+        """Duplicate code for prepping plots."""
+        self.model.sync()
+        if gdf_plot:
+            if self.poly_gdf is None:
+                if crs == None:
+                    raise ValueError("This is your first time running the plot function. You must specify a crs!")
+                else:
+                    self._prep_gdf(crs)
+        
+            if self.plotting_time_step != self.model.time_step:
+                self._clear_frames()
+            
+        constituent_name = self._check_constituent(constituent_name)
+
+        mx_val, mn_val = self._define_clims(
+            clim=clim,
+            constituent_name=constituent_name
+        )
+        return constituent_name, mx_val, mn_val
+        
+
+    def plot(
+        self,
+        constituent_name: Optional[str] = None,
+        crs: Optional[str] = None,
+        clim: Optional[tuple] = (None, None),
+        cmap: Optional[str] = 'OrRd',
+        time_index_range: Optional[tuple] = (0, -1), 
+        filter_empty: Optional[bool] = True,
+        rasterize: Optional[bool] = False,
+    ):
+        """See `ClearwaterRiverine.plot()`."""
+
+        constituent_name, mx_val, mn_val = self._prep_plot(
+            constituent_name=constituent_name,
+            clim=clim,
+            gdf_plot=True,
+            crs=crs,
+        )
+
+        times = self.model.mesh.time.values[time_index_range[0]: time_index_range[1]]
+        units = self.model.mesh[constituent_name].Units
+        if rasterize:
+            dmap = self._raster_map(
+                crs=PLOT_RASTER_CRS,
+                constituent_name=constituent_name,
+                filter_empty=filter_empty,
+                width=800,
+                height=400,
+            ).opts(
+                height = 400,
+                width = 800,
+                colorbar = True,
+                cmap = cmap,
+                clim = (mn_val, mx_val),
+                tools = ['hover'],
+                clabel = f"{constituent_name} ({units})"
+            )
+            return (hv.element.tiles.CartoLight() * dmap).redim.values(datetime=times)
+
+        time_index = pd.Index(self.model.mesh.time.values)
+
+        def map_generator(datetime):
+            """This function generates plots for the DynamicMap"""
+            ras_sub_df = self._frame(time_index.get_loc(datetime))
+            if filter_empty:
+                ras_sub_df = ras_sub_df[ras_sub_df[VOLUME] != 0]
+            ras_map = gv.Polygons(
+                ras_sub_df,
+                vdims=[constituent_name, 'cell']).opts(
+                    height = 400,
+                    width = 800,
+                    color=constituent_name,
+                    colorbar = True,
+                    cmap = cmap,
+                    clim = (mn_val, mx_val),
+                    line_width = 0.1,
+                    tools = ['hover'],
+                    clabel = f"{constituent_name} ({units})"
+            )
+            return (ras_map * gv.tile_sources.CartoLight())
+
+        dmap = hv.DynamicMap(map_generator, kdims=['datetime'])
+        return dmap.redim.values(datetime=times)
+
+    def quick_plot(
+        self,
+        constituent_name: Optional[str] = None,
+        clim: Optional[tuple] = (None,None),
+        cmap: Optional[str] = 'OrRd',
+        rasterize: Optional[bool] = False,
+    ):
+        """See `ClearwaterRiverine.quick_plot()`."""
+        constituent_name, mx_val, mn_val = self._prep_plot(
+            constituent_name=constituent_name,
+            clim=clim,
+        )
+        if rasterize:
+            return self._raster_map(
+                crs=None,
+                constituent_name=constituent_name,
+                filter_empty=False,
+                width=1000,
+                height=500,
+            ).opts(
+                width = 1000,
+                height = 500,
+                cmap = cmap, 
+                clim = (mn_val, mx_val),
+                tools = ['hover'], 
+                colorbar = True
+            ).redim.values(datetime=self.model.mesh.time.values)
+
+        def quick_map_generator(datetime):
+            """This function generates plots for the DynamicMap"""
+            ds = self.model.mesh.sel(time=datetime)
+            ind = np.where(
+                ds[constituent_name][0:self.model.mesh.attrs['nreal']] > 0
+            )
+            nodes = np.column_stack(
+                [
+                    ds.face_x[ind], ds.face_y[ind],
+                    ds[constituent_name][ind], ds['nface'][ind]
+                ]
+            )
+            nodes = hv.Points(nodes, vdims=[constituent_name, 'nface'])
+            nodes_all = np.column_stack(
+                [
+                    ds.face_x[0:self.model.mesh.attrs['nreal']],
+                    ds.face_y[0:self.model.mesh.attrs['nreal']],
+                    ds.volume[0:self.model.mesh.attrs['nreal']]
+                ]
+            )
+            nodes_all = hv.Points(nodes_all, vdims='volume')
+
+            p1 = hv.Scatter(
+                nodes,
+                vdims=['x', 'y', constituent_name, 'nface']
+            ).opts(
+                width = 1000,
+                height = 500,
+                color = constituent_name,
+                cmap = cmap, 
+                clim = (mn_val, mx_val),
+                tools = ['hover'], 
+                colorbar = True
+            )
+            
+            p2 = hv.Scatter(
+                nodes_all,
+                vdims=['x', 'y', 'volume']
+            ).opts(
+                width = 1000,
+                height = 500,
+                color = 'grey',
+            )
+            title = pd.to_datetime(datetime).strftime('%m/%d/%Y %H:%M ')
+            return p1 # hv.Overlay([p2, p1]).opts(title=title)
+
+        return hv.DynamicMap(quick_map_generator, kdims=['Time']).redim.values(Time=self.model.mesh.time.values)
+    
+    def static_plot(
+        self,
+        plotting_timestep: int,
+        constituent_name: Optional[str] = None,
+        clim: Optional[tuple] = (None,None),
+        cmap: Optional[str] = 'RdYlBu_r', 
+        crs: Optional[str] = None,    
+        save: Optional[bool] = False,
+        output_path: Optional[str | Path] = None,
+    ):
+        """See `ClearwaterRiverine.static_plot()`."""
+        constituent_name, mx_val, mn_val = self._prep_plot(
+            constituent_name=constituent_name,
+            clim=clim,
+            gdf_plot=True,
+            crs=crs,
+        )
+
+        frame = self._frame(plotting_timestep)
+
+        c = frame[frame[VOLUME] != 0].plot(
+            column=constituent_name,
+            cmap=cmap,
+            vmin=mn_val,
+            vmax=mx_val,
+            edgecolor = 'white',
+            linewidth = 0.1,
+        )
+        plt.xticks([])
+        plt.yticks([])
+        ax = plt.gca()
+        plt.axis('off')
+        plt.rcParams['figure.facecolor'] = 'lightgrey'
+        if save == True:
+            plt.savefig(output_path)
+        plt.show()
+
+    def export_frames(
+        self,
+        output_path: str | Path,
+        constituent_name: Optional[str] = None,
+        timesteps: Optional[Sequence[int]] = None,
+        clim: Optional[tuple] = (None, None),
+        cmap: Optional[str] = 'RdYlBu_r',
+        crs: Optional[str] = None,
+        fps: Optional[float] = 10,
+        dpi: Optional[int] = 100,
+        workers: Optional[int] = None,
+        filter_empty: Optional[bool] = True,
+    ) -> Path | List[Path]:
+        """See `ClearwaterRiverine.export_frames()`."""
+        output_path = Path(output_path)
+        suffix = output_path.suffix.lower()
+        if suffix and suffix not in ANIMATION_WRITERS:
+            raise ValueError(f"Unsupported output format {suffix}. Use {list(ANIMATION_WRITERS)} or a directory.")
+        constituent_name, mx_val, mn_val = self._prep_plot(
+            constituent_name=constituent_name,
+            clim=clim,
+            gdf_plot=True,
+            crs=crs,
+        )
+        if timesteps is None:
+            timesteps = range(self.model._last_time_step() + 1)
+        if len(timesteps) == 0:
+            raise ValueError('No timesteps to export.')
+        cells = slice(0, self.nreal_index)
+        times = pd.DatetimeIndex(self.model.mesh.time.values)
+
+        def frames():
+            for t in timesteps:
+                values = np.asarray(self.model.mesh[constituent_name].data[t, cells], dtype=float)
+                if filter_empty:
+                    values = np.where(np.asarray(self.model.mesh[VOLUME].data[t, cells]) != 0, values, np.nan)
+                yield values, times[t].strftime('%m/%d/%Y %H:%M')
+
+        render_args = {
+            'polygons': np.asarray(self.poly_gdf.geometry.values),
+            'frames': frames(),
+            'clim': (mn_val, mx_val),
+            'cmap': cmap,
+            'label': f"{constituent_name} ({self.model.mesh[constituent_name].Units})",
+            'dpi': dpi,
+            'workers': workers,
+        }
+        if not suffix:
+            return render_frames(directory=output_path, **render_args)
+        with tempfile.TemporaryDirectory() as directory:
+            paths = render_frames(directory=directory, **render_args)
+            ANIMATION_WRITERS[suffix](paths, output_path, fps)
+        return output_path
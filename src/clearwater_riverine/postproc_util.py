@@ -98,7 +98,8 @@ def _mass_bal_global(
         df[bc_name_vol] = bc_totalVol_xda_val_np
         bcTotalVolInOutAll = bcTotalVolInOutAll + bc_totalVol_xda_val_np
         
-        bc_edgeMass_xda = simulation.constituent_dict[constituent_name].total_mass_flux[:, bndryData_n_Face_arrF]
+        constituent = simulation.constituent_dict[constituent_name]
+        bc_edgeMass_xda = constituent.total_mass_flux[:, constituent.flux_columns(bndryData_n_Face_arrF)]
         bc_totalMass_xda = bc_edgeMass_xda.sum()
         #bc_totalMass_xda_val = bc_totalMass_xda.values
         #bc_totalMass_xda_val_np = np.array([bc_totalMass_xda_val])
@@ -323,12 +324,8 @@ def _mass_flux_calculation_required(
     constituent_name: str,
 ) -> bool:
     """Determines if mass flux calculation is needed."""
-    base_condition =  np.zeros(
-        (len(simulation.mesh.time),
-        len(simulation.mesh.nedge))
-    )
     constituent = simulation.constituent_dict[constituent_name]
-    if np.array_equal(constituent.total_mass_flux, base_condition):
+    if not np.any(constituent.total_mass_flux):
         return True
     else:
         return False
@@ -338,19 +335,11 @@ def _calculate_mass_flux(
     constituent_name: str,
 ) -> None:
     """Calculates mass flux.
-    Used when user has loaded in a model mesh.
+    Used when user has loaded in a model mesh, or deferred mass fluxes.
+    Mass fluxes of all constituents are calculated in vectorized blocks of timesteps.
     """
     print('Calculating mass fluxes...')
-    constituent = simulation.constituent_dict[constituent_name]
-
-    for t in range(len(simulation.mesh.time) - 1):
-        simulation._mass_flux(
-            simulation.mesh[constituent_name],
-            constituent.advection_mass_flux,
-            constituent.diffusion_mass_flux,
-            constituent.total_mass_flux,
-            t
-        )
+    simulation.calculate_mass_flux()
     print('Max flux calculations complete!')
 
 def _parse_boundary_data(
@@ -0,0 +1,195 @@
+from typing import (
+    List,
+    Literal,
+    Optional,
+    Sequence,
+)
+import warnings
+
+import numpy as np
+import xarray as xr
+from scipy.sparse import csr_matrix
+from scipy.spatial import cKDTree
+
+from clearwater_riverine.mesh import cell_polygons, containing_cells
+from clearwater_riverine.variables import (
+    FACE_X,
+    FACE_Y,
+    NUMBER_OF_REAL_CELLS,
+)
+
+
+class Probes:
+    """Points (e.g., monitoring stations) to record concentration time series at while the model runs.
+
+    With `method='cell'`, a probe takes the concentration of the real cell that contains it;
+    probes outside the mesh fall back to the nearest cell centroid. With `method='idw'`, a probe
+    takes an inverse-distance weighted average of the `k` nearest real cell centroids.
+
+    Args:
+        x (Sequence[float]): Probe x-coordinates, in the coordinate system of the RAS model.
+        y (Sequence[float]): Probe y-coordinates, in the coordinate system of the RAS model.
+        names (Sequence[str], optional): Probe names. Defaults to `probe_0`, `probe_1`, ...
+        method (str, optional): `cell` or `idw`.
+        k (int, optional): Number of cells to interpolate between with `method='idw'`.
+        power (float, optional): Power of the inverse distance with `method='idw'`.
+    """
+    def __init__(
+        self,
+        x: Sequence[float],
+        y: Sequence[float],
+        names: Optional[Sequence[str]] = None,
+        method: Literal['cell', 'idw'] = 'cell',
+        k: int = 4,
+        power: float = 2.0,
+    ):
+        self.x = np.atleast_1d(np.asarray(x, dtype=float))
+        self.y = np.atleast_1d(np.asarray(y, dtype=float))
+        if self.x.shape != self.y.shape:
+            raise ValueError('x and y must have the same length.')
+        if names is None:
+            names = [f'probe_{i}' for i in range(len(self.x))]
+        if len(names) != len(self.x):
+            raise ValueError('There must be one name per probe.')
+        if method not in ['cell', 'idw']:
+            raise ValueError("method must be 'cell' or 'idw'.")
+        self.names = list(names)
+        self.method = method
+        self.k = k
+        self.power = power
+
+    def weights(self, mesh: xr.Dataset) -> csr_matrix:
+        """Sparse (probe x nface) matrix of interpolation weights.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+        """
+        nreal_index = mesh.attrs[NUMBER_OF_REAL_CELLS] + 1
+        centroids = np.column_stack(
+            [mesh[FACE_X].values[0:nreal_index], mesh[FACE_Y].values[0:nreal_index]]
+        )
+        tree = cKDTree(centroids)
+        n_probes = len(self.x)
+        points = np.column_stack([self.x, self.y])
+
+        if self.method == 'cell':
+            import shapely
+
+            polygons = cell_polygons(mesh, nreal_index)
+            cell = containing_cells(shapely.STRtree(polygons), self.x, self.y)
+            outside = cell == -1
+            if outside.any():
+                warnings.warn(
+                    f'Probes {[self.names[i] for i in np.nonzero(outside)[0]]} are outside the mesh; '
+                    'using the nearest cell.',
+                    UserWarning,
+                )
+                cell[outside] = tree.query(points[outside])[1]
+            rows = np.arange(n_probes)
+            weights = np.ones(n_probes)
+        else:
+            k = min(self.k, nreal_index)
+            distance, cell = tree.query(points, k=k)
+            distance = distance.reshape(n_probes, k)
+            cell = cell.reshape(n_probes, k)
+            with np.errstate(divide='ignore'):
+                weights = 1 / distance ** self.power
+            # probes on a centroid take that cell's value
+            exact = distance == 0
+            weights[exact.any(axis=1)] = exact[exact.any(axis=1)]
+            weights /= weights.sum(axis=1, keepdims=True)
+            rows = np.repeat(np.arange(n_probes), k)
+            cell = cell.ravel()
+            weights = weights.ravel()
+        return csr_matrix((weights, (rows, cell.ravel())), shape=(n_probes, len(mesh.nface)))
+
+
+class ProbeRecorder:
+    """Records concentrations at `Probes` into a (constituent x time x probe) buffer.
+
+    Args:
+        probes (Probes): Probes to record at.
+        mesh (xr.Dataset): Unstructured model mesh.
+        names (List[str]): Constituent names, in storage order.
+        units (List[str]): Units of each constituent.
+        values (np.ndarray): Array of shape (constituent x nface) with concentrations at timestep 0.
+        state (xr.Dataset, optional): State saved by `state` (e.g., in a checkpoint) at the
+            first timestep of `mesh`. Recording continues from it, and the earlier time series are kept.
+    """
+    def __init__(
+        self,
+        probes: Probes,
+        mesh: xr.Dataset,
+        names: List[str],
+        units: List[str],
+        values: np.ndarray,
+        state: Optional[xr.Dataset] = None,
+    ):
+        self.probes = probes
+        self.names = list(names)
+        self.units = list(units)
+        self.weights = probes.weights(mesh)
+        self.time = mesh.time.values
+        # index of the first timestep of the mesh in the buffer
+        self.offset = 0
+        if state is not None:
+            if list(state['constituent'].values) != self.names or list(state['probe'].values) != list(probes.names):
+                raise ValueError('The saved probe time series do not match the constituents and probes.')
+            self.offset = len(state['time']) - 1
+            self.time = np.concatenate([state['time'].values[0:self.offset], self.time])
+        self.buffer = np.full((len(self.names), len(self.time), len(probes.names)), np.nan)
+        if state is not None:
+            self.buffer[:, 0:self.offset + 1] = state['buffer'].values
+        else:
+            self.record(0, values)
+
+    def record(self, t: int, values: np.ndarray):
+        """Record the concentrations at timestep t.
+
+        Args:
+            t (int): Timestep.
+            values (np.ndarray): Array of shape (constituent x nface) with concentrations at timestep t.
+        """
+        self.buffer[:, self.offset + t] = (self.weights @ values.T).T
+
+    def state(self, t: int) -> xr.Dataset:
+        """Copy of the time series recorded up to timestep t, to continue recording from.
+
+        Args:
+            t (int): Last timestep recorded.
+        """
+        stop = self.offset + t + 1
+        return xr.Dataset(
+            data_vars={
+                'buffer': (('constituent', 'time', 'probe'), self.buffer[:, 0:stop].copy()),
+            },
+            coords={
+                'constituent': np.array(self.names, dtype=object),
+                'time': self.time[0:stop],
+                'probe': np.array(self.probes.names, dtype=object),
+            },
+        )
+
+    def to_dataset(self) -> xr.Dataset:
+        """Recorded time series, with dimensions (time x probe).
+
+        The `probe_cell` coordinate is the cell with the largest weight for each probe.
+        Timesteps that have not been solved yet are NaN.
+        """
+        return xr.Dataset(
+            data_vars={
+                name: xr.DataArray(
+                    self.buffer[i],
+                    dims=('time', 'probe'),
+                    attrs={'Units': f'{self.units[i]}'},
+                )
+                for i, name in enumerate(self.names)
+            },
+            coords={
+                'time': self.time,
+                'probe': self.probes.names,
+                'probe_x': ('probe', self.probes.x),
+                'probe_y': ('probe', self.probes.y),
+                'probe_cell': ('probe', np.asarray(self.weights.argmax(axis=1)).ravel()),
+            },
+        )
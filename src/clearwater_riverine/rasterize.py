@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+import shapely
+
+from clearwater_riverine.mesh import containing_cells
+
+# number of viewports to keep cell indices for
+INDEX_CACHE_SIZE = 16
+
+
+class CellRasterizer:
+    """Rasterizes cell values onto a pixel grid through a precomputed cell index.
+
+    For a viewport (x and y range, width and height in pixels), the cell containing each
+    pixel center is found once with a spatial index over the cell polygons. Every image of
+    that viewport is then a single gather of cell values, so the cost of rendering depends
+    on the number of pixels rather than the number of cells. Indices of recent viewports are
+    cached, so scrubbing through time after zooming only repeats the gather.
+
+    Args:
+        polygons (np.ndarray): Array of shapely polygons, one per cell, in the plotting coordinate system.
+    """
+    def __init__(self, polygons: np.ndarray):
+        self.polygons = polygons
+        self.tree = shapely.STRtree(polygons)
+        self.bounds = shapely.total_bounds(polygons)
+        self._indices = OrderedDict()
+
+    def pixel_centers(
+        self,
+        x_range: Tuple[float, float],
+        y_range: Tuple[float, float],
+        width: int,
+        height: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Coordinates of the pixel centers along x and y."""
+        dx = (x_range[1] - x_range[0]) / width
+        dy = (y_range[1] - y_range[0]) / height
+        xs = x_range[0] + (np.arange(width) + 0.5) * dx
+        ys = y_range[0] + (np.arange(height) + 0.5) * dy
+        return xs, ys
+
+    def index(
+        self,
+        x_range: Tuple[float, float],
+        y_range: Tuple[float, float],
+        width: int,
+        height: int,
+    ) -> np.ndarray:
+        """Cell containing each pixel center, with shape (height x width); -1 outside the mesh.
+
+        Args:
+            x_range (Tuple[float, float]): Minimum and maximum x of the viewport.
+            y_range (Tuple[float, float]): Minimum and maximum y of the viewport.
+            width (int): Number of pixels along x.
+            height (int): Number of pixels along y.
+        """
+        key = (tuple(x_range), tuple(y_range), width, height)
+        if key in self._indices:
+            self._indices.move_to_end(key)
+            return self._indices[key]
+
+        xs, ys = self.pixel_centers(x_range, y_range, width, height)
+        x, y = np.meshgrid(xs, ys)
+        index = containing_cells(self.tree, x.ravel(), y.ravel()).reshape(height, width)
+
+        self._indices[key] = index
+        if len(self._indices) > INDEX_CACHE_SIZE:
+            self._indices.popitem(last=False)
+        return index
+
+    def rasterize(
+        self,
+        values: np.ndarray,
+        x_range: Tuple[float, float] | None = None,
+        y_range: Tuple[float, float] | None = None,
+        width: int = 800,
+        height: int = 400,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Image of cell values over a viewport.
+
+        Args:
+            values (np.ndarray): Value of each cell.
+            x_range (Tuple[float, float], optional): Minimum and maximum x. Defaults to the extent of the cells.
+            y_range (Tuple[float, float], optional): Minimum and maximum y. Defaults to the extent of the cells.
+            width (int, optional): Number of pixels along x.
+            height (int, optional): Number of pixels along y.
+
+        Returns:
+            Pixel center x coordinates, y coordinates, and an image with shape (height x width)
+            that is NaN outside the cells.
+        """
+        if x_range is None:
+            x_range = (self.bounds[0], self.bounds[2])
+        if y_range is None:
+            y_range = (self.bounds[1], self.bounds[3])
+        index = self.index(x_range, y_range, width, height)
+        image = np.where(index >= 0, np.asarray(values, dtype=float)[index], np.nan)
+        xs, ys = self.pixel_centers(x_range, y_range, width, height)
+        return xs, ys, image
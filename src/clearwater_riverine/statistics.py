@@ -0,0 +1,377 @@
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Sequence,
+)
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from clearwater_riverine.variables import (
+    CHANGE_IN_TIME,
+    NUMBER_OF_REAL_CELLS,
+)
+
+
+class StreamingQuantiles:
+    """Approximate quantiles of many streams at once, using the P-square algorithm.
+
+    The P-square algorithm (Jain and Chlamtac, 1985) tracks five markers per quantile whose
+    heights approximate the minimum, the quantile, the maximum and two intermediate
+    quantiles. Markers are adjusted with piecewise-parabolic interpolation as observations
+    arrive, so memory does not grow with the number of observations. Here, every element
+    of the observed arrays is a separate stream, and all streams are updated together.
+
+    Args:
+        quantiles (Sequence[float]): Quantiles to track, between 0 and 1.
+        shape (tuple): Shape of the observed arrays.
+    """
+    def __init__(self, quantiles: Sequence[float], shape: tuple):
+        self.quantiles = np.asarray(quantiles, dtype=float)
+        if ((self.quantiles < 0) | (self.quantiles > 1)).any():
+            raise ValueError('Quantiles must be between 0 and 1.')
+        p = self.quantiles.reshape((-1,) + (1,) * len(shape) + (1,))
+        zeros = np.zeros_like(p)
+        self.count = 0
+        self.first = np.full((5,) + tuple(shape), np.nan)
+        self.heights = None
+        self.positions = None
+        self.desired = np.concatenate([zeros, 2 * p, 4 * p, 2 + 2 * p, zeros + 4], axis=-1)
+        self.increments = np.concatenate([zeros, p / 2, p, (1 + p) / 2, zeros + 1], axis=-1)
+
+    def update(self, x: np.ndarray):
+        """Add an observation to every stream.
+
+        Args:
+            x (np.ndarray): Array with one observation per stream.
+        """
+        if self.count < 5:
+            self.first[self.count] = x
+            self.count += 1
+            if self.count == 5:
+                markers = np.moveaxis(np.sort(self.first, axis=0), 0, -1)
+                self.heights = np.broadcast_to(markers, self.desired.shape[:1] + markers.shape).copy()
+                self.positions = np.broadcast_to(
+                    np.arange(5, dtype=float),
+                    self.heights.shape,
+                ).copy()
+            return
+        self.count += 1
+        q, n = self.heights, self.positions
+        x = np.broadcast_to(x, q.shape[:-1])
+
+        # cell k of the observation, and extend the extreme markers if needed
+        k = (x[..., np.newaxis] >= q[..., 1:4]).sum(axis=-1)
+        np.minimum(q[..., 0], x, out=q[..., 0])
+        np.maximum(q[..., 4], x, out=q[..., 4])
+        n += np.arange(5) > k[..., np.newaxis]
+        self.desired = self.desired + self.increments
+
+        # adjust the heights of the middle markers
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for i in range(1, 4):
+                d = self.desired[..., i] - n[..., i]
+                up = (d >= 1) & (n[..., i + 1] - n[..., i] > 1)
+                down = (d <= -1) & (n[..., i - 1] - n[..., i] < -1)
+                move = up | down
+                if not move.any():
+                    continue
+                s = np.where(up, 1.0, -1.0)
+                q_i, q_below, q_above = q[..., i], q[..., i - 1], q[..., i + 1]
+                n_i, n_below, n_above = n[..., i], n[..., i - 1], n[..., i + 1]
+                parabolic = q_i + s / (n_above - n_below) * (
+                    (n_i - n_below + s) * (q_above - q_i) / (n_above - n_i)
+                    + (n_above - n_i - s) * (q_i - q_below) / (n_i - n_below)
+                )
+                linear = q_i + s * (np.where(up, q_above, q_below) - q_i) / \
+                    (np.where(up, n_above, n_below) - n_i)
+                adjusted = np.where((q_below < parabolic) & (parabolic < q_above), parabolic, linear)
+                q[..., i] = np.where(move, adjusted, q_i)
+                n[..., i] += np.where(move, s, 0)
+
+    def state(self, dims: Sequence[str]) -> xr.Dataset:
+        """Copy of the markers, to continue estimating from (see `restore`).
+
+        Args:
+            dims (Sequence[str]): Names of the dimensions of the observed arrays.
+        """
+        marker_shape = self.quantiles.shape + self.first.shape[1:] + (5,)
+        heights = self.heights if self.heights is not None else np.full(marker_shape, np.nan)
+        positions = self.positions if self.positions is not None else np.full(marker_shape, np.nan)
+        return xr.Dataset(
+            data_vars={
+                'count': self.count,
+                'first': (('observation', *dims), self.first.copy()),
+                'heights': (('quantile', *dims, 'marker'), heights.copy()),
+                'positions': (('quantile', *dims, 'marker'), positions.copy()),
+                'desired': (('quantile', 'marker'), self.desired.reshape(len(self.quantiles), 5).copy()),
+            },
+            coords={'quantile': self.quantiles},
+        )
+
+    def restore(self, state: xr.Dataset):
+        """Continue from markers saved by `state`.
+
+        Args:
+            state (xr.Dataset): Saved markers.
+        """
+        if not np.array_equal(state['quantile'].values, self.quantiles):
+            raise ValueError('The saved quantile markers do not match the quantiles.')
+        self.count = int(state['count'])
+        self.first = state['first'].values.copy()
+        if self.count >= 5:
+            self.heights = state['heights'].values.copy()
+            self.positions = state['positions'].values.copy()
+        self.desired = state['desired'].values.reshape(self.desired.shape).copy()
+
+    def values(self) -> np.ndarray:
+        """Estimated quantiles, with shape (quantile x observed array shape)."""
+        if self.count == 0:
+            return np.full(self.quantiles.shape + self.first.shape[1:], np.nan)
+        if self.count < 5:
+            # exact quantiles of the first observations
+            return np.quantile(self.first[0:self.count], self.quantiles, axis=0)
+        return self.heights[..., 2].copy()
+
+
+class CellStatistics:
+    """Per-cell statistics to accumulate while the model runs.
+
+    The minimum, maximum, mean and standard deviation over time (Welford's algorithm) of
+    each constituent in each real cell are always accumulated; the options below add
+    approximate quantiles, time above a threshold and means per period. Statistics cover
+    the initial conditions and every solved timestep since the start of the run, including
+    the timesteps solved before a checkpoint the run was resumed from, without storing the history.
+
+    Args:
+        quantiles (Sequence[float], optional): Quantiles to estimate, e.g., [0.5, 0.9].
+            Estimates are approximate (P-square algorithm).
+        thresholds (Dict[str, float], optional): Threshold concentration per constituent name.
+            The time (model time step durations) and fraction of timesteps above the threshold are accumulated.
+        period (str | pd.Timedelta, optional): Length of periods to average over, e.g., '1D' for daily means.
+    """
+    def __init__(
+        self,
+        quantiles: Optional[Sequence[float]] = None,
+        thresholds: Optional[Dict[str, float]] = None,
+        period: Optional[str | pd.Timedelta] = None,
+    ):
+        self.quantiles = quantiles
+        self.thresholds = thresholds if thresholds is not None else {}
+        self.period = None if period is None else pd.Timedelta(period)
+
+
+class CellStatisticsAccumulator:
+    """Accumulates the `CellStatistics` of all constituents, one timestep at a time.
+
+    Args:
+        statistics (CellStatistics): Statistics to accumulate.
+        mesh (xr.Dataset): Unstructured model mesh.
+        names (List[str]): Constituent names, in storage order.
+        values (np.ndarray): Array of shape (constituent x nface) with concentrations at timestep 0.
+        state (xr.Dataset, optional): State saved by `state` (e.g., in a checkpoint) at timestep 0.
+            Statistics continue from it, rather than starting from `values`.
+    """
+    def __init__(
+        self,
+        statistics: CellStatistics,
+        mesh: xr.Dataset,
+        names: List[str],
+        values: np.ndarray,
+        state: Optional[xr.Dataset] = None,
+    ):
+        missing = set(statistics.thresholds) - set(names)
+        if missing:
+            raise ValueError(f'Thresholds for {sorted(missing)} do not match any constituent.')
+        self.statistics = statistics
+        self.names = list(names)
+        self.nface = len(mesh.nface)
+        self.nreal_index = mesh.attrs[NUMBER_OF_REAL_CELLS] + 1
+        self.delta_time = mesh[CHANGE_IN_TIME].values
+        shape = (len(self.names), self.nreal_index)
+
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.sum_of_squares = np.zeros(shape)
+        self.minimum = np.full(shape, np.inf)
+        self.maximum = np.full(shape, -np.inf)
+
+        self.quantiles = None
+        if statistics.quantiles is not None:
+            self.quantiles = StreamingQuantiles(statistics.quantiles, shape)
+
+        self.thresholds = np.array(
+            [statistics.thresholds.get(name, np.nan) for name in self.names]
+        )[:, np.newaxis]
+        self.exceedance_count = np.zeros(shape, dtype=int)
+        self.exceedance_time = np.zeros(shape)
+
+        self.periods = None
+        if statistics.period is not None:
+            self.periods = pd.DatetimeIndex(mesh.time.values).floor(statistics.period)
+            self.period_labels = []
+            self.period_means = []
+            self.period_sum = np.zeros(shape)
+            self.period_count = 0
+            self.current_period = None
+
+        if state is not None:
+            self._restore(state)
+        else:
+            self.update(0, values)
+
+    def update(self, t: int, values: np.ndarray):
+        """Add the concentrations at timestep t.
+
+        Args:
+            t (int): Timestep.
+            values (np.ndarray): Array of shape (constituent x nface) with concentrations at timestep t.
+        """
+        x = values[:, 0:self.nreal_index]
+
+        # Welford's algorithm for the mean and variance
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.sum_of_squares += delta * (x - self.mean)
+        np.minimum(self.minimum, x, out=self.minimum)
+        np.maximum(self.maximum, x, out=self.maximum)
+
+        if self.quantiles is not None:
+            self.quantiles.update(x)
+
+        above = x > self.thresholds
+        self.exceedance_count += above
+        if t > 0:
+            # concentrations at t hold over the timestep that produced them
+            self.exceedance_time += above * self.delta_time[t - 1]
+
+        if self.periods is not None:
+            if self.current_period is not None and self.periods[t] != self.current_period:
+                self._close_period()
+            self.current_period = self.periods[t]
+            self.period_sum += x
+            self.period_count += 1
+
+    def state(self) -> xr.Dataset:
+        """Copy of the statistics accumulated so far, to continue accumulating from."""
+        cell = ('constituent', 'cell')
+        state = xr.Dataset(
+            data_vars={
+                'count': self.count,
+                'mean': (cell, self.mean.copy()),
+                'sum_of_squares': (cell, self.sum_of_squares.copy()),
+                'minimum': (cell, self.minimum.copy()),
+                'maximum': (cell, self.maximum.copy()),
+                'threshold': (('constituent',), self.thresholds[:, 0].copy()),
+                'exceedance_count': (cell, self.exceedance_count.copy()),
+                'exceedance_time': (cell, self.exceedance_time.copy()),
+            },
+            coords={'constituent': np.array(self.names, dtype=object)},
+        )
+        if self.quantiles is not None:
+            quantile_state = self.quantiles.state(cell)
+            state = state.merge(
+                quantile_state.rename({name: f'quantile_{name}' for name in quantile_state.data_vars})
+            )
+        if self.periods is not None:
+            period_means = np.stack(self.period_means) if self.period_means else \
+                np.empty((0,) + self.period_sum.shape)
+            state = state.assign(
+                period_length=self.statistics.period.to_timedelta64(),
+                period_label=('period', pd.DatetimeIndex(self.period_labels).values),
+                period_mean=(('period',) + cell, period_means),
+                period_sum=(cell, self.period_sum.copy()),
+                period_count=self.period_count,
+                current_period=self.current_period.to_datetime64(),
+            )
+        return state
+
+    def _restore(self, state: xr.Dataset):
+        matches = list(state['constituent'].values) == self.names and \
+            np.array_equal(state['threshold'].values, self.thresholds[:, 0], equal_nan=True) and \
+            (self.quantiles is not None) == ('quantile_count' in state) and \
+            (self.periods is not None) == ('period_length' in state)
+        if matches and self.periods is not None:
+            matches = pd.Timedelta(state['period_length'].values) == self.statistics.period
+        if not matches:
+            raise ValueError('The saved statistics do not match the requested statistics.')
+
+        self.count = int(state['count'])
+        self.mean = state['mean'].values.copy()
+        self.sum_of_squares = state['sum_of_squares'].values.copy()
+        self.minimum = state['minimum'].values.copy()
+        self.maximum = state['maximum'].values.copy()
+        self.exceedance_count = state['exceedance_count'].values.copy()
+        self.exceedance_time = state['exceedance_time'].values.copy()
+        if self.quantiles is not None:
+            quantile_names = [name for name in state.data_vars if name.startswith('quantile_')]
+            self.quantiles.restore(
+                state[quantile_names].rename({name: name[len('quantile_'):] for name in quantile_names})
+            )
+        if self.periods is not None:
+            self.period_labels = list(pd.DatetimeIndex(state['period_label'].values))
+            self.period_means = list(state['period_mean'].values)
+            self.period_sum = state['period_sum'].values.copy()
+            self.period_count = int(state['period_count'])
+            self.current_period = pd.Timestamp(state['current_period'].values)
+
+    def _close_period(self):
+        self.period_labels.append(self.current_period)
+        self.period_means.append(self.period_sum / self.period_count)
+        self.period_sum = np.zeros_like(self.period_sum)
+        self.period_count = 0
+
+    def _pad(self, array: np.ndarray) -> np.ndarray:
+        """Extend an array over real cells to every cell (NaN in ghost cells)."""
+        padded = np.full(array.shape[:-1] + (self.nface,), np.nan)
+        padded[..., 0:self.nreal_index] = array
+        return padded
+
+    def to_dataset(self) -> xr.Dataset:
+        """Statistics accumulated so far.
+
+        Returns:
+            Dataset with `{constituent}_minimum`, `_maximum`, `_mean` and `_std` over `nface`, plus
+            `{constituent}_quantile` over (`quantile`, `nface`), `{constituent}_exceedance_time` and
+            `_exceedance_fraction` over `nface`, and `{constituent}_period_mean` over (`period`, `nface`),
+            depending on the requested statistics. Ghost cells are NaN.
+        """
+        data_vars = {}
+        coords = {}
+        standard_deviation = np.sqrt(self.sum_of_squares / self.count)
+        quantiles = self.quantiles.values() if self.quantiles is not None else None
+        if quantiles is not None:
+            coords['quantile'] = self.quantiles.quantiles
+        if self.periods is not None:
+            labels = list(self.period_labels)
+            means = list(self.period_means)
+            if self.period_count > 0:
+                # include the period in progress
+                labels.append(self.current_period)
+                means.append(self.period_sum / self.period_count)
+            coords['period'] = pd.DatetimeIndex(labels).values
+            period_means = np.stack(means, axis=1) if means else np.empty((len(self.names), 0, self.nreal_index))
+
+        for i, name in enumerate(self.names):
+            data_vars[f'{name}_minimum'] = ('nface', self._pad(self.minimum[i]))
+            data_vars[f'{name}_maximum'] = ('nface', self._pad(self.maximum[i]))
+            data_vars[f'{name}_mean'] = ('nface', self._pad(self.mean[i]))
+            data_vars[f'{name}_std'] = ('nface', self._pad(standard_deviation[i]))
+            if quantiles is not None:
+                data_vars[f'{name}_quantile'] = (('quantile', 'nface'), self._pad(quantiles[:, i]))
+            if name in self.statistics.thresholds:
+                data_vars[f'{name}_exceedance_time'] = ('nface', self._pad(self.exceedance_time[i]))
+                data_vars[f'{name}_exceedance_fraction'] = (
+                    'nface',
+                    self._pad(self.exceedance_count[i] / self.count),
+                )
+            if self.periods is not None:
+                data_vars[f'{name}_period_mean'] = (('period', 'nface'), self._pad(period_means[i]))
+        return xr.Dataset(
+            data_vars=data_vars,
+            coords=coords,
+            attrs={'timesteps': self.count},
+        )
@@ -0,0 +1,128 @@
+from array import array
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+)
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class PhaseTimer:
+    """Low-overhead wall-clock timing of named phases, e.g., of the model time loop.
+
+    Phases are timed back to back: `start()` marks the beginning of a sequence of phases
+    (e.g., a timestep), and each `lap(phase)` records the time since the previous mark under
+    `phase`. Durations are kept in compact arrays (about 24 bytes per phase per timestep),
+    so percentiles are exact and every phase can be exported as a trace event.
+    A disabled timer returns immediately from `start()` and `lap()`.
+
+    Args:
+        enabled (bool, optional): Whether to record timings.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.pid = os.getpid()
+        self._origin = time.perf_counter_ns()
+        self._last = self._origin
+        self._step = -1
+        self._starts: Dict[str, array] = {}
+        self._durations: Dict[str, array] = {}
+        self._steps: Dict[str, array] = {}
+
+    def start(self, step: int = -1):
+        """Mark the beginning of a sequence of phases.
+
+        Args:
+            step (int, optional): Timestep the following phases belong to; -1 outside the time loop.
+        """
+        if not self.enabled:
+            return
+        self._step = step
+        self._last = time.perf_counter_ns()
+
+    def lap(self, phase: str):
+        """Record the time since the previous mark under a phase, and mark the current time.
+
+        Args:
+            phase (str): Phase name.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        if phase not in self._durations:
+            self._starts[phase] = array('q')
+            self._durations[phase] = array('q')
+            self._steps[phase] = array('q')
+        self._starts[phase].append(self._last - self._origin)
+        self._durations[phase].append(now - self._last)
+        self._steps[phase].append(self._step)
+        self._last = now
+
+    def summary(self) -> pd.DataFrame:
+        """Count, total, mean, median (p50) and 99th percentile (p99) duration of each phase, in seconds."""
+        rows = {}
+        for phase, durations in self._durations.items():
+            seconds = np.frombuffer(durations, dtype=np.int64) / 1e9
+            rows[phase] = {
+                'count': len(seconds),
+                'total': seconds.sum(),
+                'mean': seconds.mean(),
+                'p50': np.percentile(seconds, 50),
+                'p99': np.percentile(seconds, 99),
+            }
+        return pd.DataFrame.from_dict(
+            rows,
+            orient='index',
+            columns=['count', 'total', 'mean', 'p50', 'p99'],
+        ).rename_axis('phase')
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary of each phase (see `summary`), as a JSON-serializable dictionary."""
+        return {
+            phase: {key: (int(value) if key == 'count' else float(value)) for key, value in row.items()}
+            for phase, row in self.summary().to_dict(orient='index').items()
+        }
+
+    def write_json(self, file_path: str | Path):
+        """Write the summary of each phase to a JSON file.
+
+        Args:
+            file_path (str | Path): JSON file to write.
+        """
+        with open(file_path, 'w') as outfile:
+            json.dump(self.to_dict(), outfile, indent=2)
+
+    def write_chrome_trace(self, file_path: str | Path):
+        """Write every recorded phase as a complete ('X') event in Chrome trace-event format.
+
+        The file can be opened with chrome://tracing or https://ui.perfetto.dev.
+
+        Args:
+            file_path (str | Path): JSON file to write.
+        """
+        events = []
+        for phase in self._durations:
+            starts = np.frombuffer(self._starts[phase], dtype=np.int64) / 1e3
+            durations = np.frombuffer(self._durations[phase], dtype=np.int64) / 1e3
+            steps = np.frombuffer(self._steps[phase], dtype=np.int64)
+            events.extend(
+                {
+                    'name': phase,
+                    'cat': 'clearwater_riverine',
+                    'ph': 'X',
+                    'ts': start,
+                    'dur': duration,
+                    'pid': self.pid,
+                    'tid': 0,
+                    'args': {'time_step': step},
+                }
+                for start, duration, step in zip(starts.tolist(), durations.tolist(), steps.tolist())
+            )
+        events.sort(key=lambda event: event['ts'])
+        with open(file_path, 'w') as outfile:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, outfile)
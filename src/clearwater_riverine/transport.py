@@ -2,20 +2,21 @@ import numpy as np
 import pandas as pd
 import xarray as xr
 from scipy.sparse import csr_matrix, linalg
-import matplotlib.pyplot as plt
-import holoviews as hv
-import geoviews as gv
-import geopandas as gpd
-from shapely.geometry import Polygon
-hv.extension("bokeh")
 from typing import (
     Any,
+    Callable,
     Dict,
+    List,
     Literal,
     Optional,
+    Sequence,
     Tuple,
+    TYPE_CHECKING,
 )
+from concurrent.futures import Future
 from pathlib import Path
+from time import perf_counter
+import tempfile
 import warnings
 import inspect
 
@@ -24,21 +25,38 @@ from clearwater_riverine.mesh import (
     load_model_mesh
 )
 import clearwater_riverine.variables
-from clearwater_riverine.variables import (
-    ADVECTION_COEFFICIENT,
-    COEFFICIENT_TO_DIFFUSION_TERM,
-    EDGES_FACE1,
-    EDGES_FACE2,
-    FACES,
-    CHANGE_IN_TIME,
-    NUMBER_OF_REAL_CELLS,
-    VOLUME,
-)
+from clearwater_riverine.variables import FACES
 from clearwater_riverine.utilities import UnitConverter
 from clearwater_riverine.linalg import LHS, RHS
 from clearwater_riverine.io.hdf import _hdf_to_xarray
 from clearwater_riverine.io.config import parse_config
-from clearwater_riverine.constituents import Constituent
+from clearwater_riverine.io.outputs import (
+    ClearWaterRiverineOutput,
+    ClearWaterRiverineWriter,
+    ZarrStreamWriter,
+)
+from clearwater_riverine.io.scratch import ScratchStore
+from clearwater_riverine.output_policy import OutputPolicy
+from clearwater_riverine.io.checkpoint import (
+    CHECKPOINT_DATETIME_FORMAT,
+    CheckpointWriter,
+    build_checkpoint,
+    checkpoint_state,
+    hash_flow_field,
+    read_checkpoint,
+)
+from clearwater_riverine.constituents import ConstituentSet, MassFluxMode, resolve_mass_flux_mode
+from clearwater_riverine.probes import Probes, ProbeRecorder
+from clearwater_riverine.statistics import CellStatistics, CellStatisticsAccumulator
+from clearwater_riverine.zones import Zones, ZoneRecorder
+from clearwater_riverine.mass_balance import MassBalanceAccumulator, calculate_mass_balance
+from clearwater_riverine.timing import PhaseTimer
+from clearwater_riverine.diagnostics import DiagnosticsRecorder
+from clearwater_riverine.memory import MemoryBudget, MemoryProfiler, estimate_memory
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+    from clearwater_riverine.plotting import ModelPlotter
 
 UNIT_DETAILS = {'Metric': {'Length': 'm',
                             'Velocity': 'm/s',
@@ -76,12 +94,69 @@ class ClearwaterRiverine:
         ras_file_path (str):  Filepath to HEC-RAS output
         diffusion_coefficient_input (float): User-defined diffusion coefficient for entire modeling domain. 
         verbose (bool, optional): Boolean indicating whether or not to print model progress. 
+        sync_every (int, optional): Number of timesteps between writes of the solution to the model mesh.
+            In between, results are held in NumPy buffers; call `sync()` to write them early.
+            Defaults to writing every timestep.
+        checkpoint_file_path (str | Path, optional): Checkpoint written by `checkpoint()` to resume
+            a simulation from. Hydrodynamics are only read from the checkpoint time onward.
+        stream_file_path (str | Path, optional): Zarr store (.zarr) to stream results to while the model runs.
+            The store is created with the model mesh; concentrations are appended every `sync_every`
+            timesteps from a background thread rather than kept in memory, and `mesh[constituent]`
+            reads them back lazily. Use a `sync_every` of tens to hundreds of timesteps when streaming.
+        stream_mass_flux (bool, optional): Whether to also stream mass fluxes to `stream_file_path`.
+        output_policy (OutputPolicy, optional): Store only selected timesteps, cells and constituents.
+            The stored results are available as `output`, and are what `finalize(save=True)` writes;
+            `mesh[constituent]` only holds the initial conditions and stored results, and is NaN elsewhere.
+        scratch_directory (str | Path, optional): Directory (preferably on fast local disk) for memory-mapped
+            scratch files. If given, the time-varying hydrodynamics, constituent histories and mass fluxes
+            are backed by files rather than held in memory, so that runs larger than the available memory
+            can be completed. The files are removed when the model is garbage collected.
+        mass_flux (str, optional): When and where mass fluxes are calculated. `full` (default) calculates
+            them across every edge at every timestep; `boundary` only across edges between real and ghost
+            cells, which is what mass balances need; `deferred` in a single vectorized pass over the stored
+            concentrations after the run (see `calculate_mass_flux`); `off` skips them altogether.
+            With an `output_policy`, defaults to `off`, and only `boundary` or `off` are allowed.
+        track_mass_balance (bool, optional): Whether to accumulate volume and mass budgets per boundary
+            condition line while the model runs (see `mass_balance`). This only visits boundary edges,
+            so it also works with `mass_flux='off'`.
+        cell_statistics (CellStatistics, optional): Per-cell statistics (minimum, maximum, mean, standard deviation
+            and, optionally, quantiles, time above thresholds and period means) to accumulate while the model
+            runs, without storing the history. See `statistics()`.
+        probes (Probes, optional): Points (e.g., monitoring stations) to record concentration time series at
+            while the model runs, without storing the full results. See `probe_timeseries()`.
+        zones (Zones, optional): Zones (polygons or lists of cells) to record the volume, constituent mass and
+            volume-weighted mean concentration of while the model runs. See `zone_timeseries()`.
+        geometry_cache_directory (str | Path, optional): Directory to cache the cell polygons used for plotting in,
+            as GeoParquet keyed by the mesh geometry and coordinate system, so later plots of the same mesh
+            skip building and reprojecting them.
+        profile_phases (bool, optional): Whether to time the phases of model setup (reading hydrodynamics,
+            calculating parameters, initializing constituents) and of every timestep (LHS assembly, CSR
+            construction, RHS build, solve, result store, recorders and mass flux). See `timer`.
+        record_diagnostics (bool, optional): Whether to record solver and hydrodynamic diagnostics of every timestep
+            (wet cells, matrix entries, maximum Courant and grid Peclet numbers, solver residual and iterations,
+            and wall-clock time). See `diagnostics()` and `write_diagnostics()`.
+        memory_budget (MemoryBudget, optional): Maximum memory for the run. The memory of each stage is
+            estimated from the HDF metadata before any hydrodynamics are read (see `memory_estimate`);
+            if the estimated peak exceeds the budget, the model raises a `MemoryError` or switches to
+            memory-mapped scratch files, depending on the budget's `action`.
+        profile_memory (bool, optional): Whether to record the resident set size of the process at the end
+            of each stage (reading hydrodynamics, calculating parameters, initializing constituents and
+            running). See `memory_report()`.
 
     Attributes:
         mesh (xr.Dataset): Unstructured model mesh containing relevant HEC-RAS outputs, calculated parameters
             required for advection-diffusion calculations, and water quality ouptuts (e.g., concentration). 
             The unstructured mesh follows UGRID CF Conventions. 
         boundary_data (pd.DataFrame): Information on RAS model boundaries, extracted directly from HEC-RAS 2D output. 
+        mass_balance (MassBalanceAccumulator): Running volume and mass budgets since the start of the run
+            (or the checkpoint it was resumed from), if `track_mass_balance` is set. Use
+            `mass_balance.domain()` and `mass_balance.boundaries()` for the budgets.
+        poly_gdf (gpd.GeoDataFrame): Polygons of the real cells in EPSG:4326, once a polygon plot has been made.
+        timer (PhaseTimer): Phase timings, if `profile_phases` is set. Use `timer.summary()` for count, total,
+            p50 and p99 per phase, and `timer.write_json()` or `timer.write_chrome_trace()` to export them.
+        memory_estimate (pd.DataFrame): Estimated memory per stage (see `estimate_memory`), if `memory_budget`
+            or `profile_memory` is set.
+        memory_profiler (MemoryProfiler): Measured memory per stage, if `profile_memory` is set.
     """
 
     def __init__(
@@ -93,15 +168,75 @@ class ClearwaterRiverine:
         verbose: Optional[bool] = False,
         datetime_range: Optional[Tuple[int, int] | Tuple[str, str]] = None,
         mesh_file_path: Optional[str | Path] = None,
+        sync_every: Optional[int] = 1,
+        checkpoint_file_path: Optional[str | Path] = None,
+        stream_file_path: Optional[str | Path] = None,
+        stream_mass_flux: Optional[bool] = False,
+        output_policy: Optional[OutputPolicy] = None,
+        scratch_directory: Optional[str | Path] = None,
+        mass_flux: Optional[MassFluxMode] = None,
+        track_mass_balance: Optional[bool] = False,
+        cell_statistics: Optional[CellStatistics] = None,
+        probes: Optional[Probes] = None,
+        zones: Optional[Zones] = None,
+        geometry_cache_directory: Optional[str | Path] = None,
+        profile_phases: Optional[bool] = False,
+        record_diagnostics: Optional[bool] = False,
+        memory_budget: Optional[MemoryBudget] = None,
+        profile_memory: Optional[bool] = False,
     ) -> None:
         """
         Initialize a Clearwater Riverine WQ model mesh
         reading HDF output from a RAS2D model to an xarray.
         """
-        self.gdf = None
+        self.timer = PhaseTimer(enabled=profile_phases)
+        self.memory_profiler = MemoryProfiler(enabled=profile_memory)
+        self.memory_profiler.mark('start')
+        self.memory_budget = memory_budget
+        self.memory_estimate = None
+        self._model_plotter = None
         self.time_step = 0
-
-        if config_filepath:
+        # last timestep at which the memory of the time loop was measured
+        self._profiled_time_step = 0
+        self.sync_every = sync_every
+        self.stream_file_path = stream_file_path
+        self.stream_mass_flux = stream_mass_flux
+        self.output_policy = output_policy
+        self.scratch = ScratchStore(scratch_directory) if scratch_directory else None
+        self.mass_flux = resolve_mass_flux_mode(mass_flux, output_policy)
+        self.track_mass_balance = track_mass_balance
+        self.mass_balance = None
+        self.cell_statistics = cell_statistics
+        self._statistics_accumulator = None
+        self.probes = probes
+        self._probe_recorder = None
+        self.zones = zones
+        self._zone_recorder = None
+        self.geometry_cache_directory = geometry_cache_directory
+        self.record_diagnostics = record_diagnostics
+        self._diagnostics_recorder = None
+        self._checkpoint_writer = CheckpointWriter()
+        self._flow_field_hash = None
+        checkpoint = None
+
+        if checkpoint_file_path:
+            checkpoint = read_checkpoint(checkpoint_file_path)
+            if not flow_field_file_path:
+                flow_field_file_path = checkpoint.attrs['flow_field_file_path']
+            if diffusion_coefficient_input is None:
+                diffusion_coefficient_input = checkpoint.attrs['diffusion_coefficient']
+            self._flow_field_hash = hash_flow_field(flow_field_file_path)
+            if self._flow_field_hash != checkpoint.attrs['flow_field_hash']:
+                raise ValueError(
+                    f'{flow_field_file_path} does not match the hydrodynamics used to write the checkpoint.'
+                )
+            # only read hydrodynamics from the restart time onward
+            datetime_range = tuple(
+                pd.Timestamp(checkpoint.time.values[i]).strftime(CHECKPOINT_DATETIME_FORMAT)
+                for i in [0, -1]
+            )
+            self.constituents = [str(name) for name in checkpoint.constituent.values]
+        elif config_filepath:
             model_config = parse_config(config_filepath=config_filepath)
             if diffusion_coefficient_input is None:
                 diffusion_coefficient_input = model_config['diffusion_coefficient']
@@ -123,42 +258,64 @@ class ClearwaterRiverine:
                 )
            
         # define model mesh
+        self.timer.start()
         if mesh_file_path:
             self.mesh = load_model_mesh(mesh_file_path)
             self._determine_constituents()
             self.initialize_constituents(
                 method='load'
             )   
+            self.timer.lap('load_mesh')
             if verbose: print(
                 f"""
                     Loaded model mesh.
                     Parsed the following constituents: {self.constituents}.
                     Post processing and plotting capabilities supported.
-                    Hotstart model runs not currently supported.
+                    To continue a model run, pass a file written by `checkpoint()` as `checkpoint_file_path`.
                 """
             )
         else:
+            if memory_budget is not None or profile_memory:
+                self._estimate_memory(flow_field_file_path, datetime_range)
             self.mesh = instantiate_model_mesh(diffusion_coefficient_input)
             if verbose: print("Populating Model Mesh...")
             self.mesh = self.mesh.cwr.read_ras(
                 flow_field_file_path,
-                datetime_range=datetime_range
+                datetime_range=datetime_range,
+                scratch=self.scratch,
             )
             self.boundary_data = self.mesh.attrs['boundary_data']
+            self.flow_field_file_path = flow_field_file_path
+            self.timer.lap('read_hydrodynamics')
+            self.memory_profiler.mark('read_hydrodynamics')
 
             if verbose: print("Calculating Required Parameters...")
             self.mesh = self.mesh.cwr.calculate_required_parameters()
+            self.timer.lap('calculate_parameters')
+            if self.scratch is not None:
+                self.scratch.move_to_disk(self.mesh)
+                self.timer.lap('move_to_disk')
+            self.memory_profiler.mark('calculate_parameters')
         
             self.lhs = LHS(self.mesh)
-            self.initialize_constituents(
-                model_config=model_config,
-                method='initialize'
-            )
+            if checkpoint is not None:
+                self.initialize_constituents(
+                    checkpoint=checkpoint,
+                    method='restore'
+                )
+            else:
+                self.initialize_constituents(
+                    model_config=model_config,
+                    method='initialize'
+                )
+            self.timer.lap('initialize_constituents')
+            self.memory_profiler.mark('initialize_constituents')
 
     def initialize_constituents(
         self,
         model_config: Optional[Dict] = None,
-        method: Optional[Literal['initialize', 'load']] = 'initialize',
+        method: Optional[Literal['initialize', 'load', 'restore']] = 'initialize',
+        checkpoint: Optional[xr.Dataset] = None,
     ):
         """Initializes model, developed to be BMI-adjacent.
 
@@ -180,29 +337,188 @@ class ClearwaterRiverine:
                 'Unknown.'
         """
         self.time_step = 0
-        self.constituent_dict = {}
+        self._profiled_time_step = 0
+        writer = None
+        policy = None
+        if method != 'load':
+            policy = self.output_policy
+            if self.stream_file_path:
+                writer = ZarrStreamWriter(self.stream_file_path, time_chunk=self.sync_every)
+        self.constituent_set = ConstituentSet(
+            sync_every=self.sync_every,
+            writer=writer,
+            stream_mass_flux=self.stream_mass_flux,
+            policy=policy,
+            scratch=self.scratch,
+            mass_flux=self.mass_flux,
+        )
 
         if method == 'initialize':
-            for constituent in self.constituents:
-                self.constituent_dict[constituent] = Constituent(
-                    name=constituent,
-                    mesh=self.mesh,
-                    constituent_config=model_config['constituents'][constituent],
-                    flow_field_boundaries=self.boundary_data,
-                )
+            self.constituent_set.register(
+                mesh=self.mesh,
+                constituent_configs={
+                    constituent: model_config['constituents'][constituent]
+                    for constituent in self.constituents
+                },
+                flow_field_boundaries=self.boundary_data,
+            )
+        elif method == 'restore':
+            self.constituent_set.restore(
+                mesh=self.mesh,
+                checkpoint=checkpoint,
+            )
         else:
-            for constituent in self.constituents:
-                self.constituent_dict[constituent] = Constituent(
-                    name=constituent,
-                    mesh=self.mesh,
-                    method=method,
-                )
+            self.constituent_set.load(
+                mesh=self.mesh,
+                names=self.constituents,
+            )
+        self.constituent_dict = self.constituent_set.constituents
+        if self.track_mass_balance and method != 'load':
+            self.mass_balance = MassBalanceAccumulator(
+                mesh=self.mesh,
+                boundary_data=self.boundary_data,
+                names=self.constituent_set.names,
+                values=self.constituent_set.values,
+                state=self._saved_state(checkpoint, 'mass_balance', 'track_mass_balance'),
+            )
+        if self.cell_statistics is not None and method != 'load':
+            self._statistics_accumulator = CellStatisticsAccumulator(
+                statistics=self.cell_statistics,
+                mesh=self.mesh,
+                names=self.constituent_set.names,
+                values=self.constituent_set.values,
+                state=self._saved_state(checkpoint, 'statistics', 'cell_statistics'),
+            )
+        if self.probes is not None and method != 'load':
+            self._probe_recorder = ProbeRecorder(
+                probes=self.probes,
+                mesh=self.mesh,
+                names=self.constituent_set.names,
+                units=[constituent.units for constituent in self.constituent_dict.values()],
+                values=self.constituent_set.values,
+                state=self._saved_state(checkpoint, 'probes', 'probes'),
+            )
+        if self.record_diagnostics and method != 'load':
+            self._diagnostics_recorder = DiagnosticsRecorder(self.mesh)
+        if self.zones is not None and method != 'load':
+            self._zone_recorder = ZoneRecorder(
+                zones=self.zones,
+                mesh=self.mesh,
+                names=self.constituent_set.names,
+                units=[constituent.units for constituent in self.constituent_dict.values()],
+                values=self.constituent_set.values,
+                state=self._saved_state(checkpoint, 'zones', 'zones'),
+            )
+
+    @staticmethod
+    def _saved_state(checkpoint: Optional[xr.Dataset], name: str, option: str) -> Optional[xr.Dataset]:
+        """State of a recorder to continue from, when restoring a checkpoint."""
+        if checkpoint is None:
+            return None
+        state = checkpoint_state(checkpoint, name)
+        if state is None:
+            raise ValueError(
+                f'The checkpoint was written without `{option}`, so it cannot be continued with it.'
+            )
+        return state
     
     def update(
         self,
         update_concentration: Optional[dict[str, xr.DataArray]] = None,
     ):
         """Update a single timestep."""
+        # Check if constituent_name from update_concentration dict is one
+        # of the constituents in the model
+        if isinstance(update_concentration, dict):
+            for update_constituent_name, _ in update_concentration.items():
+                if update_constituent_name in self.constituent_dict:
+                    pass
+                else:
+                    print(f"WARNING: {update_constituent_name} is not being used in the model.")
+                    print("Please review the constituent names in the update dictionary")
+
+            # Allow users to override concentration
+            for constituent_name in self.constituent_dict:
+                if constituent_name in update_concentration.keys():
+                    self.constituent_set.set(
+                        [constituent_name],
+                        update_concentration[constituent_name].values[0:self.mesh.nreal + 1]
+                    )
+            self.constituent_set.store_current(self.mesh, self.time_step)
+
+        self._step(self.mesh.nreal + 1)
+
+    def run(
+        self,
+        n_steps: int,
+        callbacks: Optional[Callable | Sequence[Callable]] = None,
+        callback_every: Optional[int] = 1,
+    ):
+        """Run a number of timesteps without user overrides.
+
+        Args:
+            n_steps (int): Number of timesteps to run.
+            callbacks (Callable | Sequence[Callable], optional): Function(s) called with the model
+                as their only argument after every `callback_every` timesteps, e.g., to couple
+                other models, report progress or write checkpoints.
+            callback_every (int, optional): Number of timesteps between callbacks. Defaults to 1.
+        """
+        remaining_steps = len(self.mesh.time) - 1 - self.time_step
+        if n_steps < 0 or n_steps > remaining_steps:
+            raise ValueError(
+                f'Cannot run {n_steps} timesteps; {remaining_steps} timesteps remain in the model.'
+            )
+        if callback_every < 1:
+            raise ValueError('callback_every must be a positive integer.')
+        if callbacks is None:
+            callbacks = []
+        elif callable(callbacks):
+            callbacks = [callbacks]
+
+        nreal_index = self.mesh.nreal + 1
+        for i in range(1, n_steps + 1):
+            self._step(nreal_index)
+            if callbacks and i % callback_every == 0:
+                for callback in callbacks:
+                    callback(self)
+        self._mark_run()
+
+    def run_until(
+        self,
+        timestamp: str | np.datetime64 | pd.Timestamp,
+        callbacks: Optional[Callable | Sequence[Callable]] = None,
+        callback_every: Optional[int] = 1,
+    ):
+        """Run until the first model timestep at or after a timestamp.
+
+        Args:
+            timestamp (str | np.datetime64 | pd.Timestamp): Model time to run until.
+            callbacks (Callable | Sequence[Callable], optional): Function(s) called with the model
+                as their only argument after every `callback_every` timesteps.
+            callback_every (int, optional): Number of timesteps between callbacks. Defaults to 1.
+        """
+        time_index = np.searchsorted(
+            self.mesh.time.values,
+            np.datetime64(pd.Timestamp(timestamp), 'ns'),
+            side='left',
+        )
+        if time_index >= len(self.mesh.time):
+            raise ValueError(f'{timestamp} is after the end of the model time.')
+        self.run(
+            max(int(time_index) - self.time_step, 0),
+            callbacks=callbacks,
+            callback_every=callback_every,
+        )
+
+    def _step(self, nreal_index: int):
+        """Solve a single timestep for all constituents.
+
+        Args:
+            nreal_index (int): Number of real cells in the mesh plus one.
+        """
+        step_start = perf_counter()
+        timer = self.timer
+        timer.start(self.time_step)
 
         # Update the left hand side of the matrix
         # This is the same for all constituents
@@ -210,66 +526,58 @@ class ClearwaterRiverine:
             self.mesh,
             self.time_step
         )
+        timer.lap('lhs')
 
         # Define compressed sparse row matrix for LHS
         A = csr_matrix(
             (self.lhs.coef, (self.lhs.rows, self.lhs.cols)),
-            shape=(self.mesh.nreal + 1, self.mesh.nreal + 1)
+            shape=(nreal_index, nreal_index)
         )
+        timer.lap('csr')
 
-        # Check if constituent_name from update_concentration dict is one
-        # of the constituents in the model
-        
-        if isinstance(update_concentration, dict):
-            for update_constituent_name, _ in update_concentration.items():
-                if update_constituent_name in self.constituent_dict:
-                    pass
-                else:
-                    print(f"WARNING: {update_constituent_name} is not being used in the model.")
-                    print("Please review the constituent names in the update dictionary")
-
-        for constituent_name, constituent in self.constituent_dict.items():
-            # Allow users to override concentration
-            if isinstance(update_concentration, dict) and constituent_name in update_concentration.keys():
-                self.mesh[constituent_name][self.time_step][0: self.mesh.nreal + 1] = \
-                    update_concentration[constituent_name].values[0:self.mesh.nreal + 1]
-                x = update_concentration[constituent_name].values[0:self.mesh.nreal + 1]
-            else:
-                x = self.mesh[constituent_name][self.time_step][0:self.mesh.nreal + 1]
-        
-            # Update the right hand side of the matrix 
-            constituent.b.update_values(
-                solution=x,
+        if len(self.constituent_set) > 0:
+            # Update the right hand side of the matrix for all constituents at once
+            self.constituent_set.b.update_values(
+                solution=self.constituent_set.values[:, 0:nreal_index],
                 mesh=self.mesh,
                 t=self.time_step,
-                name=constituent_name,
+                name=self.constituent_set.names,
             )
-
-            # Solve
-            x = linalg.spsolve(A, constituent.b.vals)
-
-            # Update timestep and save data
-            self.mesh[constituent_name].loc[
-                {
-                    'time': self.mesh.time[self.time_step + 1],
-                    'nface': self.mesh.nface.values[0:self.mesh.nreal+1]
-                }
-            ] = x
-            nonzero_indices = np.nonzero(constituent.input_array[self.time_step + 1])
-            self.mesh[constituent_name].loc[
-                {
-                    'time': self.mesh.time[self.time_step + 1],
-                    'nface': nonzero_indices[0]
-                }
-            ] = constituent.input_array[self.time_step + 1][nonzero_indices]
+            timer.lap('rhs')
+
+            # Solve all constituents with a single factorization
+            x = linalg.spsolve(A, self.constituent_set.b.vals.T)
+            x = np.reshape(x, (nreal_index, -1)).T
+            timer.lap('solve')
+
+            # Update timestep and buffer data for the model mesh
+            self.constituent_set.advance(self.mesh, self.time_step, x)
+            timer.lap('store')
+
+            # Accumulate flows across boundary condition lines
+            if self.mass_balance is not None:
+                self.mass_balance.update(self.mesh, self.time_step, self.constituent_set.values)
+            if self._statistics_accumulator is not None:
+                self._statistics_accumulator.update(self.time_step + 1, self.constituent_set.values)
+            if self._probe_recorder is not None:
+                self._probe_recorder.record(self.time_step + 1, self.constituent_set.values)
+            if self._zone_recorder is not None:
+                self._zone_recorder.record(self.mesh, self.time_step + 1, self.constituent_set.values)
+            timer.lap('recorders')
 
             # Calculate mass flux
-            self._mass_flux(
-                self.mesh[constituent_name],
-                constituent.advection_mass_flux,
-                constituent.diffusion_mass_flux,
-                constituent.total_mass_flux,
-                self.time_step
+            self.constituent_set.mass_flux(self.mesh, self.time_step)
+            timer.lap('mass_flux')
+
+            if self._diagnostics_recorder is not None:
+                self._diagnostics_recorder.record(
+                    mesh=self.mesh,
+                    t=self.time_step,
+                    A=A,
+                    b=self.constituent_set.b.vals,
+                    x=x,
+                    empty_cells=self.lhs.empty_cells,
+                    seconds=perf_counter() - step_start,
                 )
 
         # increment timestep
@@ -286,326 +594,280 @@ class ClearwaterRiverine:
     ):
         """Deprecated
         
-        Runs water quality model. 
-
-        Steps through each timestep of the HEC-RAS 2D output and solves the total-load advection-diffusion transport equation 
-        using user-defined boundary and initial conditions. Users must use `initial_conditions()` and `boundary_conditions()` 
-        methods before calling `simulate_wq()` or all concentrations will be 0. 
+        Runs water quality model: every remaining timestep, as `run()` does.
 
         Args:
-            input_mass_units (str, optional): User-defined mass units for concentration timeseries used in model set-up. Assumes mg if no value
-                is specified. 
-            input_volume_units (str, optional): User-defined volume units for concentration timeseries. Assumes L if no value
-                is specified.
-            input_liter_conversion (float, optional): If concentration inputs are not in mass/L, supply the conversion factor to 
-                convert the volume unit to liters.
+            input_mass_units (str, optional): Not used.
+            input_volume_units (str, optional): Not used.
+            input_liter_conversion (float, optional): Not used.
             save (bool, optional): Boolean indicating whether the file should be saved. Default is to not save the output.
             output_file_path (str, optional): Filepath where the output file should be stored. Default to save in current directory as 
                 `clearwater-riverine-wq.zarr`
  
         """
         warnings.warn(
-            f"Use `update` method instead.",
+            f"Use `run` method instead.",
             DeprecationWarning
         )
-        print("Starting WQ Simulation...")
-
-        # Convert Units
-        # unit_converter = UnitConverter(self.mesh, input_mass_units, input_volume_units, input_liter_conversion)
-        # self.inp_converted = unit_converter._convert_units(self.input_array, convert_to=True)
-        # self.inp_converted = self.input_array / input_liter_conversion / conversion_factor # convert to mass/ft3 or mass/m3 
-        lhs = LHS(self.mesh)
-        
-        # Loop over time to solve
-        for t in range(len(self.mesh['time']) - 1):
-            self.time_step = t
-            self._timer(t)
-            lhs.update_values(self.mesh, t)
-            A = csr_matrix(
-                (lhs.coef,(lhs.rows, lhs.cols)),
-                shape=(self.mesh.nreal + 1, self.mesh.nreal + 1)
-            )
-
-            # solve for each constituent
-            for constituent_name, constituent in self.constituent_dict.items():
-                # Solve sparse matrix
-                constituent.b.update_values(
-                    solution=x,
-                    mesh=self.mesh,
-                    t=self.time_step,
-                    name=constituent_name,
-                    input_array=constituent.input_array
-                )
-                x = linalg.spsolve(A, constituent.b.vals)
-
-                # Save solution
-                self.mesh[constituent_name].loc[
-                    t+1, 0:self.mesh.nreal+1
-                ] = x
-                nonzero_indices = np.nonzero(self.input_array[self.time_step])
-                self.mesh[constituent_name].loc[self.time_step, nonzero_indices] = self.input_array[self.time_step][nonzero_indices]
-
-                self._mass_flux(
-                    self.mesh[constituent_name],
-                    constituent.advection_mass_flux,
-                    constituent.diffusion_mass_flux,
-                    constituent.total_mass_flux,
-                    t+1
-                )
-        
-        # self._mass_flux(concentrations, advection_mass_flux, diffusion_mass_flux, total_mass_flux, t+1)
-        # concentrations_converted = unit_converter._convert_units(concentrations, convert_to=False)
-        # self.mesh[CONCENTRATION] = _hdf_to_xarray(concentrations_converted, dims = ('time', 'nface'), attrs={'Units': f'{input_mass_units}/{input_volume_units}'})
-
-        # # add advection / diffusion mass flux
-        # self.mesh['mass_flux_advection'] = _hdf_to_xarray(advection_mass_flux, dims=('time', 'nedge'), attrs={'Units': f'{input_mass_units}'})
-        # self.mesh['mass_flux_diffusion'] = _hdf_to_xarray(diffusion_mass_flux, dims=('time', 'nedge'), attrs={'Units': f'{input_mass_units}'})
-        # self.mesh['mass_flux_total'] = _hdf_to_xarray(total_mass_flux, dims=('time', 'nedge'), attrs={'Units': f'{input_mass_units}'})
-
-        # # TODO: move this to plot things besides concentration
-        # self.max_value = int(self.mesh[CONCENTRATION].sel(nface=slice(0, self.mesh.attrs[NUMBER_OF_REAL_CELLS])).max())
-        # self.min_value = int(self.mesh[CONCENTRATION].sel(nface=slice(0, self.mesh.attrs[NUMBER_OF_REAL_CELLS])).min())
-
-        # if save == True:
-        #     self.mesh.cwr.save_clearwater_xarray(output_file_path)
-    
-        print(' 100%')
+        self.run(len(self.mesh.time) - 1 - self.time_step)
+        if save == True:
+            self.finalize(save=True, output_filepath=output_file_path)
     
     def set_value_range(
         self,
         constituent_name: Optional[str] = None
     ):
         """Set value ranges for constituents."""
+        self.sync()
         if constituent_name != None:
-            self.constituent_dict[constituent_name].set_value_range(self.mesh)
+            names = [constituent_name]
         else:
-            for _, constituent in self.constituent_dict.items():
-                constituent.set_value_range(self.mesh)  
+            names = list(self.constituent_dict)
+        self.constituent_set.set_value_range(self.mesh, names)
 
-    def finalize(
-        self,
-        save: Optional[bool] = False,
-        output_filepath: Optional[str] = None
-    ):
-        self.set_value_range()          
-
-        if save == True:
-            self.mesh.cwr.save_clearwater_xarray(output_filepath)
-            output_path = Path(output_filepath)
-            self.boundary_data.to_csv(f'{output_path.parent}/{output_path.stem}_boundary_data.csv')
+    def calculate_mass_flux(self):
+        """Calculate mass fluxes from the stored concentrations.
 
+        Fills in mass fluxes that were deferred during the run (with `mass_flux='deferred'`),
+        or that are not part of a model mesh loaded from disk.
+        """
+        self.constituent_set.calculate_mass_flux(self.mesh, self._last_time_step())
+
+    def _last_time_step(self) -> int:
+        """Index of the last timestep with results: the last one solved, or the last one of a loaded model mesh."""
+        if self.constituent_set.values is None:
+            # loaded model mesh: results are stored for every timestep
+            return len(self.mesh.time) - 1
+        return self.time_step
+
+    def statistics(self) -> xr.Dataset:
+        """Per-cell statistics accumulated so far (see `cell_statistics`)."""
+        if self._statistics_accumulator is None:
+            raise ValueError('No cell statistics were requested for this model.')
+        return self._statistics_accumulator.to_dataset()
+
+    def probe_timeseries(self) -> xr.Dataset:
+        """Concentration time series recorded at the probes (see `probes`), with dimensions (time x probe)."""
+        if self._probe_recorder is None:
+            raise ValueError('No probes were defined for this model.')
+        return self._probe_recorder.to_dataset()
+
+    def diagnostics(self) -> pd.DataFrame:
+        """Solver and hydrodynamic diagnostics of every timestep solved so far (see `record_diagnostics`)."""
+        if self._diagnostics_recorder is None:
+            raise ValueError('Diagnostics were not recorded for this model.')
+        return self._diagnostics_recorder.to_dataframe()
+
+    def write_diagnostics(self, file_path: str | Path):
+        """Write the diagnostics of every timestep solved so far to a Parquet file.
 
-    def _timer(self, t):
-        if t == int(len(self.mesh['time']) / 4):
-            print(' 25%')
-        elif t == int(len(self.mesh['time']) / 2):
-            print(' 50%')
-        if t == int(3 * len(self.mesh['time']) / 4):
-            print(' 75%')
-
-    def _mass_flux(self,
-        output: np.ndarray,
-        advection_mass_flux: np.ndarray,
-        diffusion_mass_flux: np.ndarray,
-        total_mass_flux: np.ndarray,
-        t: int,
-    ):
-        """Calculates mass flux across cell boundaries."""
-        negative_condition = self.mesh[ADVECTION_COEFFICIENT].isel(time=t) < 0
-        parent_concentration = output[t+1][self.mesh[EDGES_FACE1]]
-        neighbor_concentration = output[t+1][self.mesh[EDGES_FACE2]]
-        delta_time = self.mesh[CHANGE_IN_TIME].isel(time=t)
+        Args:
+            file_path (str | Path): Parquet file to write.
+        """
+        if self._diagnostics_recorder is None:
+            raise ValueError('Diagnostics were not recorded for this model.')
+        self._diagnostics_recorder.write_parquet(file_path)
 
-        advection_mass_flux[t] = xr.where(
-            negative_condition,
-            self.mesh[ADVECTION_COEFFICIENT].isel(time=t) * neighbor_concentration,
-            self.mesh[ADVECTION_COEFFICIENT].isel(time=t) * parent_concentration,
-        ) * delta_time
+    def memory_report(self) -> pd.DataFrame:
+        """Estimated and measured memory per stage, in bytes.
 
-        diffusion_mass_flux[t] = self.mesh[COEFFICIENT_TO_DIFFUSION_TERM][t] * \
-              (neighbor_concentration - parent_concentration) * \
-              delta_time
+        Combines the estimate made before the run (`estimated_resident` and `estimated_peak`,
+        see `estimate_memory`) with the resident set size measured at the end of each stage
+        (`rss`, `peak_rss` and `peak_increase`, see `MemoryProfiler`). Measurements include the
+        memory of the Python process before the model was created (stage `start`).
+        """
+        if not self.memory_profiler.enabled:
+            raise ValueError('Memory was not profiled for this model.')
+        self._mark_run()
+        measured = self.memory_profiler.to_dataframe()
+        if self.memory_estimate is None:
+            return measured
+        estimated = self.memory_estimate[['resident', 'peak']].add_prefix('estimated_')
+        return estimated.join(measured, how='outer').reindex(
+            list(dict.fromkeys(list(measured.index) + list(estimated.index)))
+        )
 
-        total_mass_flux[t] = advection_mass_flux[t] + diffusion_mass_flux[t]
+    def _mark_run(self):
+        """Measure the memory of the time loop, if timesteps were solved since it was last measured.
 
+        Called after `run()`, and by `finalize()` and `memory_report()` for models stepped with
+        `update()`, so that measuring memory stays out of the per-timestep path.
+        """
+        if self.time_step != self._profiled_time_step:
+            self.memory_profiler.mark('run')
+            self._profiled_time_step = self.time_step
 
-    def _prep_gdf(
+    def _estimate_memory(
         self,
-        crs: str,
-        ):
-        """ Creates a geodataframe of polygons to represent each RAS cell. 
-
-        Args:
-            crs: coordinate system of RAS project.
-
-        Notes:
-            Could we parse the CRS from the PRJ file?
-        """
+        flow_field_file_path: str | Path,
+        datetime_range: Optional[Tuple[int, int] | Tuple[str, str]],
+    ):
+        """Estimate the memory of the run, and apply the memory budget."""
+        def estimate():
+            return estimate_memory(
+                flow_field_file_path,
+                datetime_range=datetime_range,
+                n_constituents=len(self.constituents or []),
+                output_policy=self.output_policy,
+                mass_flux=self.mass_flux,
+                sync_every=self.sync_every,
+                streaming=bool(self.stream_file_path),
+                scratch=self.scratch is not None,
+            )
 
-        self.nreal_index = self.mesh.attrs[NUMBER_OF_REAL_CELLS] + 1
-        real_face_node_connectivity = self.mesh.face_nodes[0:self.nreal_index]
-
-        # Turn real mesh cells into polygons
-        polygon_list = []
-        for cell in real_face_node_connectivity:
-            xs = self.mesh.node_x[cell[np.where(cell != -1)]]
-            ys = self.mesh.node_y[cell[np.where(cell != -1)]]
-            p1 = Polygon(list(zip(xs.values, ys.values)))
-            polygon_list.append(p1)
-
-        poly_gdf = gpd.GeoDataFrame(
-            {
-                'nface': self.mesh.nface[0:self.nreal_index],
-                'geometry': polygon_list
-            },
-            crs = crs
-        )
-        self.poly_gdf = poly_gdf.to_crs('EPSG:4326')
-        self._update_gdf()
-    
-        
-    def _update_gdf(self):
-        """Update gdf values."""
-        self.plotting_time_step = self.time_step
-        constituent_dfs = []
-        gdf_elements = self.constituents + [VOLUME]
-        for constituent in gdf_elements:
-            df_from_array = self.mesh[constituent].isel(
-                nface=slice(0,self.nreal_index)
-                ).to_dataframe()
-            df_from_array.reset_index(inplace=True)
-            constituent_dfs.append(df_from_array)
-
-        all_constituents = pd.concat(
-            constituent_dfs,
-            axis=1,
-        )
-        all_constituents = all_constituents.loc[:, ~all_constituents.columns.duplicated()]
-
-        self.df_merged = gpd.GeoDataFrame(
-                pd.merge(
-                    all_constituents,
-                    self.poly_gdf,
-                    on='nface',
-                    how='left'
+        self.memory_estimate = estimate()
+        budget = self.memory_budget
+        if budget is None or not budget.exceeded(self.memory_estimate):
+            return
+        if budget.action == 'scratch' and self.scratch is None:
+            self.scratch = ScratchStore(budget.scratch_directory or tempfile.gettempdir())
+            self.memory_estimate = estimate()
+            if not budget.exceeded(self.memory_estimate):
+                warnings.warn(
+                    f'The estimated memory exceeds the budget; using scratch files in {self.scratch.path}.',
+                    UserWarning,
                 )
-            )
-        self.df_merged.rename(
-            columns={
-                'nface':'cell',
-                'time': 'datetime'
-            },
-            inplace=True
-        )
-        self.gdf = self.df_merged
+                return
+        raise budget.error(self.memory_estimate)
 
+    def zone_timeseries(self) -> xr.Dataset:
+        """Volume, constituent mass and volume-weighted mean concentration per zone (see `zones`),
+        with dimensions (time x zone)."""
+        if self._zone_recorder is None:
+            raise ValueError('No zones were defined for this model.')
+        return self._zone_recorder.to_dataset()
 
-    def _maximum_plotting_value(
+    def calculate_mass_balance(
         self,
-        clim_max: float,
-        constituent_name: str,
-    ) -> float:
-        """ Calculate the maximum value for color bar. 
-        
-        Uses the maximum concentration value in the model mesh if no user-defined  clim_max is specified,
-        otherwise defines the maximum value as clim_max. 
+        boundary_data_path: Optional[str | Path] = None,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Volume and mass budgets over all stored timesteps, for all constituents at once.
+
+        Reads the results lazily, so this also works for large model meshes loaded from disk.
+        Requires results for every timestep (i.e., no output policy).
 
         Args:
-            clim_max (float): user defined maximum colorbar value or default (None)
-            constituent_name (str): constituent to plot. 
-        
+            boundary_data_path (str | Path, optional): CSV with the RAS model boundaries, as written
+                by `finalize(save=True)`. Required for model meshes loaded from disk.
+
         Returns:
-            mval (float): maximum plotting value, either based on user input or the maximum concentration value.
+            domain (pd.DataFrame): Budgets for the whole domain, indexed by constituent.
+            boundaries (pd.DataFrame): Budgets per boundary condition line, indexed by (constituent, boundary).
         """
-        if clim_max != None:
-            mx_val = clim_max
+        if hasattr(self, 'boundary_data'):
+            boundary_data = self.boundary_data
+        elif boundary_data_path:
+            boundary_data = pd.read_csv(boundary_data_path)
         else:
-            if self.constituent_dict[constituent_name].max_value == None:
-                self.set_value_range(constituent_name)
-            mx_val = self.constituent_dict[constituent_name].max_value
-        return mx_val
-
-    def _minimum_plotting_value(
-        self,
-        clim_min,
-        constituent_name: str,
-    ) -> float:
-        """ Calculate the maximum value for color bar. 
-        
-        Uses the maximum concentration value in the model mesh if no user-defined  clim_max is specified,
-        otherwise defines the maximum value as clim_max. 
+            raise ValueError('boundary_data_path input required')
+        if self.constituent_set.recorder is not None:
+            raise ValueError('Mass balances require results for every timestep.')
+        self.sync()
+        return calculate_mass_balance(self.mesh, boundary_data, self.constituents)
+
+    def sync(self):
+        """Write any buffered results to the model mesh (or the output store, when streaming)."""
+        self.constituent_set.sync(self.mesh)
+
+    @property
+    def output(self) -> xr.Dataset:
+        """Stored results: the model mesh, or the results selected by the output policy."""
+        return self.constituent_set.output(self.mesh)
+
+    def checkpoint(self, checkpoint_file_path: str | Path) -> Future:
+        """Write a checkpoint to restart the simulation from the current timestep.
+
+        The model state is copied immediately and written to disk in a background thread,
+        so the model can keep running. The flow field file is also hashed in that thread, on the
+        first checkpoint. Pass `lambda model: model.checkpoint(path)` as a
+        callback to `run()` to write checkpoints periodically. Resume with
+        `ClearwaterRiverine(checkpoint_file_path=path)`. Mass balances, cell statistics, and probe
+        and zone time series are saved as well, and continue when the run is resumed with the same options.
 
         Args:
-            clim_min (float): user defined minimum colorbar value or default (None)
-            constituent_name (str): constituent to plot. 
-        
+            checkpoint_file_path (str | Path): Filepath to a Zarr (.zarr) or NetCDF (.nc) checkpoint.
+                An existing checkpoint at this path is replaced once the new one is written.
+
         Returns:
-            mval (float): minimum plotting value, either based on user input or the minimum concentration value.
+            Future that completes when the checkpoint is written.
         """
-        if clim_min != None:
-            mn_val = clim_min
-        else:
-            if self.constituent_dict[constituent_name].min_value == None:
-                self.set_value_range(constituent_name)
-            mn_val = self.constituent_dict[constituent_name].min_value
-        return mn_val
-
-    def _check_constituent(
-        self,
-        constituent_name,
-    ):
-        """User warning."""
-        if constituent_name is None:
-            constituent_name = self.constituents[0]
-            warnings.warn(
-                f"No constituent name defined. Plotting {constituent_name}.",
-                UserWarning
-            )
-        return constituent_name
-    
-    def _define_clims(
-        self,
-        clim: tuple,
-        constituent_name: str,
-    ):
-        """Define color limit extent."""
-
-        mx_val = self._maximum_plotting_value(
-            clim_max=clim[1],
-            constituent_name=constituent_name
+        constituent_set = self.constituent_set
+        states = {}
+        if self.mass_balance is not None:
+            states['mass_balance'] = self.mass_balance.state()
+        if self._statistics_accumulator is not None:
+            states['statistics'] = self._statistics_accumulator.state()
+        if self._probe_recorder is not None:
+            states['probes'] = self._probe_recorder.state(self.time_step)
+        if self._zone_recorder is not None:
+            states['zones'] = self._zone_recorder.state(self.time_step)
+        checkpoint = build_checkpoint(
+            mesh=self.mesh,
+            time_step=self.time_step,
+            names=constituent_set.names,
+            units=[constituent.units for constituent in constituent_set.constituents.values()],
+            values=constituent_set.get(),
+            boundary_cells=constituent_set.b.boundary_cells.copy(),
+            boundary_values=constituent_set.b.boundary_values[self.time_step:].copy(),
+            flow_field_file_path=self.flow_field_file_path,
+            flow_field_hash=self._flow_field_hash,
+            states=states,
         )
-        mn_val = self._minimum_plotting_value(
-            clim_min=clim[0],
-            constituent_name=constituent_name
-        )
-        return mx_val, mn_val
+        return self._checkpoint_writer.write(checkpoint, checkpoint_file_path)
 
-    def _prep_plot(
+    def finalize(
         self,
-        constituent_name: str | None,
-        clim: tuple,
-        gdf_plot=False,
-        crs: Optional[str] = None,
+        save: Optional[bool] = False,
+        output_filepath: Optional[str] = None
     ):
-        """Duplicate code for prepping plots."""
-        if gdf_plot:
-            if type(self.gdf) != gpd.geodataframe.GeoDataFrame:
-                if crs == None:
-                    raise ValueError("This is your first time running the plot function. You must specify a crs!")
-                else:
-                    self._prep_gdf(crs)
-        
-            if self.plotting_time_step != self.time_step:
-                self._update_gdf()
-            
-        constituent_name = self._check_constituent(constituent_name)
+        self._mark_run()
+        self.sync()
+        self._checkpoint_writer.wait()
+        if self.mass_flux == 'deferred':
+            self.calculate_mass_flux()
+        self.set_value_range()          
 
-        mx_val, mn_val = self._define_clims(
-            clim=clim,
-            constituent_name=constituent_name
-        )
-        return constituent_name, mx_val, mn_val
-        
+        if save == True:
+            if self.stream_file_path and \
+                    (output_filepath is None or Path(output_filepath) == Path(self.stream_file_path)):
+                # results were already streamed to the output store
+                output_filepath = self.stream_file_path
+            elif self.constituent_set.recorder is not None:
+                writer = ClearWaterRiverineWriter()
+                writer.write_mesh(
+                    ClearWaterRiverineOutput(output_filepath, self.output),
+                    output_filepath,
+                )
+            else:
+                self.mesh.cwr.save_clearwater_xarray(output_filepath)
+            output_path = Path(output_filepath)
+            self.boundary_data.to_csv(f'{output_path.parent}/{output_path.stem}_boundary_data.csv')
+        self.memory_profiler.mark('finalize')
+
+    def _plotter(self) -> 'ModelPlotter':
+        """Plotter of this model, importing the plotting libraries on first use."""
+        if self._model_plotter is None:
+            from clearwater_riverine.plotting import ModelPlotter
+            self._model_plotter = ModelPlotter(self)
+        return self._model_plotter
+
+    @property
+    def poly_gdf(self) -> Optional['gpd.GeoDataFrame']:
+        """Polygons of the real cells in EPSG:4326, once a polygon plot has been made."""
+        if self._model_plotter is None:
+            return None
+        return self._model_plotter.poly_gdf
+
+    @property
+    def gdf(self) -> Optional['gpd.GeoDataFrame']:
+        """GeoDataFrame of the real cells at every timestep, once a polygon plot has been made.
+
+        This is built on demand and repeats each polygon for every timestep; plots only join the
+        timesteps they show.
+        """
+        if self._model_plotter is None:
+            return None
+        return self._model_plotter.gdf
 
     def plot(
         self,
@@ -615,6 +877,7 @@ class ClearwaterRiverine:
         cmap: Optional[str] = 'OrRd',
         time_index_range: Optional[tuple] = (0, -1), 
         filter_empty: Optional[bool] = True,
+        rasterize: Optional[bool] = False,
     ):
         """Creates a dynamic polygon plot of concentrations in the RAS2D model domain.
 
@@ -628,44 +891,26 @@ class ClearwaterRiverine:
                 maximum concentration value in the model domain over the entire simulation horizon. 
             time_index_range (tuple, optional): minimum and maximum time index to plot.
             filter_empty (boolean, optional): provides users the ability to filter out empty cells.
+            rasterize (boolean, optional): render an image of the cells instead of one polygon per cell.
+                The image is rasterized in Python and re-rasterized when zooming, so the browser only
+                receives pixels; use this for meshes with more than tens of thousands of cells.
         """
-
-        constituent_name, mx_val, mn_val = self._prep_plot(
+        return self._plotter().plot(
             constituent_name=constituent_name,
-            clim=clim,
-            gdf_plot=True,
             crs=crs,
+            clim=clim,
+            cmap=cmap,
+            time_index_range=time_index_range,
+            filter_empty=filter_empty,
+            rasterize=rasterize,
         )
 
-        def map_generator(datetime):
-            """This function generates plots for the DynamicMap"""
-            ras_sub_df = self.gdf[self.gdf.datetime == datetime]
-            if filter_empty:
-                ras_sub_df = ras_sub_df[ras_sub_df[VOLUME] != 0]
-            units = self.mesh[constituent_name].Units
-            ras_map = gv.Polygons(
-                ras_sub_df,
-                vdims=[constituent_name, 'cell']).opts(
-                    height = 400,
-                    width = 800,
-                    color=constituent_name,
-                    colorbar = True,
-                    cmap = cmap,
-                    clim = (mn_val, mx_val),
-                    line_width = 0.1,
-                    tools = ['hover'],
-                    clabel = f"{constituent_name} ({units})"
-            )
-            return (ras_map * gv.tile_sources.CartoLight())
-
-        dmap = hv.DynamicMap(map_generator, kdims=['datetime'])
-        return dmap.redim.values(datetime=self.gdf.datetime.unique()[time_index_range[0]: time_index_range[1]])
-
     def quick_plot(
         self,
         constituent_name: Optional[str] = None,
         clim: Optional[tuple] = (None,None),
-        cmap: Optional[str] = 'OrRd'
+        cmap: Optional[str] = 'OrRd',
+        rasterize: Optional[bool] = False,
     ):
         """Creates a dynamic scatterplot of cell centroids colored by cell concentration.
 
@@ -674,60 +919,16 @@ class ClearwaterRiverine:
 
         Args:
             clim_max (float, optional): maximum value for color bar. 
+            rasterize (boolean, optional): render an image of the cells, in model coordinates, instead of
+                one point per cell. The image is re-rasterized when zooming.
         """
-        constituent_name, mx_val, mn_val = self._prep_plot(
+        return self._plotter().quick_plot(
             constituent_name=constituent_name,
             clim=clim,
+            cmap=cmap,
+            rasterize=rasterize,
         )
 
-        def quick_map_generator(datetime):
-            """This function generates plots for the DynamicMap"""
-            ds = self.mesh.sel(time=datetime)
-            ind = np.where(
-                ds[constituent_name][0:self.mesh.attrs['nreal']] > 0
-            )
-            nodes = np.column_stack(
-                [
-                    ds.face_x[ind], ds.face_y[ind],
-                    ds[constituent_name][ind], ds['nface'][ind]
-                ]
-            )
-            nodes = hv.Points(nodes, vdims=[constituent_name, 'nface'])
-            nodes_all = np.column_stack(
-                [
-                    ds.face_x[0:self.mesh.attrs['nreal']],
-                    ds.face_y[0:self.mesh.attrs['nreal']],
-                    ds.volume[0:self.mesh.attrs['nreal']]
-                ]
-            )
-            nodes_all = hv.Points(nodes_all, vdims='volume')
-
-            p1 = hv.Scatter(
-                nodes,
-                vdims=['x', 'y', constituent_name, 'nface']
-            ).opts(
-                width = 1000,
-                height = 500,
-                color = constituent_name,
-                cmap = cmap, 
-                clim = (mn_val, mx_val),
-                tools = ['hover'], 
-                colorbar = True
-            )
-            
-            p2 = hv.Scatter(
-                nodes_all,
-                vdims=['x', 'y', 'volume']
-            ).opts(
-                width = 1000,
-                height = 500,
-                color = 'grey',
-            )
-            title = pd.to_datetime(datetime).strftime('%m/%d/%Y %H:%M ')
-            return p1 # hv.Overlay([p2, p1]).opts(title=title)
-
-        return hv.DynamicMap(quick_map_generator, kdims=['Time']).redim.values(Time=self.mesh.time.values)
-    
     def static_plot(
         self,
         plotting_timestep: int,
@@ -751,35 +952,64 @@ class ClearwaterRiverine:
                 output_path (str | Path): output path to save image.
 
         """
-        constituent_name, mx_val, mn_val = self._prep_plot(
+        return self._plotter().static_plot(
+            plotting_timestep=plotting_timestep,
             constituent_name=constituent_name,
             clim=clim,
-            gdf_plot=True,
+            cmap=cmap,
             crs=crs,
+            save=save,
+            output_path=output_path,
         )
 
-        date_value = self.mesh.time.isel(
-            time=plotting_timestep
-        ).values
+    def export_frames(
+        self,
+        output_path: str | Path,
+        constituent_name: Optional[str] = None,
+        timesteps: Optional[Sequence[int]] = None,
+        clim: Optional[tuple] = (None, None),
+        cmap: Optional[str] = 'RdYlBu_r',
+        crs: Optional[str] = None,
+        fps: Optional[float] = 10,
+        dpi: Optional[int] = 100,
+        workers: Optional[int] = None,
+        filter_empty: Optional[bool] = True,
+    ) -> Path | List[Path]:
+        """Renders a range of timesteps to PNG files, a GIF or an MP4 video, without displaying them.
+
+        Frames are rendered with matplotlib (as in `static_plot()`) by a pool of worker processes.
+        The cell polygons are sent to each worker once, and each frame only sends its cell values.
 
-        c = self.gdf[
-            (self.gdf.datetime == date_value) & (self.gdf[VOLUME] != 0)
-        ].plot(
-            column=constituent_name,
+        Args:
+            output_path (str | Path): GIF (.gif) or MP4 (.mp4) file, or a directory to write numbered PNG files to.
+                MP4 files require `ffmpeg`.
+            constituent_name (str, optional): name of constituent to plot.
+            timesteps (Sequence[int], optional): timesteps to render. Defaults to every timestep solved so far
+                (or every timestep of a model mesh loaded from disk).
+            clim (tuple, optional): min and max color limit values. Defaults to min and max values of constituent.
+            cmap (str, optional): colormap.
+            crs (str): coordinate system of the HEC-RAS 2D model. Only required the first time you plot.
+            fps (float, optional): frames per second of a GIF or MP4.
+            dpi (int, optional): resolution of the frames.
+            workers (int, optional): number of worker processes. Defaults to the number of CPUs.
+            filter_empty (boolean, optional): leave out empty cells.
+
+        Returns:
+            Path of the GIF or MP4, or paths of the PNG files.
+        """
+        return self._plotter().export_frames(
+            output_path=output_path,
+            constituent_name=constituent_name,
+            timesteps=timesteps,
+            clim=clim,
             cmap=cmap,
-            vmin=mn_val,
-            vmax=mx_val,
-            edgecolor = 'white',
-            linewidth = 0.1,
+            crs=crs,
+            fps=fps,
+            dpi=dpi,
+            workers=workers,
+            filter_empty=filter_empty,
         )
-        plt.xticks([])
-        plt.yticks([])
-        ax = plt.gca()
-        plt.axis('off')
-        plt.rcParams['figure.facecolor'] = 'lightgrey'
-        if save == True:
-            plt.savefig(output_path)
-        plt.show()
+
 
     def _determine_constituents(self):
         defined_variables = [f[1] for f in inspect.getmembers(clearwater_riverine.variables)]
@@ -119,7 +119,7 @@ class UnitConverter:
             return input_array / self.conversion_factor
 
 
-@numba.njit
+@numba.njit(cache=True)
 def _linear_interpolate(x0: float, x1: float, y0: float, y1: float, xi: float):
     """ Linear interpolation:
     
@@ -136,7 +136,7 @@ def _linear_interpolate(x0: float, x1: float, y0: float, y1: float, xi: float):
     yi = m * (xi - x0) + y0
     return yi
 
-@numba.njit
+@numba.njit(cache=True)
 def _compute_cell_volumes(
     water_surface_elev_arr: np.ndarray,
     cells_surface_area_arr: np.ndarray,
@@ -190,7 +190,7 @@ def _compute_cell_volumes(
 
     return cell_volumes
 
-@numba.njit
+@numba.njit(cache=True)
 def _compute_face_areas(
     water_surface_elev_arr: np.ndarray,
     faces_lengths_arr: np.ndarray,
@@ -258,6 +258,41 @@ def _compute_face_areas(
     return face_areas
 
 
+# argument types of the numba kernels: HEC-RAS tables (float32 values, int32 indices) and NumPy defaults
+KERNEL_DTYPES = [
+    (np.float32, np.int32),
+    (np.float64, np.int64),
+]
+
+def precompile():
+    """Compile the numba kernels for the common argument types, and store them in numba's cache.
+
+    Kernels are compiled with `cache=True`, so a process only compiles a kernel the first time
+    it is called with new argument types, and later processes load the compiled code from the
+    cache. Calling `precompile()` once (e.g., while building a container image) moves that
+    compilation out of the first model run. If the package directory is read-only at run time,
+    point `NUMBA_CACHE_DIR` to a writable directory both when precompiling and when running.
+    """
+    for float_type, int_type in KERNEL_DTYPES:
+        # two cells (or faces) at two times, with two-point lookup tables
+        water_surface_elev = np.array([[0.5, 2.0], [1.5, 0.0]], dtype=float_type)
+        lengths = np.ones(2, dtype=float_type)
+        starting_index = np.array([0, 2], dtype=int_type)
+        count = np.array([2, 2], dtype=int_type)
+        elev = np.array([0.0, 1.0, 0.0, 1.0], dtype=float_type)
+        values = np.array([0.0, 1.0, 0.0, 1.0], dtype=float_type)
+        _compute_cell_volumes(water_surface_elev, lengths, starting_index, count, elev, values)
+        _compute_face_areas(
+            water_surface_elev,
+            lengths,
+            np.array([0, 1], dtype=int_type),
+            starting_index,
+            count,
+            elev,
+            values,
+        )
+
+
 def _calc_distances_cell_centroids(mesh: xr.Dataset) -> np.array:
     """ Calculate the distance between cell centroids
 
@@ -0,0 +1,174 @@
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+)
+
+import numpy as np
+import xarray as xr
+from scipy.sparse import csr_matrix
+
+from clearwater_riverine.variables import (
+    FACE_X,
+    FACE_Y,
+    NUMBER_OF_REAL_CELLS,
+    VOLUME,
+)
+
+
+class Zones:
+    """Management zones (e.g., reaches, pools or intake areas) to aggregate results over while the model runs.
+
+    Each zone is either a polygon, in which case it holds the real cells whose centroids are
+    inside it (as in `OutputPolicy`), or a list of cell indices. Zones may overlap.
+
+    Args:
+        zones (Dict[str, shapely.Geometry | array-like]): Polygon or cell indices, keyed by zone name.
+    """
+    def __init__(self, zones: Dict[str, Any]):
+        if len(zones) == 0:
+            raise ValueError('At least one zone is required.')
+        self.zones = dict(zones)
+
+    @property
+    def names(self) -> List[str]:
+        """Zone names."""
+        return list(self.zones.keys())
+
+    def weights(self, mesh: xr.Dataset) -> csr_matrix:
+        """Sparse (zone x nface) membership matrix.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+        """
+        import shapely
+
+        nreal_index = mesh.attrs[NUMBER_OF_REAL_CELLS] + 1
+        rows = []
+        cells = []
+        for i, zone in enumerate(self.zones.values()):
+            if isinstance(zone, shapely.Geometry):
+                zone_cells = np.nonzero(
+                    shapely.contains_xy(
+                        zone,
+                        mesh[FACE_X].values[0:nreal_index],
+                        mesh[FACE_Y].values[0:nreal_index],
+                    )
+                )[0]
+            else:
+                zone_cells = np.unique(np.asarray(zone, dtype=int))
+                if ((zone_cells < 0) | (zone_cells >= nreal_index)).any():
+                    raise ValueError(f'Zone {self.names[i]} contains cells that are not real cells.')
+            rows.append(np.full(len(zone_cells), i))
+            cells.append(zone_cells)
+        rows = np.concatenate(rows)
+        cells = np.concatenate(cells)
+        return csr_matrix(
+            (np.ones(len(cells)), (rows, cells)),
+            shape=(len(self.zones), len(mesh.nface)),
+        )
+
+
+class ZoneRecorder:
+    """Records the volume, and the mass and volume-weighted mean concentration of each constituent, per zone.
+
+    Each timestep takes one sparse matrix product against the cell volumes and one against the
+    cell masses, and results are kept in compact (time x zone) arrays.
+
+    Args:
+        zones (Zones): Zones to aggregate over.
+        mesh (xr.Dataset): Unstructured model mesh.
+        names (List[str]): Constituent names, in storage order.
+        units (List[str]): Units of each constituent.
+        values (np.ndarray): Array of shape (constituent x nface) with concentrations at timestep 0.
+        state (xr.Dataset, optional): State saved by `state` (e.g., in a checkpoint) at the
+            first timestep of `mesh`. Recording continues from it, and the earlier time series are kept.
+    """
+    def __init__(
+        self,
+        zones: Zones,
+        mesh: xr.Dataset,
+        names: List[str],
+        units: List[str],
+        values: np.ndarray,
+        state: Optional[xr.Dataset] = None,
+    ):
+        self.zones = zones
+        self.names = list(names)
+        self.units = list(units)
+        self.weights = zones.weights(mesh)
+        self.time = mesh.time.values
+        # index of the first timestep of the mesh in the time series
+        self.offset = 0
+        if state is not None:
+            if list(state['constituent'].values) != self.names or list(state['zone'].values) != list(zones.names):
+                raise ValueError('The saved zone time series do not match the constituents and zones.')
+            self.offset = len(state['time']) - 1
+            self.time = np.concatenate([state['time'].values[0:self.offset], self.time])
+        self.volume = np.full((len(self.time), len(zones.names)), np.nan)
+        self.mass = np.full((len(self.names), len(self.time), len(zones.names)), np.nan)
+        if state is not None:
+            self.volume[0:self.offset + 1] = state['volume'].values
+            self.mass[:, 0:self.offset + 1] = state['mass'].values
+        else:
+            self.record(mesh, 0, values)
+
+    def record(self, mesh: xr.Dataset, t: int, values: np.ndarray):
+        """Record zone totals at timestep t.
+
+        Args:
+            mesh (xr.Dataset): Unstructured model mesh.
+            t (int): Timestep.
+            values (np.ndarray): Array of shape (constituent x nface) with concentrations at timestep t.
+        """
+        volume = np.asarray(mesh[VOLUME].data[t])
+        self.volume[self.offset + t] = self.weights @ volume
+        self.mass[:, self.offset + t] = (self.weights @ (values * volume).T).T
+
+    def state(self, t: int) -> xr.Dataset:
+        """Copy of the zone totals recorded up to timestep t, to continue recording from.
+
+        Args:
+            t (int): Last timestep recorded.
+        """
+        stop = self.offset + t + 1
+        return xr.Dataset(
+            data_vars={
+                'volume': (('time', 'zone'), self.volume[0:stop].copy()),
+                'mass': (('constituent', 'time', 'zone'), self.mass[:, 0:stop].copy()),
+            },
+            coords={
+                'constituent': np.array(self.names, dtype=object),
+                'time': self.time[0:stop],
+                'zone': np.array(self.zones.names, dtype=object),
+            },
+        )
+
+    def to_dataset(self) -> xr.Dataset:
+        """Recorded zone time series, with dimensions (time x zone).
+
+        Returns:
+            Dataset with the zone `volume`, and `{constituent}_mass` and volume-weighted mean
+            concentration `{constituent}` per zone. Timesteps that have not been solved yet are NaN.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = self.mass / self.volume
+        data_vars = {
+            VOLUME: xr.DataArray(self.volume, dims=('time', 'zone')),
+            'cells': xr.DataArray(np.diff(self.weights.indptr), dims=('zone',)),
+        }
+        for i, name in enumerate(self.names):
+            data_vars[f'{name}_mass'] = xr.DataArray(self.mass[i], dims=('time', 'zone'))
+            data_vars[name] = xr.DataArray(
+                mean[i],
+                dims=('time', 'zone'),
+                attrs={'Units': f'{self.units[i]}'},
+            )
+        return xr.Dataset(
+            data_vars=data_vars,
+            coords={
+                'time': self.time,
+                'zone': self.zones.names,
+            },
+        )
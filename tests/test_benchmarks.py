@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+import clearwater_riverine as cwr
+from benchmarks import cases, harness
+from benchmarks.harness import (
+    Benchmark,
+    compare_results,
+    discover,
+    machine_metadata,
+)
+
+
+class Failing:
+    params = [1, 2]
+    param_names = ['value']
+
+    def setup(self, value):
+        if value == 2:
+            raise KeyError(value)
+
+    def time_value(self, value):
+        pass
+
+
+def test_synthetic_channel(tmp_path):
+    """A synthetic channel carries the upstream concentration downstream."""
+    file_path = tmp_path / 'channel.hdf'
+    cases.write_channel(file_path, nx=6, ny=3, n_time=41)
+    model = cwr.ClearwaterRiverine(**cases.channel_inputs(file_path))
+    assert model.mesh.nreal == 17
+    assert len(model.mesh.nface) == 18 + 2 * (6 + 3)
+    model.run(len(model.mesh.time) - 1)
+
+    concentration = model.mesh['constituent_0'].values[:, 0:18].reshape(-1, 3, 6)
+    assert np.all((concentration >= 0) & (concentration <= 100 + 1e-9))
+    # uniform across the channel, and decreasing along it while the tracer front passes
+    np.testing.assert_allclose(concentration, np.broadcast_to(concentration[:, 0:1], concentration.shape), rtol=1e-6, atol=1e-9)
+    assert np.all(np.diff(concentration[5, 0]) < 0)
+
+def test_discover():
+    benchmarks = {benchmark.name: benchmark for benchmark in discover()}
+    kinds = {benchmark.kind for benchmark in benchmarks.values()}
+    assert kinds == {'timeraw', 'time', 'peakmem', 'track'}
+    update = benchmarks['bench_timestep.Update.time_update']
+    assert update.param_names == ['case', 'n_constituents']
+    assert len(update.combinations()) == len(cases.CASES) * 2
+    assert len(benchmarks['bench_output.OutputWrite.time_write_zarr'].combinations()) == len(cases.CASES)
+    assert benchmarks['bench_memory.ModelMemory.track_estimated_peak'].unit == 'bytes'
+
+    assert discover('ImportTime')[0].run(()) is not None
+    # shipped cases whose flow field is not available are skipped
+    track = benchmarks['bench_memory.ModelMemory.track_estimated_peak']
+    assert track.run(('plan11_stormSurge', 100)) is None
+    assert track.run(('plan02_2x1', 1000)) is None
+    assert track.run(('plan01_10x5', 100))[0] > 0
+
+def test_failures_are_recorded(monkeypatch):
+    """A parameter combination that fails is recorded, and the other combinations still run."""
+    monkeypatch.setattr(harness, 'discover', lambda pattern: [Benchmark(__name__, 'Failing', 'time_value')])
+    entries = harness.run_benchmarks(repeat=1, verbose=False)['results']['test_benchmarks.Failing.time_value']['results']
+    assert entries[0]['value'] >= 0 and entries[0]['error'] is None
+    assert entries[1]['value'] is None and entries[1]['error'] == 'KeyError: 2'
+
+def _results(samples):
+    return {
+        'machine': machine_metadata(),
+        'results': {
+            'bench.Case.time_case': {
+                'kind': 'time',
+                'unit': 'seconds',
+                'param_names': ['case'],
+                'results': [
+                    {'params': [case], 'value': float(np.median(values)), 'samples': values}
+                    for case, values in samples.items()
+                ],
+            },
+        },
+    }
+
+def test_compare_results():
+    before = _results({'a': [1.0, 1.1, 1.2], 'b': [1.0, 1.1, 1.2], 'c': [1.0, 1.1, 1.2], 'd': [1.0, 1.1, 1.2]})
+    after = _results({'a': [1.5, 1.6, 1.7], 'b': [0.5, 0.6, 0.7], 'c': [1.0, 1.12, 1.2], 'd': [0.9, 1.5, 1.8]})
+    comparison = compare_results(before, after, threshold=1.1).set_index('params')
+    assert comparison.loc['a', 'change'] == 'regression'
+    assert comparison.loc['b', 'change'] == 'improvement'
+    assert comparison.loc['c', 'change'] == ''
+    # a large change in the median within overlapping samples is noise
+    assert comparison.loc['d', 'change'] == ''
+    with pytest.raises(ValueError):
+        compare_results(before, after, threshold=0.9)
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+import clearwater_riverine as cwr
+
+
+@pytest.fixture
+def sim02() -> str:
+    return './tests/data/simple_test_cases/plan02_2x1/'
+
+@pytest.fixture
+def plan02_kwargs(sim02) -> dict:
+    return {
+        'flow_field_file_path': sim02 + 'clearWaterTestCases.p02.hdf',
+        'diffusion_coefficient_input': 0.001,
+        'constituent_dict': {
+            'conc': {
+                'units': 'mg/L',
+                'initial_conditions': sim02 + 'cwr_initial_conditions_p02.csv',
+                'boundary_conditions': sim02 + 'cwr_boundary_conditions_p02.csv',
+            },
+        },
+    }
+
+
+def test_restart_matches_uninterrupted_run(plan02_kwargs, tmp_path):
+    """A run resumed from a checkpoint continues exactly where it left off."""
+    checkpoint_path = tmp_path / 'checkpoint.zarr'
+    full = cwr.ClearwaterRiverine(**plan02_kwargs)
+    full.run(len(full.mesh.time) - 1)
+
+    interrupted = cwr.ClearwaterRiverine(**plan02_kwargs)
+    interrupted.run(10, callbacks=lambda model: model.checkpoint(checkpoint_path), callback_every=5)
+    interrupted.finalize()
+
+    resumed = cwr.ClearwaterRiverine(checkpoint_file_path=checkpoint_path)
+    assert resumed.mesh.time.values[0] == full.mesh.time.values[10]
+    resumed.run(len(resumed.mesh.time) - 1)
+    np.testing.assert_array_equal(
+        resumed.mesh['conc'].values,
+        full.mesh['conc'].values[10:],
+    )
+
+def test_restart_continues_recorders(plan02_kwargs, tmp_path):
+    """Mass balances, statistics, probes and zones resumed from a checkpoint match an uninterrupted run."""
+    checkpoint_path = tmp_path / 'checkpoint.zarr'
+    recorders = {
+        'track_mass_balance': True,
+        'cell_statistics': cwr.CellStatistics(quantiles=[0.5], thresholds={'conc': 100.0}, period='30min'),
+        'probes': cwr.Probes(x=[500002.5, 500007.5], y=[102.5, 102.5]),
+        'zones': cwr.Zones({'domain': [0, 1]}),
+    }
+    full = cwr.ClearwaterRiverine(**plan02_kwargs, **recorders)
+    full.run(len(full.mesh.time) - 1)
+
+    interrupted = cwr.ClearwaterRiverine(**plan02_kwargs, **recorders)
+    interrupted.run(10, callbacks=lambda model: model.checkpoint(checkpoint_path), callback_every=5)
+    interrupted.finalize()
+
+    resumed = cwr.ClearwaterRiverine(checkpoint_file_path=checkpoint_path, **recorders)
+    resumed.run(len(resumed.mesh.time) - 1)
+    xr.testing.assert_allclose(resumed.statistics(), full.statistics())
+    xr.testing.assert_allclose(resumed.probe_timeseries(), full.probe_timeseries())
+    xr.testing.assert_allclose(resumed.zone_timeseries(), full.zone_timeseries())
+    pd.testing.assert_frame_equal(resumed.mass_balance.boundaries(), full.mass_balance.boundaries())
+    pd.testing.assert_frame_equal(resumed.mass_balance.domain(), full.mass_balance.domain())
+
+    with pytest.raises(ValueError):
+        cwr.ClearwaterRiverine(
+            checkpoint_file_path=checkpoint_path,
+            cell_statistics=cwr.CellStatistics(quantiles=[0.9]),
+        )
+
+def test_restart_rejects_different_hydrodynamics(plan02_kwargs, tmp_path):
+    """Checkpoints can only be resumed with the hydrodynamics they were written with."""
+    checkpoint_path = tmp_path / 'checkpoint.zarr'
+    model = cwr.ClearwaterRiverine(**plan02_kwargs)
+    model.run(2)
+    model.checkpoint(checkpoint_path).result()
+    with pytest.raises(ValueError):
+        cwr.ClearwaterRiverine(
+            checkpoint_file_path=checkpoint_path,
+            flow_field_file_path='./tests/data/simple_test_cases/plan03_2x1/clearWaterTestCases.p03.hdf',
+        )
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import clearwater_riverine as cwr
+
+from clearwater_riverine.constituents import _boundary_series_to_model_time
+from clearwater_riverine.io.inputs import read_tabular_input
+
+
+@pytest.fixture
+def model_time() -> np.ndarray:
+    return pd.date_range(
+        '2023-01-01 12:00:00',
+        periods=6,
+        freq='5min'
+    ).values
+
+@pytest.fixture
+def bc_df() -> pd.DataFrame:
+    return pd.DataFrame({
+        'RAS2D_TS_Name': ['US_Flow', 'DS_Stage', 'US_Flow', 'DS_Stage', 'US_Flow'],
+        'Datetime': pd.to_datetime([
+            '2023-01-01 12:00:00',
+            '2023-01-01 12:07:00',
+            '2023-01-01 12:10:00',
+            '2023-01-01 12:20:00',
+            '2023-01-01 12:20:00',
+        ]),
+        'Concentration': [1.0, 5.0, 2.0, 6.0, 3.0],
+    })
+
+
+def test_boundary_series_to_model_time(bc_df, model_time):
+    """Each model timestep takes the most recent boundary value."""
+    names, values = _boundary_series_to_model_time(bc_df, model_time)
+    assert list(names) == ['DS_Stage', 'US_Flow']
+    np.testing.assert_array_equal(
+        values[:, 1],
+        [1.0, 1.0, 2.0, 2.0, 3.0, 3.0]
+    )
+    np.testing.assert_array_equal(
+        values[:, 0],
+        [np.nan, np.nan, 5.0, 5.0, 6.0, 6.0]
+    )
+
+def test_boundary_series_matches_merge_asof(bc_df, model_time):
+    """Vectorized mapping matches a per-boundary merge_asof."""
+    names, values = _boundary_series_to_model_time(bc_df, model_time)
+    model_df = pd.DataFrame({'Datetime': model_time})
+    for i, name in enumerate(names):
+        group_df = bc_df[bc_df.RAS2D_TS_Name == name].sort_values('Datetime')
+        merged = pd.merge_asof(
+            model_df,
+            group_df.astype({'Datetime': model_df.Datetime.dtype}),
+            on='Datetime'
+        )
+        expected = merged['Concentration'].interpolate(method='linear').values
+        np.testing.assert_array_equal(values[:, i], expected)
+
+def test_read_tabular_input(bc_df, tmp_path):
+    """CSV and Parquet boundary conditions are read identically."""
+    bc_df.to_csv(tmp_path / 'bc.csv', index=False)
+    bc_df.to_parquet(tmp_path / 'bc.parquet')
+    csv_df = read_tabular_input(tmp_path / 'bc.csv', parse_dates=['Datetime'])
+    parquet_df = read_tabular_input(tmp_path / 'bc.parquet', parse_dates=['Datetime'])
+    np.testing.assert_array_equal(
+        csv_df.Datetime.values.astype('datetime64[ns]'),
+        parquet_df.Datetime.values.astype('datetime64[ns]'),
+    )
+    with pytest.raises(ValueError):
+        read_tabular_input(tmp_path / 'bc.txt')
+
+
+@pytest.fixture
+def sim02() -> str:
+    return './tests/data/simple_test_cases/plan02_2x1/'
+
+@pytest.fixture
+def constituent_config(sim02) -> dict:
+    return {
+        'units': 'mg/L',
+        'initial_conditions': sim02 + 'cwr_initial_conditions_p02.csv',
+        'boundary_conditions': sim02 + 'cwr_boundary_conditions_p02.csv',
+    }
+
+def _model(sim02, constituent_dict):
+    return cwr.ClearwaterRiverine(
+        flow_field_file_path=sim02 + 'clearWaterTestCases.p02.hdf',
+        diffusion_coefficient_input=0.001,
+        constituent_dict=constituent_dict,
+    )
+
+def test_constituent_set_matches_single_constituent(sim02, constituent_config):
+    """Solving constituents together gives the same answer as solving them alone."""
+    single = _model(sim02, {'a': constituent_config})
+    batched = _model(sim02, {'a': constituent_config, 'b': constituent_config})
+    for _ in range(5):
+        single.update()
+        batched.update()
+    np.testing.assert_allclose(
+        batched.mesh['b'].values,
+        single.mesh['a'].values,
+    )
+    np.testing.assert_allclose(
+        batched.constituent_dict['b'].total_mass_flux,
+        single.constituent_dict['a'].total_mass_flux,
+    )
+
+def test_constituent_set_get_set(sim02, constituent_config):
+    """Bulk get and set by constituent name."""
+    model = _model(sim02, {'a': constituent_config, 'b': constituent_config})
+    constituent_set = model.constituent_set
+    assert constituent_set.names == ['a', 'b']
+    constituent_set.set(['b'], np.array([[5.0, 6.0]]))
+    values = constituent_set.get(['b', 'a'])
+    assert values.shape == (2, len(model.mesh.nface))
+    np.testing.assert_array_equal(values[0, 0:2], [5.0, 6.0])
+    np.testing.assert_array_equal(values[1], constituent_set['a'].initial_conditions)
+
+def test_buffered_sync_matches_every_step(sim02, constituent_config):
+    """Deferring writes to the model mesh does not change the results."""
+    every_step = _model(sim02, {'a': constituent_config})
+    buffered = cwr.ClearwaterRiverine(
+        flow_field_file_path=sim02 + 'clearWaterTestCases.p02.hdf',
+        diffusion_coefficient_input=0.001,
+        constituent_dict={'a': constituent_config},
+        sync_every=3,
+    )
+    for _ in range(5):
+        every_step.update()
+        buffered.update()
+    assert np.isnan(buffered.mesh['a'].values[4:6]).all()
+    buffered.sync()
+    np.testing.assert_array_equal(
+        buffered.mesh['a'].values,
+        every_step.mesh['a'].values,
+    )
+
+def test_run_matches_update(sim02, constituent_config):
+    """Running a batch of timesteps matches calling update() per timestep."""
+    stepped = _model(sim02, {'a': constituent_config})
+    batched = _model(sim02, {'a': constituent_config})
+    for _ in range(6):
+        stepped.update()
+    calls = []
+    batched.run(4, callbacks=lambda model: calls.append(model.time_step), callback_every=2)
+    batched.run_until(batched.mesh.time.values[6])
+    assert calls == [2, 4]
+    assert batched.time_step == 6
+    np.testing.assert_array_equal(batched.mesh['a'].values, stepped.mesh['a'].values)
+    with pytest.raises(ValueError):
+        batched.run(len(batched.mesh.time))
+
+    # the deprecated simulate_wq() runs the remaining timesteps
+    with pytest.warns(DeprecationWarning):
+        batched.simulate_wq()
+    assert batched.time_step == len(batched.mesh.time) - 1
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import clearwater_riverine as cwr
+
+
+@pytest.fixture
+def sim01() -> str:
+    return './tests/data/simple_test_cases/plan01_10x5/'
+
+@pytest.fixture
+def plan01_kwargs(sim01) -> dict:
+    return {
+        'flow_field_file_path': sim01 + 'clearWaterTestCases.p01.hdf',
+        'diffusion_coefficient_input': 0.01,
+        'datetime_range': (0, 60),
+        'constituent_dict': {
+            'conc': {
+                'units': 'mg/L',
+                'initial_conditions': sim01 + 'cwr_initial_conditions_p01.csv',
+                'boundary_conditions': sim01 + 'cwr_boundary_conditions_p01.csv',
+            },
+        },
+    }
+
+
+def test_diagnostics(plan01_kwargs, tmp_path):
+    """Per-timestep diagnostics match quantities recomputed from the mesh."""
+    model = cwr.ClearwaterRiverine(**plan01_kwargs, record_diagnostics=True)
+    model.run(10)
+    diagnostics = model.diagnostics()
+    assert list(diagnostics.index) == list(range(10))
+    np.testing.assert_array_equal(diagnostics['time'].values, model.mesh.time.values[1:11])
+    assert (diagnostics['residual'] < 1e-10).all()
+    assert (diagnostics['iterations'] == 0).all()
+    assert (diagnostics['seconds'] > 0).all()
+    assert (diagnostics['nnz'] > 0).all()
+
+    mesh = model.mesh
+    nreal = mesh.nreal
+    for t in [0, 9]:
+        volume = mesh['volume'].values[t + 1, 0:nreal + 1]
+        assert diagnostics.loc[t, 'wet_cells'] == (volume > 0).sum()
+
+        outflow = np.zeros(len(mesh.nface))
+        for edge, flow in enumerate(mesh['advection_coeff'].values[t]):
+            if flow > 0:
+                outflow[mesh['edges_face1'].values[edge]] += flow
+            elif flow < 0:
+                outflow[mesh['edges_face2'].values[edge]] -= flow
+        courant = outflow[0:nreal + 1] * mesh['dt'].values[t] / volume
+        np.testing.assert_allclose(diagnostics.loc[t, 'max_courant'], courant.max())
+
+        diffusion = mesh['coeff_to_diffusion'].values[t]
+        peclet = np.abs(mesh['advection_coeff'].values[t][diffusion > 0]) / diffusion[diffusion > 0]
+        if len(peclet) == 0:
+            # no diffusion across any edge
+            assert np.isnan(diagnostics.loc[t, 'max_peclet'])
+        else:
+            np.testing.assert_allclose(diagnostics.loc[t, 'max_peclet'], peclet.max())
+
+    model.write_diagnostics(tmp_path / 'diagnostics.parquet')
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / 'diagnostics.parquet'), diagnostics)
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+import clearwater_riverine as cwr
+
+from clearwater_riverine.postproc_util import _mass_bal_global
+
+
+@pytest.fixture
+def sim01() -> str:
+    return './tests/data/simple_test_cases/plan01_10x5/'
+
+@pytest.fixture
+def plan01_kwargs(sim01) -> dict:
+    return {
+        'flow_field_file_path': sim01 + 'clearWaterTestCases.p01.hdf',
+        'diffusion_coefficient_input': 0.01,
+        'datetime_range': (0, 60),
+        'constituent_dict': {
+            'conc': {
+                'units': 'mg/L',
+                'initial_conditions': sim01 + 'cwr_initial_conditions_p01.csv',
+                'boundary_conditions': sim01 + 'cwr_boundary_conditions_p01.csv',
+            },
+        },
+    }
+
+def _run(kwargs: dict, **options) -> cwr.ClearwaterRiverine:
+    model = cwr.ClearwaterRiverine(**kwargs, **options)
+    model.run(len(model.mesh.time) - 1)
+    model.finalize()
+    return model
+
+
+def test_deferred_mass_flux_matches_online(plan01_kwargs):
+    """Mass fluxes calculated after the run match those calculated every timestep."""
+    online = _run(plan01_kwargs).constituent_dict['conc']
+    deferred = _run(plan01_kwargs, mass_flux='deferred').constituent_dict['conc']
+    for flux in ['advection_mass_flux', 'diffusion_mass_flux', 'total_mass_flux']:
+        np.testing.assert_array_equal(getattr(deferred, flux), getattr(online, flux))
+
+def test_boundary_mass_flux(plan01_kwargs):
+    """Boundary mode only stores the mass fluxes across edges to ghost cells."""
+    online = _run(plan01_kwargs).constituent_dict['conc']
+    model = _run(plan01_kwargs, mass_flux='boundary')
+    boundary = model.constituent_dict['conc']
+    nreal = model.mesh.nreal
+    assert (model.mesh['edges_face2'].values[boundary.flux_edges] > nreal).all()
+    np.testing.assert_array_equal(
+        boundary.total_mass_flux,
+        online.total_mass_flux[:, boundary.flux_edges],
+    )
+    edges = model.boundary_data['Face Index'].values
+    np.testing.assert_array_equal(
+        boundary.total_mass_flux[:, boundary.flux_columns(edges)],
+        online.total_mass_flux[:, edges],
+    )
+    with pytest.raises(ValueError):
+        boundary.flux_columns([0])
+
+def test_mass_flux_off(plan01_kwargs):
+    model = _run(plan01_kwargs, mass_flux='off')
+    assert model.constituent_dict['conc'].total_mass_flux.shape == (len(model.mesh.time), 0)
+    # no constituent holds mass fluxes of its own
+    for name in ['advection_mass_flux', 'diffusion_mass_flux', 'total_mass_flux']:
+        assert getattr(model.constituent_dict['conc'], name).base is getattr(model.constituent_set, name)
+    with pytest.raises(ValueError):
+        model.calculate_mass_flux()
+
+def test_mass_balance_accumulator_matches_post_processing(plan01_kwargs):
+    """Budgets accumulated during the run match the post-run mass balance."""
+    model = _run(plan01_kwargs, mass_flux='off', track_mass_balance=True)
+    expected = _run(plan01_kwargs)
+    df = _mass_bal_global(expected, 'conc')
+
+    domain = model.mass_balance.domain().loc['conc']
+    np.testing.assert_allclose(domain['mass_start'], df['Mass_start'].iloc[0])
+    np.testing.assert_allclose(domain['mass_end'], df['Mass_end'].iloc[0])
+    np.testing.assert_allclose(domain['mass_in'], -df['bcTotalMassInAll'].iloc[0])
+    np.testing.assert_allclose(domain['mass_out'], df['bcTotalMassOutAll'].iloc[0])
+    np.testing.assert_allclose(domain['mass_error'], df['error_mass'].iloc[0])
+    np.testing.assert_allclose(domain['volume_error'], df['error_vol'].iloc[0], atol=1e-9)
+
+    boundaries = model.mass_balance.boundaries().loc['conc']
+    for name in boundaries.index:
+        np.testing.assert_allclose(boundaries.loc[name, 'mass_in'], -df[f'{name}_in_mass'].iloc[0])
+        np.testing.assert_allclose(boundaries.loc[name, 'volume_out'], df[f'{name}_out_vol'].iloc[0])
+
+def test_vectorized_mass_balance(plan01_kwargs, tmp_path):
+    """Post-run budgets of live and reloaded results match the budgets accumulated during the run."""
+    output_path = tmp_path / 'output.zarr'
+    model = cwr.ClearwaterRiverine(**plan01_kwargs, track_mass_balance=True, sync_every=7)
+    model.run(len(model.mesh.time) - 1)
+    domain, boundaries = model.calculate_mass_balance()
+    np.testing.assert_allclose(domain.values, model.mass_balance.domain().values)
+    np.testing.assert_allclose(boundaries.values, model.mass_balance.boundaries().values)
+
+    model.finalize(save=True, output_filepath=output_path)
+    loaded = cwr.ClearwaterRiverine(mesh_file_path=output_path)
+    loaded_domain, loaded_boundaries = loaded.calculate_mass_balance(
+        tmp_path / 'output_boundary_data.csv'
+    )
+    np.testing.assert_allclose(loaded_domain.values, domain.values, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(loaded_boundaries.values, boundaries.values, rtol=1e-6, atol=1e-6)
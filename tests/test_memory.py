@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+import clearwater_riverine as cwr
+from clearwater_riverine.memory import parse_bytes, read_plan_dimensions
+
+
+@pytest.fixture
+def sim02() -> str:
+    return './tests/data/simple_test_cases/plan02_2x1/'
+
+@pytest.fixture
+def plan02_kwargs(sim02) -> dict:
+    return {
+        'flow_field_file_path': sim02 + 'clearWaterTestCases.p02.hdf',
+        'diffusion_coefficient_input': 0.001,
+        'constituent_dict': {
+            name: {
+                'units': 'mg/L',
+                'initial_conditions': sim02 + 'cwr_initial_conditions_p02.csv',
+                'boundary_conditions': sim02 + 'cwr_boundary_conditions_p02.csv',
+            }
+            for name in ['conc', 'tracer']
+        },
+    }
+
+
+def test_parse_bytes():
+    assert parse_bytes(1024) == 1024
+    assert parse_bytes('8GB') == 8_000_000_000
+    assert parse_bytes('512 MiB') == 512 * 2**20
+    assert parse_bytes('1.5g') == 1_500_000_000
+    with pytest.raises(ValueError):
+        parse_bytes('lots')
+
+
+def test_estimate_memory(plan02_kwargs):
+    """The estimated hydrodynamic, parameter, history and mass flux arrays match the model's."""
+    file_path = plan02_kwargs['flow_field_file_path']
+    estimate = cwr.estimate_memory(file_path, datetime_range=(0, 20), n_constituents=2)
+    model = cwr.ClearwaterRiverine(**plan02_kwargs, datetime_range=(0, 20))
+    mesh = model.mesh
+
+    hydrodynamics = ['edge_velocity', 'water_surface_elev', 'volume', 'face_flow']
+    static_bytes = read_plan_dimensions(file_path, (0, 20))['static_bytes']
+    assert estimate.loc['read_hydrodynamics', 'allocated'] == static_bytes + sum(
+        mesh[name].nbytes for name in hydrodynamics
+    )
+    parameters = ['advection_coeff', 'edge_vertical_area', 'coeff_to_diffusion']
+    assert estimate.loc['calculate_parameters', 'allocated'] == sum(mesh[name].nbytes for name in parameters)
+    histories = mesh['conc'].nbytes + mesh['tracer'].nbytes
+    assert histories <= estimate.loc['initialize_constituents', 'allocated'] < 2 * histories
+    constituent_set = model.constituent_set
+    assert estimate.loc['run', 'allocated'] == (
+        constituent_set.advection_mass_flux.nbytes
+        + constituent_set.diffusion_mass_flux.nbytes
+        + constituent_set.total_mass_flux.nbytes
+    )
+    assert (estimate['peak'] >= estimate['resident']).all()
+    assert estimate.loc['run', 'resident'] == estimate['allocated'].sum()
+
+    # streaming, scratch files and boundary mass fluxes need less memory
+    smaller = cwr.estimate_memory(
+        file_path,
+        datetime_range=(0, 20),
+        n_constituents=2,
+        mass_flux='boundary',
+        scratch=True,
+    )
+    assert (smaller['resident'] < estimate['resident']).all()
+
+def test_output_policy_estimate(plan02_kwargs):
+    file_path = plan02_kwargs['flow_field_file_path']
+    policy = cwr.OutputPolicy(every=5, cells=[0, 1], constituents=['conc'])
+    estimate = cwr.estimate_memory(file_path, datetime_range=(0, 20), n_constituents=2, output_policy=policy, mass_flux='off')
+    model = cwr.ClearwaterRiverine(**plan02_kwargs, datetime_range=(0, 20), output_policy=policy, mass_flux='off')
+    model.run(len(model.mesh.time) - 1)
+    model.sync()
+    # stored timesteps and the buffer
+    assert estimate.loc['run', 'allocated'] == model.output['conc'].nbytes + model.constituent_set.recorder.buffer.nbytes
+
+def test_memory_budget(plan02_kwargs, tmp_path):
+    file_path = plan02_kwargs['flow_field_file_path']
+    in_memory = cwr.estimate_memory(file_path, n_constituents=2)
+    scratch = cwr.estimate_memory(file_path, n_constituents=2, scratch=True)
+    limit = int(scratch['peak'].max()) + 1
+    assert in_memory['peak'].max() > limit
+
+    with pytest.raises(MemoryError, match='exceeds the budget'):
+        cwr.ClearwaterRiverine(**plan02_kwargs, memory_budget=cwr.MemoryBudget(limit))
+    with pytest.raises(ValueError):
+        cwr.MemoryBudget(limit, action='swap')
+
+    with pytest.warns(UserWarning, match='scratch files'):
+        model = cwr.ClearwaterRiverine(
+            **plan02_kwargs,
+            memory_budget=cwr.MemoryBudget(limit, action='scratch', scratch_directory=tmp_path),
+        )
+    assert model.scratch is not None
+    assert isinstance(model.mesh['conc'].data, np.memmap)
+    assert model.memory_estimate['peak'].max() <= limit
+
+    reference = cwr.ClearwaterRiverine(**plan02_kwargs)
+    for run in [model, reference]:
+        run.run(len(run.mesh.time) - 1)
+    np.testing.assert_array_equal(model.mesh['conc'].values, reference.mesh['conc'].values)
+
+def test_memory_report(plan02_kwargs):
+    model = cwr.ClearwaterRiverine(**plan02_kwargs, profile_memory=True)
+    model.run(len(model.mesh.time) - 1)
+    report = model.memory_report()
+    assert list(report.index) == ['start', 'read_hydrodynamics', 'calculate_parameters', 'initialize_constituents', 'run']
+    assert report['estimated_peak'].iloc[1:].notna().all()
+    assert (report['peak_rss'].diff().iloc[1:] >= 0).all()
+    assert (report['rss'] > 0).all()
+
+    with pytest.raises(ValueError):
+        cwr.ClearwaterRiverine(**plan02_kwargs).memory_report()
+
+    # a model stepped with update() is measured once, when the report is made
+    stepped = cwr.ClearwaterRiverine(**plan02_kwargs, profile_memory=True)
+    for _ in range(3):
+        stepped.update()
+    assert 'run' not in stepped.memory_profiler.to_dataframe().index
+    assert 'run' in stepped.memory_report().index
@@ -0,0 +1,234 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import shapely
+import xarray as xr
+
+import clearwater_riverine as cwr
+
+from clearwater_riverine.io.geometry import cell_geodataframe
+from clearwater_riverine.mesh import cell_polygons
+from clearwater_riverine.rasterize import CellRasterizer
+
+
+@pytest.fixture
+def sim02() -> str:
+    return './tests/data/simple_test_cases/plan02_2x1/'
+
+@pytest.fixture
+def plan02_kwargs(sim02) -> dict:
+    return {
+        'flow_field_file_path': sim02 + 'clearWaterTestCases.p02.hdf',
+        'diffusion_coefficient_input': 0.001,
+        'constituent_dict': {
+            'conc': {
+                'units': 'mg/L',
+                'initial_conditions': sim02 + 'cwr_initial_conditions_p02.csv',
+                'boundary_conditions': sim02 + 'cwr_boundary_conditions_p02.csv',
+            },
+        },
+    }
+
+
+def test_streamed_output_matches_in_memory(plan02_kwargs, tmp_path):
+    """Results streamed to Zarr during the run match results held in memory."""
+    stream_path = tmp_path / 'output.zarr'
+    in_memory = cwr.ClearwaterRiverine(**plan02_kwargs)
+    in_memory.run(len(in_memory.mesh.time) - 1)
+
+    streamed = cwr.ClearwaterRiverine(
+        **plan02_kwargs,
+        stream_file_path=stream_path,
+        stream_mass_flux=True,
+        sync_every=4,
+    )
+    streamed.run(len(streamed.mesh.time) - 1)
+    streamed.finalize(save=True)
+
+    output = xr.open_zarr(stream_path)
+    np.testing.assert_array_equal(
+        output['conc'].values,
+        in_memory.mesh['conc'].values,
+    )
+    np.testing.assert_array_equal(
+        output['conc_total_mass_flux'].values,
+        in_memory.constituent_dict['conc'].total_mass_flux,
+    )
+    np.testing.assert_array_equal(
+        streamed.mesh['conc'].values,
+        in_memory.mesh['conc'].values,
+    )
+
+def test_output_policy_selects_results(plan02_kwargs, tmp_path):
+    """An output policy stores only the selected timesteps and cells."""
+    output_path = tmp_path / 'output.zarr'
+    full = cwr.ClearwaterRiverine(**plan02_kwargs)
+    full.run(len(full.mesh.time) - 1)
+
+    decimated = cwr.ClearwaterRiverine(
+        **plan02_kwargs,
+        output_policy=cwr.OutputPolicy(every=5, cells=[0, 1]),
+    )
+    decimated.run(len(decimated.mesh.time) - 1)
+    decimated.finalize(save=True, output_filepath=output_path)
+
+    output = xr.open_zarr(output_path)
+    assert dict(output.sizes) == {'time': 5, 'nface': 2}
+    np.testing.assert_array_equal(
+        output['conc'].values,
+        full.mesh['conc'].values[::5, 0:2],
+    )
+    assert np.isnan(decimated.mesh['conc'].values[1]).all()
+
+    # mass fluxes are never output under a policy, so they are not allocated
+    assert decimated.mass_flux == 'off'
+    assert decimated.constituent_set.total_mass_flux.size == 0
+    with pytest.raises(ValueError):
+        cwr.ClearwaterRiverine(**plan02_kwargs, output_policy=cwr.OutputPolicy(every=5), mass_flux='full')
+
+def test_output_policy_tolerance(plan02_kwargs):
+    """With a tolerance, timesteps are only stored once values change by more than the tolerance."""
+    model = cwr.ClearwaterRiverine(
+        **plan02_kwargs,
+        output_policy=cwr.OutputPolicy(tolerance=1.0),
+    )
+    model.run(len(model.mesh.time) - 1)
+    stored = model.output['conc'].values
+    assert len(stored) < len(model.mesh.time)
+    changes = np.nanmax(np.abs(np.diff(stored, axis=0)), axis=1)
+    assert (changes > 1.0).all()
+
+def test_scratch_backed_run_matches_in_memory(plan02_kwargs, tmp_path):
+    """Backing the model with memory-mapped scratch files does not change the results."""
+    scratch_path = tmp_path / 'scratch'
+    output_path = tmp_path / 'output.zarr'
+    in_memory = cwr.ClearwaterRiverine(**plan02_kwargs)
+    in_memory.run(len(in_memory.mesh.time) - 1)
+
+    scratch = cwr.ClearwaterRiverine(**plan02_kwargs, scratch_directory=scratch_path)
+    assert isinstance(scratch.mesh['conc'].data, np.memmap)
+    assert isinstance(scratch.mesh['volume'].data, np.memmap)
+    scratch.run(len(scratch.mesh.time) - 1)
+    scratch.finalize(save=True, output_filepath=output_path)
+
+    np.testing.assert_array_equal(
+        xr.open_zarr(output_path)['conc'].values,
+        in_memory.mesh['conc'].values,
+    )
+    np.testing.assert_array_equal(
+        scratch.constituent_dict['conc'].total_mass_flux,
+        in_memory.constituent_dict['conc'].total_mass_flux,
+    )
+    scratch.scratch.cleanup()
+    assert list(scratch_path.iterdir()) == []
+
+def test_cell_geometry_cache(plan02_kwargs, tmp_path):
+    """Plotting polygons are cached per mesh and coordinate system, and reused."""
+    model = cwr.ClearwaterRiverine(**plan02_kwargs, geometry_cache_directory=tmp_path)
+    model._plotter()._prep_gdf('EPSG:26916')
+    cached = list(tmp_path.glob('cell_geometry_*.parquet'))
+    assert len(cached) == 1
+    assert len(model.poly_gdf) == model.mesh.nreal + 1
+
+    model = cwr.ClearwaterRiverine(**plan02_kwargs, geometry_cache_directory=tmp_path)
+    model._plotter()._prep_gdf('EPSG:26916')
+    assert list(tmp_path.glob('cell_geometry_*.parquet')) == cached
+    assert model.poly_gdf.geom_equals_exact(cell_geodataframe(model.mesh, 'EPSG:26916'), 0).all()
+
+    model._plotter()._prep_gdf('EPSG:26917')
+    assert len(list(tmp_path.glob('cell_geometry_*.parquet'))) == 2
+
+def test_plot_frames(plan02_kwargs):
+    """Plot frames join one timestep to the cell polygons, and recent frames are reused."""
+    model = cwr.ClearwaterRiverine(**plan02_kwargs)
+    model.run(4)
+    plotter = model._plotter()
+    plotter._prep_plot('conc', (None, None), gdf_plot=True, crs='EPSG:26916')
+    nreal_index = model.mesh.nreal + 1
+
+    frame = plotter._frame(2)
+    assert plotter._frame(2) is frame
+    assert len(frame) == nreal_index
+    np.testing.assert_array_equal(frame['conc'].values, model.mesh['conc'].values[2, 0:nreal_index])
+    assert frame.geometry.geom_equals_exact(model.poly_gdf.geometry, 0).all()
+
+    gdf = model.gdf
+    assert len(gdf) == len(model.mesh.time) * nreal_index
+    np.testing.assert_array_equal(
+        gdf[gdf.datetime == model.mesh.time.values[2]]['conc'].values,
+        frame['conc'].values,
+    )
+
+    # frames are rebuilt once the model has advanced
+    model.run(1)
+    plotter._prep_plot('conc', (None, None), gdf_plot=True)
+    assert plotter._frame(2) is not frame
+
+def test_cell_rasterizer(plan02_kwargs):
+    """Pixels take the value of the cell containing their center, and are NaN outside the mesh."""
+    model = cwr.ClearwaterRiverine(**plan02_kwargs)
+    nreal_index = model.mesh.nreal + 1
+    polygons = cell_polygons(model.mesh, nreal_index)
+    rasterizer = CellRasterizer(polygons)
+    values = np.arange(nreal_index, dtype=float)
+
+    bounds = rasterizer.bounds
+    margin = bounds[2] - bounds[0]
+    xs, ys, image = rasterizer.rasterize(
+        values,
+        x_range=(bounds[0] - margin, bounds[2] + margin),
+        y_range=(bounds[1], bounds[3]),
+        width=60,
+        height=20,
+    )
+    assert image.shape == (20, 60)
+    x, y = np.meshgrid(xs, ys)
+    inside = shapely.contains_xy(shapely.union_all(polygons), x, y)
+    assert np.isnan(image[~inside]).all()
+    for cell in range(nreal_index):
+        in_cell = shapely.contains_xy(polygons[cell], x, y)
+        assert in_cell.any()
+        np.testing.assert_array_equal(image[in_cell], cell)
+
+    # images of the same viewport reuse the cell index
+    index = rasterizer.index((bounds[0] - margin, bounds[2] + margin), (bounds[1], bounds[3]), 60, 20)
+    assert rasterizer.index((bounds[0] - margin, bounds[2] + margin), (bounds[1], bounds[3]), 60, 20) is index
+
+def test_export_frames(plan02_kwargs, tmp_path):
+    """Frames rendered by worker processes are written as numbered PNG files or combined into a GIF."""
+    model = cwr.ClearwaterRiverine(**plan02_kwargs)
+    model.run(len(model.mesh.time) - 1)
+    paths = model.export_frames(tmp_path / 'frames', 'conc', timesteps=[0, 5, 10], crs='EPSG:26916', workers=2)
+    assert [path.name for path in paths] == ['frame_00000.png', 'frame_00001.png', 'frame_00002.png']
+    assert all(path.exists() for path in paths)
+
+    gif_path = model.export_frames(tmp_path / 'conc.gif', 'conc', workers=1)
+    assert gif_path.exists()
+    with pytest.raises(ValueError):
+        model.export_frames(tmp_path / 'conc.avi', 'conc')
+
+def test_export_frames_of_loaded_model(plan02_kwargs, tmp_path):
+    """A model mesh loaded from disk exports a frame for every stored timestep."""
+    output_path = tmp_path / 'output.zarr'
+    model = cwr.ClearwaterRiverine(**plan02_kwargs)
+    model.run(len(model.mesh.time) - 1)
+    model.finalize(save=True, output_filepath=output_path)
+
+    loaded = cwr.ClearwaterRiverine(mesh_file_path=output_path)
+    paths = loaded.export_frames(tmp_path / 'frames', 'conc', crs='EPSG:26916', workers=1)
+    assert len(paths) == len(model.mesh.time)
+    with pytest.raises(ValueError):
+        loaded.export_frames(tmp_path / 'empty.gif', 'conc', timesteps=[])
+
+def test_import_does_not_load_plotting():
+    """Importing the package leaves the plotting stack to the first plot, and shapely to its first use."""
+    modules = ['holoviews', 'geoviews', 'geopandas', 'matplotlib', 'bokeh', 'shapely']
+    loaded = subprocess.run(
+        [sys.executable, '-c', f'import sys, clearwater_riverine; print([m for m in {modules} if m in sys.modules])'],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+    assert loaded == '[]'
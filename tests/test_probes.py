@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+import shapely
+
+import clearwater_riverine as cwr
+
+
+@pytest.fixture
+def sim01() -> str:
+    return './tests/data/simple_test_cases/plan01_10x5/'
+
+@pytest.fixture
+def plan01_kwargs(sim01) -> dict:
+    return {
+        'flow_field_file_path': sim01 + 'clearWaterTestCases.p01.hdf',
+        'diffusion_coefficient_input': 0.01,
+        'datetime_range': (0, 60),
+        'constituent_dict': {
+            'conc': {
+                'units': 'mg/L',
+                'initial_conditions': sim01 + 'cwr_initial_conditions_p01.csv',
+                'boundary_conditions': sim01 + 'cwr_boundary_conditions_p01.csv',
+            },
+        },
+    }
+
+
+def test_probes_record_cell_values(plan01_kwargs):
+    """Probes inside a cell record that cell's concentrations; probes outside use the nearest cell."""
+    model = cwr.ClearwaterRiverine(**plan01_kwargs)
+    face_x = model.mesh['face_x'].values
+    face_y = model.mesh['face_y'].values
+    probes = cwr.Probes(
+        x=[face_x[3] + 0.1, face_x[12], face_x[40] - 100],
+        y=[face_y[3] - 0.2, face_y[12], face_y[40]],
+        names=['inside', 'centroid', 'outside'],
+    )
+    with pytest.warns(UserWarning):
+        model = cwr.ClearwaterRiverine(**plan01_kwargs, probes=probes)
+    model.run(len(model.mesh.time) - 1)
+
+    timeseries = model.probe_timeseries()
+    assert timeseries['conc'].dims == ('time', 'probe')
+    np.testing.assert_array_equal(timeseries['probe_cell'].values, [3, 12, 40])
+    np.testing.assert_array_equal(
+        timeseries['conc'].values,
+        model.mesh['conc'].values[:, [3, 12, 40]],
+    )
+
+def test_idw_probes(plan01_kwargs):
+    """Inverse-distance weights sum to one and reproduce cell values at centroids."""
+    model = cwr.ClearwaterRiverine(**plan01_kwargs)
+    face_x = model.mesh['face_x'].values
+    face_y = model.mesh['face_y'].values
+    probes = cwr.Probes(x=[face_x[12], face_x[12] + 0.3], y=[face_y[12], face_y[12]], method='idw')
+    weights = probes.weights(model.mesh)
+    np.testing.assert_allclose(np.asarray(weights.sum(axis=1)).ravel(), 1.0)
+    assert weights[0, 12] == 1.0
+    assert weights[1].nnz == 4
+
+def test_zone_timeseries(plan01_kwargs):
+    """Zone totals match sums over the stored (time x nface) results."""
+    model = cwr.ClearwaterRiverine(**plan01_kwargs)
+    polygon = shapely.box(
+        model.mesh['face_x'].values[0] - 0.1,
+        model.mesh['face_y'].values[10] - 0.1,
+        model.mesh['face_x'].values[2] + 0.1,
+        model.mesh['face_y'].values[0] + 0.1,
+    )
+    zones = cwr.Zones({'upstream': polygon, 'cells': [20, 21, 30]})
+    model = cwr.ClearwaterRiverine(**plan01_kwargs, zones=zones)
+    model.run(len(model.mesh.time) - 1)
+
+    timeseries = model.zone_timeseries()
+    np.testing.assert_array_equal(timeseries['cells'].values, [6, 3])
+    for zone, cells in [('upstream', [0, 1, 2, 10, 11, 12]), ('cells', [20, 21, 30])]:
+        volume = model.mesh['volume'].values[:, cells]
+        mass = (volume * model.mesh['conc'].values[:, cells]).sum(axis=1)
+        zone_timeseries = timeseries.sel(zone=zone)
+        np.testing.assert_allclose(zone_timeseries['volume'].values, volume.sum(axis=1), rtol=1e-6)
+        np.testing.assert_allclose(zone_timeseries['conc_mass'].values, mass, rtol=1e-6)
+        np.testing.assert_allclose(zone_timeseries['conc'].values, mass / volume.sum(axis=1), rtol=1e-6)
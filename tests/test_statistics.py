@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import clearwater_riverine as cwr
+
+from clearwater_riverine.statistics import StreamingQuantiles
+
+
+@pytest.fixture
+def sim01() -> str:
+    return './tests/data/simple_test_cases/plan01_10x5/'
+
+@pytest.fixture
+def plan01_kwargs(sim01) -> dict:
+    return {
+        'flow_field_file_path': sim01 + 'clearWaterTestCases.p01.hdf',
+        'diffusion_coefficient_input': 0.01,
+        'datetime_range': (0, 240),
+        'constituent_dict': {
+            'conc': {
+                'units': 'mg/L',
+                'initial_conditions': sim01 + 'cwr_initial_conditions_p01.csv',
+                'boundary_conditions': sim01 + 'cwr_boundary_conditions_p01.csv',
+            },
+        },
+    }
+
+
+def test_streaming_quantiles():
+    """P-square estimates approach the exact quantiles of many streams."""
+    x = np.random.default_rng(0).standard_normal((5000, 2, 10))
+    quantiles = StreamingQuantiles([0.1, 0.5, 0.9], (2, 10))
+    for observation in x[0:3]:
+        quantiles.update(observation)
+    np.testing.assert_allclose(quantiles.values(), np.quantile(x[0:3], [0.1, 0.5, 0.9], axis=0))
+    for observation in x[3:]:
+        quantiles.update(observation)
+    np.testing.assert_allclose(
+        quantiles.values(),
+        np.quantile(x, [0.1, 0.5, 0.9], axis=0),
+        atol=0.1,
+    )
+
+def test_cell_statistics_match_history(plan01_kwargs):
+    """Statistics accumulated during the run match statistics of the stored history."""
+    model = cwr.ClearwaterRiverine(
+        **plan01_kwargs,
+        cell_statistics=cwr.CellStatistics(
+            quantiles=[0.5],
+            thresholds={'conc': 100.0},
+            period='1min',
+        ),
+    )
+    model.run(len(model.mesh.time) - 1)
+    statistics = model.statistics()
+    nreal_index = model.mesh.nreal + 1
+    history = model.mesh['conc'].values[:, 0:nreal_index]
+
+    np.testing.assert_array_equal(statistics['conc_minimum'].values[0:nreal_index], history.min(axis=0))
+    np.testing.assert_array_equal(statistics['conc_maximum'].values[0:nreal_index], history.max(axis=0))
+    np.testing.assert_allclose(statistics['conc_mean'].values[0:nreal_index], history.mean(axis=0))
+    np.testing.assert_allclose(statistics['conc_std'].values[0:nreal_index], history.std(axis=0), atol=1e-10)
+    np.testing.assert_allclose(
+        statistics['conc_exceedance_fraction'].values[0:nreal_index],
+        (history > 100.0).mean(axis=0),
+    )
+    time = pd.DatetimeIndex(model.mesh.time.values)
+    period_means = pd.DataFrame(history, index=time).groupby(time.floor('1min')).mean()
+    np.testing.assert_allclose(
+        statistics['conc_period_mean'].values[:, 0:nreal_index],
+        period_means.values,
+    )
+    assert np.isnan(statistics['conc_mean'].values[nreal_index:]).all()
+
+def test_value_range_uses_running_extremes(plan01_kwargs):
+    """The running minimum and maximum give the same value range as the stored history."""
+    model = cwr.ClearwaterRiverine(**plan01_kwargs)
+    model.run(len(model.mesh.time) - 1)
+    model.set_value_range()
+    constituent = model.constituent_dict['conc']
+    running = (constituent.min_value, constituent.max_value)
+    constituent.set_value_range(model.mesh)
+    assert running == (constituent.min_value, constituent.max_value)
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import clearwater_riverine as cwr
+
+
+@pytest.fixture
+def sim02() -> str:
+    return './tests/data/simple_test_cases/plan02_2x1/'
+
+@pytest.fixture
+def plan02_kwargs(sim02) -> dict:
+    return {
+        'flow_field_file_path': sim02 + 'clearWaterTestCases.p02.hdf',
+        'diffusion_coefficient_input': 0.001,
+        'constituent_dict': {
+            'conc': {
+                'units': 'mg/L',
+                'initial_conditions': sim02 + 'cwr_initial_conditions_p02.csv',
+                'boundary_conditions': sim02 + 'cwr_boundary_conditions_p02.csv',
+            },
+        },
+    }
+
+
+def test_phase_timings(plan02_kwargs, tmp_path):
+    """Every phase of every timestep is timed, summarized and exported."""
+    model = cwr.ClearwaterRiverine(**plan02_kwargs, profile_phases=True)
+    n_steps = len(model.mesh.time) - 1
+    model.run(n_steps)
+
+    summary = model.timer.summary()
+    for phase in ['read_hydrodynamics', 'calculate_parameters', 'initialize_constituents']:
+        assert summary.loc[phase, 'count'] == 1
+    for phase in ['lhs', 'csr', 'rhs', 'solve', 'store', 'recorders', 'mass_flux']:
+        assert summary.loc[phase, 'count'] == n_steps
+    assert (summary['p50'] <= summary['p99']).all()
+    assert (summary['total'] > 0).all()
+
+    model.timer.write_json(tmp_path / 'timings.json')
+    with open(tmp_path / 'timings.json') as infile:
+        assert json.load(infile)['solve']['count'] == n_steps
+
+    model.timer.write_chrome_trace(tmp_path / 'trace.json')
+    with open(tmp_path / 'trace.json') as infile:
+        events = json.load(infile)['traceEvents']
+    assert len(events) == summary['count'].sum()
+    solves = [event for event in events if event['name'] == 'solve']
+    assert [event['args']['time_step'] for event in solves] == list(range(n_steps))
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
+
+def test_phase_timer_disabled(plan02_kwargs):
+    model = cwr.ClearwaterRiverine(**plan02_kwargs)
+    model.run(len(model.mesh.time) - 1)
+    assert model.timer.summary().empty
@@ -0,0 +1,32 @@
+import numpy as np
+
+import clearwater_riverine as cwr
+
+from clearwater_riverine.utilities import (
+    KERNEL_DTYPES,
+    _compute_cell_volumes,
+    _compute_face_areas,
+)
+
+
+def test_precompile():
+    """Kernels are compiled for HEC-RAS and NumPy default argument types, and give the same results."""
+    cwr.precompile()
+    assert len(_compute_cell_volumes.signatures) >= len(KERNEL_DTYPES)
+    assert len(_compute_face_areas.signatures) >= len(KERNEL_DTYPES)
+
+    volumes = []
+    for float_type, int_type in KERNEL_DTYPES:
+        volumes.append(
+            _compute_cell_volumes(
+                np.array([[0.5, 2.0, 0.0]], dtype=float_type),
+                np.full(3, 2.0, dtype=float_type),
+                np.array([0, 0, 2], dtype=int_type),
+                np.array([2, 2, 0], dtype=int_type),
+                np.array([0.0, 1.0], dtype=float_type),
+                np.array([0.0, 4.0], dtype=float_type),
+            )
+        )
+    # interpolated, above the table (max volume plus the volume above it) and ghost cell
+    np.testing.assert_array_equal(volumes[0], [[2.0, 6.0, 0.0]])
+    np.testing.assert_array_equal(volumes[1], volumes[0])